@@ -0,0 +1,119 @@
+"""
+Micro-benchmark for Terrain-RGB tile encoding (terrain_rgb.py).
+
+Encodes 256x256 tiles of the synthetic DEM at several zooms with the
+previous inline /tiles encoder and each terrain_rgb option, and reports
+per-tile time, tiles per second on one core and bytes per tile.
+
+Usage (from rf-engine/):
+    python benchmarks/bench_terrain_rgb.py --tiles 20 --repeat 5
+    python benchmarks/bench_terrain_rgb.py --output rgb.json
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import mercantile
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import synthetic_elevation  # noqa: E402
+
+import terrain_rgb  # noqa: E402
+from tile_manager import tile_pixel_coordinates  # noqa: E402
+
+CENTER = (48.75, -122.45)
+ZOOMS = (10, 12, 14)
+
+
+def legacy_encode(grid):
+    """
+    The inline encoder /tiles used before terrain_rgb (reference only).
+    """
+    h_scaled = (grid + 10000) * 10
+    h_scaled = np.clip(h_scaled, 0, 16777215)
+    h_scaled = h_scaled.astype(np.uint32)
+    r = (h_scaled >> 16) & 0xFF
+    g = (h_scaled >> 8) & 0xFF
+    b = h_scaled & 0xFF
+    rgb = np.stack((r, g, b), axis=-1).astype(np.uint8)
+    img = Image.fromarray(rgb, mode='RGB')
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def tiles(n_tiles):
+    """
+    n_tiles 256x256 elevation grids around CENTER, spread over ZOOMS.
+    """
+    grids = []
+    for i in range(n_tiles):
+        z = ZOOMS[i % len(ZOOMS)]
+        tile = mercantile.tile(CENTER[1], CENTER[0], z)
+        lats, lons = tile_pixel_coordinates(tile.x + i // len(ZOOMS), tile.y, z, 256)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        grids.append(synthetic_elevation(lat_grid, lon_grid))
+    return grids
+
+
+def encoders():
+    options = {"legacy_png6": legacy_encode}
+    for level in (1, 3, 6):
+        options[f"png{level}"] = lambda g, level=level: terrain_rgb.encode(g, "png", compress_level=level)
+    if terrain_rgb.WEBP_AVAILABLE:
+        options["webp_lossless"] = lambda g: terrain_rgb.encode(g, "webp")
+    options["rgb_only"] = lambda g: terrain_rgb.encode_rgb(g)
+    return options
+
+
+def run(n_tiles, repeat):
+    grids = tiles(n_tiles)
+    results = []
+    for name, encode in encoders().items():
+        encode(grids[0])  # Warm buffers and codecs
+        per_tile, sizes = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for grid in grids:
+                out = encode(grid)
+                if isinstance(out, bytes):
+                    sizes.append(len(out))
+            per_tile.append((time.perf_counter() - start) / len(grids))
+        median = statistics.median(per_tile)
+        results.append({
+            "encoder": name,
+            "ms_per_tile": round(median * 1000, 3),
+            "tiles_per_s": round(1.0 / median, 1),
+            "bytes_per_tile": int(statistics.fmean(sizes)) if sizes else None,
+        })
+    base = results[0]["ms_per_tile"]
+    for r in results:
+        r["speedup"] = round(base / r["ms_per_tile"], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, default=12, help="Distinct tiles per pass")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes per encoder")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    results = run(args.tiles, args.repeat)
+    print(f"{'encoder':16s} {'ms/tile':>8s} {'tiles/s':>8s} {'bytes':>8s} {'speedup':>8s}")
+    for r in results:
+        size = r["bytes_per_tile"] if r["bytes_per_tile"] is not None else "-"
+        print(f"{r['encoder']:16s} {r['ms_per_tile']:8.2f} {r['tiles_per_s']:8.1f} {size:>8} {r['speedup']:8.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"tiles": args.tiles, "repeat": args.repeat, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Local stand-ins for benchmarking and load testing the rf-engine.
+
+- synthetic_elevation(): deterministic PNW-like DEM (ridges + hills), no data files needed
+- InProcessRedis: dict-backed Redis subset (used when fakeredis isn't installed)
+- FakeOpenTopoData: threaded HTTP server speaking the OpenTopoData /v1/<dataset> API
+- bench_environment(): wires all of the above into the server and worker modules
+"""
+import json
+import os
+import sys
+import threading
+import time
+import fnmatch
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+# Allow "python benchmarks/run_benchmarks.py" from rf-engine/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_elevation(lats, lons):
+    """
+    Deterministic terrain in meters: NNE-trending ridges plus a few Gaussian peaks.
+    Smooth enough to interpolate, rough enough to block paths.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    ridges = 350.0 * (1 + np.sin(lats * 40.0 + lons * 12.0)) * (1 + 0.5 * np.cos(lons * 31.0))
+    hills = np.zeros_like(lats)
+    for peak_lat, peak_lon, height, width in (
+        (48.76, -122.40, 900.0, 0.05),
+        (48.60, -122.20, 1400.0, 0.08),
+        (48.90, -122.65, 600.0, 0.03),
+    ):
+        hills += height * np.exp(-((lats - peak_lat) ** 2 + (lons - peak_lon) ** 2) / (2 * width ** 2))
+    return ridges + hills
+
+
+class InProcessRedis:
+    """
+    Minimal thread-safe Redis stand-in covering the commands the rf-engine uses.
+    Expiry is honoured lazily on read.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        exp = self._expiry.get(key)
+        if exp is not None and exp < time.time():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+            return False
+        return key in self._data
+
+    @staticmethod
+    def _key(key):
+        return key.encode() if isinstance(key, str) else key
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def get(self, key):
+        key = self._key(key)
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def mget(self, keys):
+        return [self.get(k) for k in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        key = self._key(key)
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = self._value(value)
+            if ex:
+                self._expiry[key] = time.time() + ex
+            else:
+                self._expiry.pop(key, None)
+            return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        removed = 0
+        with self._lock:
+            for key in keys:
+                key = self._key(key)
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+                self._expiry.pop(key, None)
+        return removed
+
+    def exists(self, key):
+        key = self._key(key)
+        with self._lock:
+            return int(self._alive(key))
+
+    def incr(self, key, amount=1):
+        key = self._key(key)
+        with self._lock:
+            value = int(self._data[key]) if self._alive(key) else 0
+            value += amount
+            self._data[key] = str(value).encode()
+            return value
+
+    def expire(self, key, ttl):
+        key = self._key(key)
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expiry[key] = time.time() + ttl
+            return True
+
+    def keys(self, pattern="*"):
+        pattern = pattern.decode() if isinstance(pattern, bytes) else pattern
+        with self._lock:
+            return [k for k in list(self._data) if self._alive(k) and fnmatch.fnmatch(k.decode(), pattern)]
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+        return True
+
+    def ping(self):
+        return True
+
+
+def make_redis():
+    """
+    fakeredis when available (closest to real semantics), else InProcessRedis.
+    """
+    try:
+        import fakeredis
+        return fakeredis.FakeRedis()
+    except ImportError:
+        return InProcessRedis()
+
+
+class FakeOpenTopoData:
+    """
+    Threaded HTTP server answering GET /v1/<dataset>?locations=lat,lon|... from synthetic_elevation().
+    latency_ms adds a fixed delay per request to mimic a remote or busy instance;
+    error_rate makes that fraction of requests return HTTP 500.
+    """
+
+    def __init__(self, latency_ms=0.0, error_rate=0.0, host="127.0.0.1", port=0, seed=0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        rng = np.random.default_rng(seed)
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                outer.requests += 1
+                parsed = urlparse(self.path)
+                if not parsed.path.startswith("/v1/"):
+                    self._send(404, {"status": "INVALID_REQUEST", "error": "Unknown dataset"})
+                    return
+                if outer.latency_ms:
+                    time.sleep(outer.latency_ms / 1000.0)
+                if outer.error_rate and rng.random() < outer.error_rate:
+                    self._send(500, {"status": "SERVER_ERROR", "error": "injected"})
+                    return
+
+                raw = parse_qs(parsed.query).get("locations", [""])[0]
+                points = [p.split(",") for p in raw.split("|") if p]
+                lats = np.array([float(p[0]) for p in points])
+                lons = np.array([float(p[1]) for p in points])
+                elevs = synthetic_elevation(lats, lons)
+                self._send(200, {
+                    "status": "OK",
+                    "results": [
+                        {"elevation": float(e), "location": {"lat": float(a), "lng": float(b)}}
+                        for e, a, b in zip(elevs, lats, lons)
+                    ]
+                })
+
+            def _send(self, code, body):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def install_fakes(fake_redis):
+    """
+    Point every module-level Redis client / TileManager at the stand-in.
+    Imports are deferred so ELEVATION_API_URL is already set.
+    """
+    import server
+    import tasks.viewshed as viewshed_tasks
+    from worker import celery_app
+
+    server.redis_client = fake_redis
+    server.tile_manager.redis = fake_redis
+    server.link_cache.redis = fake_redis
+    server.meshcore_nodes.redis = fake_redis
+    viewshed_tasks.redis_client = fake_redis
+    viewshed_tasks.tile_manager.redis = fake_redis
+
+    # Run Celery tasks in-process without a broker
+    celery_app.conf.update(
+        broker_url="memory://",
+        result_backend="cache+memory://",
+        task_always_eager=True,
+        task_store_eager_result=True,
+    )
+    # Rate limits would throttle synthetic traffic
+    server.limiter.enabled = False
+    return server
+
+
+@contextmanager
+def bench_environment(latency_ms=0.0, error_rate=0.0, dataset="srtm30m"):
+    """
+    Start the fake elevation server, install a Redis stand-in, and yield
+    (server_module, fake_redis, fake_topo).
+    """
+    topo = FakeOpenTopoData(latency_ms=latency_ms, error_rate=error_rate).start()
+    previous = {k: os.environ.get(k) for k in ("ELEVATION_API_URL", "ELEVATION_DATASET")}
+    os.environ["ELEVATION_API_URL"] = topo.url
+    os.environ["ELEVATION_DATASET"] = dataset
+    fake_redis = make_redis()
+    try:
+        server = install_fakes(fake_redis)
+        yield server, fake_redis, topo
+    finally:
+        topo.stop()
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
@@ -0,0 +1,218 @@
+"""
+Load-testing harness for the rf-engine FastAPI endpoints.
+
+Starts the app under uvicorn in a child process, wired to a local fake
+OpenTopoData (configurable latency) and an in-process Redis stand-in, then
+replays a weighted mix of /calculate-link, /elevation-batch, /tiles and
+/optimize-location traffic at increasing concurrency. For every step it
+reports throughput, p50/p95/p99 latency and error rate, which shows where
+the sync endpoints and TileManager thread pools saturate.
+
+Usage (from rf-engine/):
+    python benchmarks/loadtest.py --concurrency 1,4,16,64 --duration 15 --latency-ms 20
+    python benchmarks/loadtest.py --url http://localhost:5001   # existing deployment
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CENTER = (48.75, -122.45)
+
+# Relative weights of the traffic mix (roughly what the UI generates)
+DEFAULT_MIX = {"calculate_link": 40, "elevation_batch": 30, "tiles": 25, "optimize_location": 5}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(port, latency_ms, error_rate):
+    """
+    Child process: fake upstreams + uvicorn serving server.app.
+    """
+    import uvicorn
+    from fixtures import bench_environment
+
+    with bench_environment(latency_ms=latency_ms, error_rate=error_rate) as (server, _, _):
+        uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _wait_for(url, timeout=30.0):
+    import httpx
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become healthy")
+
+
+class RequestFactory:
+    """
+    Random requests within region_deg of CENTER; the spread controls the tile cache hit rate.
+    """
+
+    def __init__(self, region_deg, seed):
+        self.region_deg = region_deg
+        self.rng = np.random.default_rng(seed)
+
+    def _point(self):
+        return (
+            CENTER[0] + (self.rng.random() - 0.5) * self.region_deg,
+            CENTER[1] + (self.rng.random() - 0.5) * self.region_deg,
+        )
+
+    def calculate_link(self):
+        (a_lat, a_lon), (b_lat, b_lon) = self._point(), self._point()
+        return "POST", "/calculate-link", {
+            "tx_lat": a_lat, "tx_lon": a_lon, "rx_lat": b_lat, "rx_lon": b_lon,
+            "frequency_mhz": 915.0, "tx_height": 10.0, "rx_height": 2.0,
+        }
+
+    def elevation_batch(self):
+        points = [self._point() for _ in range(100)]
+        return "POST", "/elevation-batch", {"locations": "|".join(f"{a},{b}" for a, b in points)}
+
+    def tiles(self):
+        import mercantile
+        lat, lon = self._point()
+        z = int(self.rng.integers(10, 15))
+        t = mercantile.tile(lon, lat, z)
+        return "GET", f"/tiles/{z}/{t.x}/{t.y}.png", None
+
+    def optimize_location(self):
+        lat, lon = self._point()
+        return "POST", "/optimize-location", {
+            "min_lat": lat - 0.01, "min_lon": lon - 0.01, "max_lat": lat + 0.01, "max_lon": lon + 0.01,
+            "frequency_mhz": 915.0, "tx_height": 10.0,
+        }
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def _run_step(url, concurrency, duration, mix, factory, timeout):
+    import httpx
+
+    names = list(mix)
+    weights = np.array([mix[n] for n in names], dtype=np.float64)
+    weights /= weights.sum()
+    samples = []  # (endpoint, latency_s, ok)
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        while time.perf_counter() < deadline:
+            name = names[int(factory.rng.choice(len(names), p=weights))]
+            method, path, body = getattr(factory, name)()
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, path, json=body)
+                ok = resp.status_code < 400
+            except Exception:
+                ok = False
+            samples.append((name, time.perf_counter() - start, ok))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    def summarize(rows):
+        latencies = [r[1] for r in rows]
+        errors = sum(1 for r in rows if not r[2])
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+        }
+
+    step = {"concurrency": concurrency, "duration_s": round(elapsed, 2)}
+    step.update(summarize(samples))
+    step["endpoints"] = {n: summarize([s for s in samples if s[0] == n]) for n in names if any(s[0] == n for s in samples)}
+    return step
+
+
+def run(url, levels, duration, mix, region_deg, seed, timeout):
+    factory = RequestFactory(region_deg, seed)
+    steps = []
+    for concurrency in levels:
+        step = asyncio.run(_run_step(url, concurrency, duration, mix, factory, timeout))
+        steps.append(step)
+        print(f"c={concurrency:4d} rps={step['throughput_rps']:8.1f} p50={step['p50_ms']:8.1f}ms "
+              f"p95={step['p95_ms']:8.1f}ms p99={step['p99_ms']:8.1f}ms err={step['error_rate']:.2%}",
+              file=sys.stderr)
+
+    # Saturation: first level where throughput stops growing by >10% while p95 keeps rising
+    saturation = None
+    for prev, cur in zip(steps, steps[1:]):
+        if cur["throughput_rps"] < prev["throughput_rps"] * 1.10 and cur["p95_ms"] > prev["p95_ms"]:
+            saturation = prev["concurrency"]
+            break
+    return {"url": url, "mix": mix, "region_deg": region_deg, "steps": steps, "saturation_concurrency": saturation}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target an existing server instead of spawning one")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="Comma list of concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Fake OpenTopoData latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake OpenTopoData injected error fraction")
+    parser.add_argument("--region-deg", type=float, default=0.5, help="Spread of request coordinates")
+    parser.add_argument("--mix", default=json.dumps(DEFAULT_MIX), help="JSON endpoint weights")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write JSON report to this path (default: stdout)")
+    args = parser.parse_args()
+
+    mix = json.loads(args.mix)
+    for name in mix:
+        if not hasattr(RequestFactory, name):
+            parser.error(f"Unknown endpoint in mix: {name}")
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    proc = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        proc = multiprocessing.Process(target=_serve, args=(port, args.latency_ms, args.error_rate), daemon=True)
+        proc.start()
+    try:
+        _wait_for(url)
+        report = run(url, levels, args.duration, mix, args.region_deg, args.seed, args.timeout)
+        report["upstream_latency_ms"] = args.latency_ms if proc else None
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.join(timeout=5)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Reproducible benchmarks for rf-engine hot paths.
+
+Runs against a synthetic DEM served by a local fake OpenTopoData and an
+in-process Redis stand-in, so results only depend on the code under test.
+
+Usage (from rf-engine/):
+    python benchmarks/run_benchmarks.py --sizes small,medium --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json   # ratios vs a previous run
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import bench_environment  # noqa: E402
+
+CENTER = (48.75, -122.45)
+
+# Parameters per size; every case scales along its natural axis
+SIZES = {
+    "small": {"points": 1_000, "link_samples": 100, "radius_m": 3_000, "bbox_deg": 0.02, "zoom": 12, "nodes": 3},
+    "medium": {"points": 10_000, "link_samples": 500, "radius_m": 10_000, "bbox_deg": 0.08, "zoom": 13, "nodes": 8},
+    "large": {"points": 100_000, "link_samples": 2_000, "radius_m": 25_000, "bbox_deg": 0.25, "zoom": 14, "nodes": 20},
+}
+
+
+def _timed(fn, repeat):
+    """
+    First call is reported separately as "cold" (tile cache empty for that region).
+    """
+    timings = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    warm = timings[1:] or timings
+    return {
+        "cold_s": round(timings[0], 6),
+        "min_s": round(min(warm), 6),
+        "median_s": round(statistics.median(warm), 6),
+        "mean_s": round(statistics.fmean(warm), 6),
+        "runs": len(warm),
+    }
+
+
+def bench_elevations_batch(server, params, rng):
+    lats = CENTER[0] + (rng.random(params["points"]) - 0.5) * 0.3
+    lons = CENTER[1] + (rng.random(params["points"]) - 0.5) * 0.3
+    coords = list(zip(lats, lons))
+    return lambda: server.tile_manager.get_elevations_batch(coords)
+
+
+def bench_analyze_link(server, params, rng):
+    import rf_physics
+    profile = 200 + rng.random(params["link_samples"]) * 300
+    return lambda: rf_physics.analyze_link(profile, 15_000.0, 915.0, 10.0, 2.0)
+
+
+def bench_viewshed(server, params, rng):
+    from core.algorithms import calculate_viewshed
+    return lambda: calculate_viewshed(
+        server.tile_manager, CENTER[0], CENTER[1], 10.0, params["radius_m"], resolution_m=100
+    )
+
+
+def bench_viewshed_radial(server, params, rng):
+    from core.algorithms import calculate_viewshed
+    return lambda: calculate_viewshed(
+        server.tile_manager, CENTER[0], CENTER[1], 10.0, params["radius_m"], resolution_m=100, method="radial"
+    )
+
+
+def bench_optimize_location(server, params, rng, client):
+    half = params["bbox_deg"] / 2
+    body = {
+        "min_lat": CENTER[0] - half, "min_lon": CENTER[1] - half,
+        "max_lat": CENTER[0] + half, "max_lon": CENTER[1] + half,
+        "frequency_mhz": 915.0, "tx_height": 10.0,
+        "existing_nodes": [{"lat": CENTER[0] + half, "lon": CENTER[1], "height": 10.0}],
+    }
+
+    def run():
+        resp = client.post("/optimize-location", json=body)
+        assert resp.status_code == 200, resp.text
+    return run
+
+
+def bench_tiles(server, params, rng, client):
+    import mercantile
+    z = params["zoom"]
+    tile = mercantile.tile(CENTER[1], CENTER[0], z)
+    urls = [f"/tiles/{z}/{tile.x + dx}/{tile.y + dy}.png" for dx in range(-1, 2) for dy in range(-1, 2)]
+
+    def run():
+        for url in urls:
+            resp = client.get(url)
+            assert resp.status_code == 200
+    return run
+
+
+def bench_batch_viewshed(server, params, rng):
+    from tasks.viewshed import calculate_batch_viewshed
+    nodes = [
+        {
+            "id": str(i), "name": f"Node {i}", "height": 10.0,
+            "lat": CENTER[0] + (rng.random() - 0.5) * 0.2,
+            "lon": CENTER[1] + (rng.random() - 0.5) * 0.2,
+        }
+        for i in range(params["nodes"])
+    ]
+    payload = {"nodes": nodes, "options": {"radius": params["radius_m"] / 2, "optimize_n": None}}
+
+    def run():
+        with patch.object(calculate_batch_viewshed, "update_state"):
+            result = calculate_batch_viewshed.run(payload)
+        assert result["status"] == "completed"
+    return run
+
+
+def bench_coverage_gap(server, params, rng):
+    # Hundreds of existing nodes over a region; warm runs reuse the per-node cache
+    from tasks.coverage_gap import run_coverage_gap
+    n_nodes = params["nodes"] * 25
+    span = params["bbox_deg"] * 4
+    nodes = [
+        {
+            "id": str(i),
+            "lat": CENTER[0] + (rng.random() - 0.5) * span,
+            "lon": CENTER[1] + (rng.random() - 0.5) * span,
+        }
+        for i in range(n_nodes)
+    ]
+    payload = {
+        "nodes": nodes, "radius": params["radius_m"] / 2, "resolution_m": 100.0,
+        "south": CENTER[0] - span / 2, "west": CENTER[1] - span / 2,
+        "north": CENTER[0] + span / 2, "east": CENTER[1] + span / 2,
+    }
+
+    def run():
+        with patch.object(run_coverage_gap, "update_state"):
+            result = run_coverage_gap.run(payload)
+        assert result["status"] == "completed"
+    return run
+
+
+CASES = {
+    "get_elevations_batch": bench_elevations_batch,
+    "analyze_link": bench_analyze_link,
+    "calculate_viewshed": bench_viewshed,
+    "calculate_viewshed_radial": bench_viewshed_radial,
+    "optimize_location": bench_optimize_location,
+    "tiles": bench_tiles,
+    "calculate_batch_viewshed": bench_batch_viewshed,
+    "coverage_gap": bench_coverage_gap,
+}
+HTTP_CASES = {"optimize_location", "tiles"}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def run(sizes, cases, repeat, latency_ms, seed):
+    from fastapi.testclient import TestClient
+
+    results = []
+    with bench_environment(latency_ms=latency_ms) as (server, fake_redis, topo):
+        client = TestClient(server.app)
+        for size in sizes:
+            params = SIZES[size]
+            for name in cases:
+                rng = np.random.default_rng(seed)
+                # Each case starts cold so "cold_s" includes tile fetches
+                fake_redis.flushdb()
+                requests_before = topo.requests
+                if name in HTTP_CASES:
+                    fn = CASES[name](server, params, rng, client)
+                else:
+                    fn = CASES[name](server, params, rng)
+                stats = _timed(fn, repeat)
+                stats.update({
+                    "case": name,
+                    "size": size,
+                    "params": params,
+                    "upstream_requests": topo.requests - requests_before,
+                })
+                results.append(stats)
+                print(f"{name:28s} {size:7s} cold={stats['cold_s']:.4f}s median={stats['median_s']:.4f}s "
+                      f"upstream={stats['upstream_requests']}", file=sys.stderr)
+
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "latency_ms": latency_ms,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current, baseline_path):
+    """
+    Print median ratios (current / baseline) per case and size; >1.0 is a slowdown.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    base = {(r["case"], r["size"]): r for r in baseline["results"]}
+    print(f"{'case':28s} {'size':7s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+    for r in current["results"]:
+        prev = base.get((r["case"], r["size"]))
+        if prev is None:
+            continue
+        ratio = r["median_s"] / prev["median_s"] if prev["median_s"] else float("inf")
+        print(f"{r['case']:28s} {r['size']:7s} {prev['median_s']:10.4f} {r['median_s']:10.4f} {ratio:7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="small,medium", help="Comma list of: " + ",".join(SIZES))
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma list of: " + ",".join(CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="Warm runs per case (after one cold run)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fake OpenTopoData latency per request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this path (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    cases = [c for c in args.cases.split(",") if c]
+    for name in cases:
+        if name not in CASES:
+            parser.error(f"Unknown case {name}")
+
+    report = run(sizes, cases, args.repeat, args.latency_ms, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Clutter (obstruction above ground) from memory-mapped rasters.
+#
+# CLUTTER_DIR holds one .npy grid per area with a .json sidecar of the same
+# name:
+#   {"west": -123.0, "north": 49.0, "dlon": 8.33e-05, "dlat": 8.33e-05,
+#    "kind": "landcover", "classes": {"10": 15.0, ...}}
+# Pixel (r, c) covers lat north - (r + 1) * dlat .. north - r * dlat and
+# lon west + c * dlon .. west + (c + 1) * dlon.
+#
+# kind "landcover": integer class codes, mapped to clutter heights through
+#   "classes" (ESA WorldCover heights below when omitted);
+# kind "height": canopy/building heights in meters, times "scale" (default 1).
+#
+# Grids are memory-mapped like converted SDF terrain blocks, so every process
+# on the host shares the pages. Lookups are nearest-pixel: land cover is
+# categorical and canopy grids are usually finer than the terrain.
+
+# ESA WorldCover 2021 classes -> representative clutter height (m)
+WORLDCOVER_CLUTTER_M = {
+    10: 15.0,   # Tree cover
+    20: 3.0,    # Shrubland
+    30: 0.0,    # Grassland
+    40: 1.0,    # Cropland
+    50: 10.0,   # Built-up
+    60: 0.0,    # Bare / sparse vegetation
+    70: 0.0,    # Snow and ice
+    80: 0.0,    # Permanent water
+    90: 1.0,    # Herbaceous wetland
+    95: 10.0,   # Mangroves
+    100: 0.0,   # Moss and lichen
+}
+
+CLUTTER_KINDS = ("landcover", "height")
+
+
+class ClutterGrid:
+    """
+    One memory-mapped clutter raster with its georeference.
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.west = float(meta["west"])
+        self.north = float(meta["north"])
+        self.dlon = float(meta["dlon"])
+        self.dlat = float(meta["dlat"])
+        self.kind = meta.get("kind", "height")
+        if self.kind not in CLUTTER_KINDS:
+            raise ValueError(f"unknown clutter kind {self.kind!r}")
+        self.data = np.load(path, mmap_mode="r")
+        if self.data.ndim != 2:
+            raise ValueError(f"expected a 2-D grid, got shape {self.data.shape}")
+        self.south = self.north - self.data.shape[0] * self.dlat
+        self.east = self.west + self.data.shape[1] * self.dlon
+
+        self.lut = None
+        self.scale = float(meta.get("scale", 1.0))
+        if self.kind == "landcover":
+            classes = {int(k): float(v) for k, v in meta.get("classes", WORLDCOVER_CLUTTER_M).items()}
+            self.lut = np.zeros(max(classes) + 1)
+            for code, height in classes.items():
+                self.lut[code] = height
+
+    def covers(self, lats, lons):
+        return (lats > self.south) & (lats <= self.north) & (lons >= self.west) & (lons < self.east)
+
+    def sample(self, lats, lons):
+        """
+        Clutter height at points inside the grid (callers filter with covers()).
+        """
+        r = np.clip(((self.north - lats) / self.dlat).astype(np.intp), 0, self.data.shape[0] - 1)
+        c = np.clip(((lons - self.west) / self.dlon).astype(np.intp), 0, self.data.shape[1] - 1)
+        values = self.data[r, c]
+        if self.lut is not None:
+            codes = values.astype(np.intp)
+            known = (codes >= 0) & (codes < self.lut.size)
+            return np.where(known, self.lut[np.where(known, codes, 0)], 0.0)
+        return np.maximum(values.astype(np.float64) * self.scale, 0.0)
+
+
+class ClutterRaster:
+    """
+    Clutter lookups from a directory of grids; later files win where they overlap.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.grids = []
+        for name in sorted(os.listdir(directory)):
+            if not name.lower().endswith(".json"):
+                continue
+            meta_path = os.path.join(directory, name)
+            grid_path = os.path.splitext(meta_path)[0] + ".npy"
+            try:
+                with open(meta_path, "r") as f:
+                    meta = json.load(f)
+                self.grids.append(ClutterGrid(grid_path, meta))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping clutter grid {meta_path}: {e}")
+        logger.info(f"Clutter raster: {len(self.grids)} grids in {directory}")
+
+    def __len__(self):
+        return len(self.grids)
+
+    def sample_heights(self, lats, lons):
+        """
+        Clutter height (m) for arrays of any shape.
+        Returns: (height, covered); height is 0.0 where not covered.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        shape = np.broadcast_shapes(lats.shape, lons.shape)
+        lats = np.broadcast_to(lats, shape).ravel()
+        lons = np.broadcast_to(lons, shape).ravel()
+
+        result = np.zeros(lats.size)
+        covered = np.zeros(lats.size, dtype=bool)
+        for grid in self.grids:
+            idx = np.nonzero(grid.covers(lats, lons))[0]
+            if idx.size:
+                result[idx] = grid.sample(lats[idx], lons[idx])
+                covered[idx] = True
+        return result.reshape(shape), covered.reshape(shape)
+
+
+def from_env():
+    """
+    ClutterRaster for CLUTTER_DIR, or None when unset, empty or unreadable
+    (clutter is then the request's uniform clutter_height).
+    """
+    directory = os.environ.get("CLUTTER_DIR")
+    if not directory:
+        return None
+    try:
+        raster = ClutterRaster(directory)
+    except OSError as e:
+        logger.warning(f"Clutter raster disabled ({directory}): {e}")
+        return None
+    return raster if len(raster) else None
@@ -2,14 +2,37 @@ import numpy as np
 import math
 import heapq
 import logging
+import time
+import scipy.ndimage
+import metrics
 import rf_physics
-from rf_physics import haversine_distance, calculate_path_loss
+from core import geodesy, kernels
+from core.profile_planner import band_samples, plan_samples
 
 logger = logging.getLogger(__name__)
 
-def calculate_viewshed(tile_manager, tx_lat, tx_lon, tx_h, radius_m, rx_h=2.0, freq_mhz=915.0, resolution_m=30, model='bullington'):
+# Max paths evaluated per vectorized viewshed pass
+VIEWSHED_CHUNK = 20000
+# Cap on rays for the radial method (one per grid cell on the perimeter)
+VIEWSHED_MAX_RAYS = 2048
+VIEWSHED_K_FACTOR = 1.333
+
+# Relay routing: candidate sites considered between two endpoints, the terrain
+# window edge they are picked from, and the neighbourhood for the hilltop test
+RELAY_MAX_CANDIDATES = 400
+RELAY_GRID_DIM = 160
+RELAY_PEAK_RADIUS_M = 1000.0
+
+def calculate_viewshed(tile_manager, tx_lat, tx_lon, tx_h, radius_m, rx_h=2.0, freq_mhz=915.0, resolution_m=30, model='bullington', samples=None, cancel_check=None, method='paths',
+                       clutter_height=0.0, clutter_mode='auto'):
     """
     Calculate viewshed for a single point.
+    samples: fixed profile samples per path; None plans them per path from distance.
+    clutter_height, clutter_mode: obstruction above the terrain (TileManager.sample_clutter).
+    cancel_check: optional callable run before every chunk; raise from it to abort.
+    method: 'paths' evaluates an independent profile to every cell; 'radial'
+            sweeps rays outward once and reuses each ray's running horizon
+            (one terrain sample per ray step instead of per path sample).
     Returns: (lat_grid, lon_grid, visibility_grid)
     """
     # 1. Define Bounds
@@ -40,52 +63,97 @@ def calculate_viewshed(tile_manager, tx_lat, tx_lon, tx_h, radius_m, rx_h=2.0, f
     lons = np.linspace(min_lon, max_lon, cols)
     
     grid = np.zeros((rows, cols))
-    error_count = 0
+    start_time = time.perf_counter()
     
-    # 3. Iterate and Check LOS
-    # This is O(N*M), where N*M ~ 2500-10000. 
-    # Profile fetch is expensive.
+    # 3. Vectorized LOS over every cell within the radius
+    # Distances for the whole grid in one call (great-circle)
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+    dist_grid = geodesy.haversine(tx_lat, tx_lon, lat_grid, lon_grid)
+    in_range = (dist_grid <= radius_m) & (dist_grid >= 10)
+    target_r, target_c = np.nonzero(in_range)
     
-    # Optimization: Only check points within radius
-    for r in range(rows):
-        for c in range(cols):
-            # Distance Check
-            dist_m = haversine_distance(tx_lat, tx_lon, lats[r], lons[c])
-            if dist_m > radius_m or dist_m < 10: 
-                continue
-            
-            # Get Profile
-            # Use fewer samples for speed (e.g. 15). 
-            # 15 samples over 5km = ~300m resolution profile. sufficient for large obstacles.
+    if method == 'radial':
+        if cancel_check is not None:
+            cancel_check()
+        try:
+            visible = _radial_visibility(
+                tile_manager, tx_lat, tx_lon, tx_h, rx_h, radius_m, eff_res_m,
+                dist_grid[target_r, target_c], lat_grid[target_r, target_c], lon_grid[target_r, target_c],
+                clutter_height, clutter_mode
+            )
+            grid[target_r[visible], target_c[visible]] = 1.0
+        except Exception as e:
+            logger.warning(f"Radial viewshed failed: {e}")
+        metrics.VIEWSHED_CELLS.inc(len(target_r))
+        metrics.VIEWSHED_SECONDS.observe(time.perf_counter() - start_time)
+        return grid, lats, lons
+    
+    # Sample count per path follows its length and the terrain resolution, rounded
+    # into bands so each band is one vectorized pass: short paths stay cheap,
+    # long paths keep enough samples to catch ridges.
+    if samples is None:
+        path_samples = band_samples(plan_samples(
+            dist_grid[target_r, target_c], tile_manager.effective_resolution_m(tx_lat), purpose="viewshed"
+        ))
+    else:
+        path_samples = np.full(len(target_r), int(samples))
+    
+    failed_chunks = 0
+    for band in np.unique(path_samples):
+        band_idx = np.nonzero(path_samples == band)[0]
+        # Profiles are fetched in chunks to bound memory: (chunk, samples) per pass.
+        for start in range(0, len(band_idx), VIEWSHED_CHUNK):
+            r_idx = target_r[band_idx[start:start + VIEWSHED_CHUNK]]
+            c_idx = target_c[band_idx[start:start + VIEWSHED_CHUNK]]
+            if cancel_check is not None:
+                cancel_check()
             try:
-                profile = tile_manager.get_elevation_profile(
-                    tx_lat, tx_lon, lats[r], lons[c], samples=15
+                profiles, clutter = tile_manager.get_elevation_profiles(
+                    tx_lat, tx_lon, lats[r_idx], lons[c_idx], samples=int(band),
+                    clutter_height=clutter_height, clutter_mode=clutter_mode
                 )
-                
-                # Analyze Link
-                # True LOS check via analyze_link (checks Fresnel/Clearance)
-                # If we want pure Visual LOS, we check if min_clearance_ratio >= 0 (ignoring Fresnel zone size, just line)
-                # analyze_link calculates clearance relative to Fresnel zone.
-                # If we strictly want Visual LOS: clearance > 0.
-                # analyze_link returns 'min_clearance_ratio' = clearance / fresnel_radius
-                # So ratio >= 0 means clearance >= 0 means Visible.
-                
-                link = rf_physics.analyze_link(profile, dist_m, freq_mhz, tx_h, rx_h)
-                
-                if link['min_clearance_ratio'] >= 0.0:
-                    grid[r, c] = 1.0 # Visible
-                    
+                # Visual LOS: min_clearance_ratio >= 0 means clearance >= 0 along the path
+                ratios = rf_physics.min_clearance_ratio_batch(
+                    profiles, dist_grid[r_idx, c_idx], freq_mhz, tx_h, rx_h, clutter_height=clutter
+                )
+                grid[r_idx[ratios >= 0.0], c_idx[ratios >= 0.0]] = 1.0 # Visible
             except Exception as e:
-                error_count += 1
-                if error_count <= 3:
-                    logger.warning(f"Viewshed cell ({r},{c}) failed: {e}")
-                continue
+                failed_chunks += 1
+                logger.warning(f"Viewshed chunk ({band} samples) failed: {e}")
+    
+    metrics.VIEWSHED_CELLS.inc(len(target_r))
+    metrics.VIEWSHED_SECONDS.observe(time.perf_counter() - start_time)
     
-    if error_count > 0:
-        logger.warning(f"Viewshed completed with {error_count} failed cells out of {rows * cols}")
+    if failed_chunks > 0:
+        logger.warning(f"Viewshed completed with {failed_chunks} failed chunks ({len(target_r)} cells in range)")
             
     return grid, lats, lons
 
+def _radial_visibility(tile_manager, tx_lat, tx_lon, tx_h, rx_h, radius_m, res_m, cell_dist, cell_lat, cell_lon,
+                       clutter_height=0.0, clutter_mode='auto'):
+    """
+    Line-of-sight for cells by nearest ray/step of a radial horizon sweep.
+    Returns: (N,) bool per cell.
+    """
+    n_rays = min(VIEWSHED_MAX_RAYS, max(8, int(math.ceil(2 * math.pi * radius_m / res_m))))
+    n_steps = max(1, int(math.ceil(radius_m / res_m)))
+    bearings = np.arange(n_rays) * (360.0 / n_rays)
+    dists = np.arange(1, n_steps + 1) * (radius_m / n_steps)
+
+    ray_lats, ray_lons = geodesy.destination_point(tx_lat, tx_lon, bearings[:, None], dists[None, :])
+    heights = tile_manager.sample_elevations(ray_lats, ray_lons)
+    clutter = tile_manager.sample_clutter(ray_lats, ray_lons, clutter_height, clutter_mode)
+    ground = float(tile_manager.sample_elevations(np.array([tx_lat]), np.array([tx_lon]))[0])
+
+    visible = kernels.horizon_sweep(
+        heights, dists, ground + tx_h, rx_h, VIEWSHED_K_FACTOR * geodesy.EARTH_RADIUS_M, clutter
+    )
+
+    cell_bearing = geodesy.initial_bearing(tx_lat, tx_lon, cell_lat, cell_lon)
+    ray = np.rint(cell_bearing / (360.0 / n_rays)).astype(np.intp) % n_rays
+    step = np.clip(np.rint(cell_dist / (radius_m / n_steps)).astype(np.intp) - 1, 0, n_steps - 1)
+    return visible[ray, step]
+
 def greedy_coverage(tile_manager, candidates, n_select, radius_m=5000, rx_h=2.0, freq_mhz=915.0, model='bullington'):
     """
     Select N nodes that maximize coverage area.
@@ -138,3 +206,189 @@ def greedy_coverage(tile_manager, candidates, n_select, radius_m=5000, rx_h=2.0,
             break
             
     return [candidates[i] for i in selected_indices]
+
+def relay_candidates(tile_manager, lat1, lon1, lat2, lon2, max_candidates=RELAY_MAX_CANDIDATES, buffer_m=None):
+    """
+    Hilltop cells in a corridor around two sites, for relay routing.
+    The bbox spans both sites plus buffer_m (default: a quarter of their
+    separation, at least 2 km). Local maxima are ranked by height above their
+    neighbourhood mean; a sparse lattice of cells is added so flat terrain
+    still yields candidates.
+    Returns: (lats, lons, elevations), best first.
+    """
+    dist = float(geodesy.haversine(lat1, lon1, lat2, lon2))
+    if buffer_m is None:
+        buffer_m = max(2000.0, dist / 4)
+    mid_lat = (lat1 + lat2) / 2.0
+    dlat = buffer_m / 111320.0
+    dlon = buffer_m / (111320.0 * max(0.01, math.cos(math.radians(mid_lat))))
+    min_lat, max_lat = min(lat1, lat2) - dlat, max(lat1, lat2) + dlat
+    min_lon, max_lon = min(lon1, lon2) - dlon, max(lon1, lon2) + dlon
+
+    height_m = (max_lat - min_lat) * 111320.0
+    width_m = (max_lon - min_lon) * 111320.0 * max(0.01, math.cos(math.radians(mid_lat)))
+    res_m = max(tile_manager.effective_resolution_m(mid_lat), max(height_m, width_m) / (RELAY_GRID_DIM - 1))
+    elev, (west, d_lon, _, north, _, neg_dlat) = tile_manager.get_elevation_window(
+        min_lat, min_lon, max_lat, max_lon, resolution_m=res_m
+    )
+    rows, cols = elev.shape
+    lats = north + np.arange(rows) * neg_dlat
+    lons = west + np.arange(cols) * d_lon
+
+    size = max(3, 2 * int(round(RELAY_PEAK_RADIUS_M / res_m)) + 1)
+    prominence = elev - scipy.ndimage.uniform_filter(elev, size=size, mode='nearest')
+    peaks = (elev == scipy.ndimage.maximum_filter(elev, size=size, mode='nearest')) & (prominence > 0)
+    lattice = np.zeros_like(peaks)
+    lattice[size // 2::size, size // 2::size] = True
+
+    r, c = np.nonzero(peaks | lattice)
+    # Peaks first by prominence, then lattice cells by elevation
+    order = np.lexsort((-elev[r, c], -np.where(peaks[r, c], prominence[r, c], -np.inf)))[:max_candidates]
+    r, c = r[order], c[order]
+    return lats[r], lons[c], elev[r, c]
+
+class RelayLinks:
+    """
+    Lazily evaluated links between relay graph nodes.
+    evaluate() batches every uncached pair into one profile lookup and one
+    vectorized clearance/path-loss pass; results are memoized per unordered
+    pair, so a link is analysed at most once per search.
+    """
+
+    def __init__(self, tile_manager, lats, lons, heights, freq_mhz, model='bullington',
+                 environment='suburban', k_factor=1.333, clutter_height=0.0, clutter_mode='auto'):
+        self.tile_manager = tile_manager
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.heights = np.asarray(heights, dtype=np.float64)
+        self.freq_mhz = freq_mhz
+        self.model = model
+        self.environment = environment
+        self.k_factor = k_factor
+        self.clutter_height = clutter_height
+        self.clutter_mode = clutter_mode
+        self.resolution_m = tile_manager.effective_resolution_m(float(np.mean(self.lats)))
+        self.cache = {}  # (a, b), a < b -> (min_clearance_ratio, path_loss_db, dist_m)
+
+    def evaluate(self, u, targets):
+        """
+        Returns: {v: (min_clearance_ratio, path_loss_db, dist_m)} for every target.
+        """
+        pairs = {v: (min(u, v), max(u, v)) for v in targets}
+        todo = [pair for pair in set(pairs.values()) if pair not in self.cache]
+        if todo:
+            a = np.array([p[0] for p in todo], dtype=np.intp)
+            b = np.array([p[1] for p in todo], dtype=np.intp)
+            dist = geodesy.haversine(self.lats[a], self.lons[a], self.lats[b], self.lons[b])
+            samples = band_samples(plan_samples(dist, self.resolution_m, purpose="matrix"))
+            groups = self.tile_manager.get_elevation_profile_groups(
+                self.lats[a], self.lons[a], self.lats[b], self.lons[b], samples,
+                clutter_height=self.clutter_height, clutter_mode=self.clutter_mode
+            )
+            for idx, profiles, clutter in groups:
+                ratios = rf_physics.min_clearance_ratio_batch(
+                    profiles, dist[idx], self.freq_mhz, self.heights[a[idx]], self.heights[b[idx]],
+                    k_factor=self.k_factor, clutter_height=clutter
+                )
+                losses = rf_physics.calculate_path_loss_batch(
+                    dist[idx], profiles, self.freq_mhz, self.heights[a[idx]], self.heights[b[idx]],
+                    model=self.model, environment=self.environment,
+                    k_factor=self.k_factor, clutter_height=clutter
+                )
+                for row, k in enumerate(idx):
+                    self.cache[todo[k]] = (float(ratios[row]), float(losses[row]), float(dist[k]))
+        return {v: self.cache[pair] for v, pair in pairs.items()}
+
+def find_relay_chain(tile_manager, source, target, freq_mhz, relay_height=10.0, max_link_m=20000.0,
+                     max_hops=6, objective='hops', min_clearance_ratio=0.6, max_path_loss_db=None,
+                     model='bullington', environment='suburban', k_factor=1.333, clutter_height=0.0,
+                     clutter_mode='auto', max_candidates=RELAY_MAX_CANDIDATES):
+    """
+    Best chain of relay sites linking source to target.
+    source, target: (lat, lon, antenna_height_m).
+    objective: 'hops' - fewest links (A*, heuristic = remaining distance / max_link_m),
+               ties broken by the worst link's path loss;
+               'loss' - smallest worst-link path loss (bottleneck Dijkstra), ties by hops.
+    A link is usable when min_clearance_ratio and max_path_loss_db (if set) are met.
+    Links are only analysed when their first endpoint is expanded, in one batch.
+    Returns: {chain, links, hops, worst_path_loss_db, candidates, evaluated_links} or None.
+    """
+    if objective not in ('hops', 'loss'):
+        raise ValueError(f"Unknown relay objective: {objective}")
+
+    cand_lats, cand_lons, _ = relay_candidates(
+        tile_manager, source[0], source[1], target[0], target[1], max_candidates=max_candidates
+    )
+    # Node 0 = source, 1 = target, 2.. = candidates
+    lats = np.concatenate([[source[0], target[0]], cand_lats])
+    lons = np.concatenate([[source[1], target[1]], cand_lons])
+    heights = np.concatenate([[source[2], target[2]], np.full(len(cand_lats), float(relay_height))])
+    links = RelayLinks(tile_manager, lats, lons, heights, freq_mhz, model=model, environment=environment,
+                       k_factor=k_factor, clutter_height=clutter_height, clutter_mode=clutter_mode)
+
+    # Admissible: every link covers at most max_link_m
+    remaining = np.ceil(geodesy.haversine(lats, lons, target[0], target[1]) / max_link_m).astype(int)
+    remaining[1] = 0
+
+    def label(hops, worst):
+        return (hops, worst) if objective == 'hops' else (worst, hops)
+
+    best = {0: label(0, -math.inf)}
+    parent = {}
+    settled = set()
+    heap = [(label(remaining[0], -math.inf), 0, 0, -math.inf)]
+    while heap:
+        _, u, hops, worst = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        if u == 1:
+            break
+        if hops >= max_hops:
+            continue
+
+        dist_u = geodesy.haversine(lats[u], lons[u], lats, lons)
+        reachable = (dist_u <= max_link_m) & (hops + 1 + remaining <= max_hops)
+        targets = [int(v) for v in np.nonzero(reachable)[0] if v != u and v not in settled]
+        for v, (ratio, loss, _) in links.evaluate(u, targets).items():
+            if ratio < min_clearance_ratio or (max_path_loss_db is not None and loss > max_path_loss_db):
+                continue
+            g = label(hops + 1, max(worst, loss))
+            if v in best and best[v] <= g:
+                continue
+            best[v] = g
+            parent[v] = u
+            f = label(hops + 1 + remaining[v], max(worst, loss)) if objective == 'hops' else g
+            heapq.heappush(heap, (f, v, hops + 1, max(worst, loss)))
+
+    if 1 not in settled:
+        return None
+
+    path = [1]
+    while path[-1] != 0:
+        path.append(parent[path[-1]])
+    path.reverse()
+
+    elevations = tile_manager.sample_elevations(lats[path], lons[path])
+    chain = []
+    for n, (node, elev) in enumerate(zip(path, elevations)):
+        role = 'source' if node == 0 else 'target' if node == 1 else 'relay'
+        chain.append({
+            "lat": float(lats[node]), "lon": float(lons[node]), "elevation": float(elev),
+            "height": float(heights[node]), "role": role,
+        })
+    hops_out = []
+    for u, v in zip(path, path[1:]):
+        ratio, loss, dist = links.evaluate(u, [v])[v]
+        hops_out.append({
+            "dist_km": dist / 1000, "min_clearance_ratio": ratio, "path_loss_db": loss,
+            "status": str(rf_physics.link_status(ratio)),
+        })
+    return {
+        "chain": chain,
+        "links": hops_out,
+        "hops": len(hops_out),
+        "worst_path_loss_db": max(l["path_loss_db"] for l in hops_out),
+        "candidates": len(cand_lats),
+        "evaluated_links": len(links.cache),
+    }
@@ -0,0 +1,221 @@
+import math
+
+import numpy as np
+import scipy.ndimage
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from core import geodesy, total_viewshed
+
+# Coverage-gap analysis of an existing network (e.g. the live MeshCore nodes).
+#
+# Each node's coverage is a polar visibility table: n_rays x n_steps booleans
+# from a radial horizon sweep (total_viewshed.ray_visibility). The table does
+# not depend on the region being analysed, so it can be cached per node
+# position and rasterised onto any region grid afterwards.
+#
+# Nodes are grouped into blocks of BLOCK_RADII x radius; every node of a block
+# reads its rays from one shared terrain window (block bbox plus the radius),
+# so neighbouring nodes reuse the same tiles instead of each sampling its own.
+# Within a block, node chunks run on an executor (the Numba sweep releases the
+# GIL).
+
+MAX_GRID_CELLS = 1_000_000  # Region coverage grid cap
+MAX_RAYS = 720
+BLOCK_RADII = 4
+NODE_CHUNK = 16
+MAX_GAPS = 50
+
+
+def ray_count(radius_m, resolution_m):
+    """
+    Rays per node so that adjacent rays are about one resolution_m apart at
+    the edge of the radius.
+    """
+    return int(min(MAX_RAYS, max(total_viewshed.DEFAULT_RAYS, math.ceil(2 * math.pi * radius_m / resolution_m))))
+
+
+def table_shape(radius_m, resolution_m):
+    """
+    (rays, steps) of a node's polar visibility table.
+    """
+    n_rays = ray_count(radius_m, resolution_m)
+    return n_rays, len(total_viewshed.ray_layout(radius_m, resolution_m, n_rays)[1])
+
+
+def node_blocks(lats, lons, radius_m):
+    """
+    Node indices grouped into square blocks of BLOCK_RADII * radius_m.
+    Returns: list of index arrays.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if lats.size == 0:
+        return []
+    block_m = BLOCK_RADII * radius_m
+    mid_lat = float(lats.mean())
+    rows = np.floor(lats * 111320.0 / block_m).astype(np.int64)
+    cols = np.floor(lons * 111320.0 * max(0.01, math.cos(math.radians(mid_lat))) / block_m).astype(np.int64)
+    _, block = np.unique(np.stack((rows, cols), axis=1), axis=0, return_inverse=True)
+    block = block.reshape(-1)
+    return [np.flatnonzero(block == b) for b in range(block.max() + 1)]
+
+
+def block_visibility(tile_manager, lats, lons, heights, radius_m, resolution_m, rx_h=2.0,
+                     k_factor=total_viewshed.K_FACTOR, clutter_height=0.0, clutter_mode='auto',
+                     executor=None, chunk=NODE_CHUNK, cancel_check=None):
+    """
+    Polar visibility of every node, one block (shared terrain window) at a time.
+    executor: optional concurrent.futures executor for the node chunks of a block.
+    cancel_check: called before every chunk; raise from it to abort.
+    Yields: (node indices, visible (n, R, S) bool) per block.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    heights = np.broadcast_to(np.asarray(heights, dtype=np.float64), lats.shape)
+    n_rays = ray_count(radius_m, resolution_m)
+
+    def clutter(sample_lats, sample_lons):
+        return tile_manager.sample_clutter(sample_lats, sample_lons, clutter_height, clutter_mode)
+
+    for idx in node_blocks(lats, lons, radius_m):
+        if cancel_check is not None:
+            cancel_check()
+        elevation, transform = total_viewshed.terrain_window(
+            tile_manager, lats[idx].min(), lons[idx].min(), lats[idx].max(), lons[idx].max(), radius_m
+        )
+
+        def run(start):
+            if cancel_check is not None:
+                cancel_check()
+            part = idx[start:start + chunk]
+            visible, _ = total_viewshed.ray_visibility(
+                elevation, transform, lats[part], lons[part], heights[part], radius_m, rx_h, n_rays,
+                k_factor, resolution_m=resolution_m, clutter=clutter
+            )
+            return visible
+
+        starts = range(0, len(idx), chunk)
+        parts = executor.map(run, starts) if executor is not None else map(run, starts)
+        yield idx, np.concatenate(list(parts))
+
+
+def region_grid(south, west, north, east, resolution_m):
+    """
+    Cell centres of the coverage grid over the bbox, north-up, at about
+    resolution_m (coarsened to stay under MAX_GRID_CELLS).
+    Returns: (lat_axis (rows,), lon_axis (cols,), cell_area_km2)
+    """
+    mid_lat = (south + north) / 2.0
+    height_m = (north - south) * 111320.0
+    width_m = (east - west) * 111320.0 * max(0.01, math.cos(math.radians(mid_lat)))
+    spacing = max(resolution_m, math.sqrt(height_m * width_m / MAX_GRID_CELLS))
+    grid_dim = max(1, int(math.ceil(max(height_m, width_m) / spacing)))
+    lat_grid, lon_grid = total_viewshed.observer_grid(south, west, north, east, grid_dim)
+    lat_axis, lon_axis = lat_grid[:, 0], lon_grid[0, :]
+    cell_area_km2 = (height_m / len(lat_axis)) * (width_m / len(lon_axis)) / 1e6
+    return lat_axis, lon_axis, cell_area_km2
+
+
+def coverage_count(visibility, lats, lons, radius_m, lat_axis, lon_axis):
+    """
+    Number of nodes covering each region cell.
+    visibility: (N, R, S) polar tables from block_visibility, rays clockwise
+    from north and steps of radius_m / S.
+    Returns: (rows, cols) uint16
+    """
+    count = np.zeros((len(lat_axis), len(lon_axis)), dtype=np.uint16)
+    if len(visibility) == 0:
+        return count
+    n_rays, n_steps = visibility.shape[1:]
+    step_m = radius_m / n_steps
+    # lat_axis runs north to south
+    neg_lats = -lat_axis
+
+    for visible, lat, lon in zip(visibility, lats, lons):
+        m_per_dlon = 111320.0 * max(0.01, math.cos(math.radians(lat)))
+        dlat = radius_m / 111320.0
+        dlon = radius_m / m_per_dlon
+        r0, r1 = np.searchsorted(neg_lats, [-(lat + dlat), -(lat - dlat)], side="left")
+        c0, c1 = np.searchsorted(lon_axis, [lon - dlon, lon + dlon], side="left")
+        if r1 <= r0 or c1 <= c0:
+            continue
+        north_m = (lat_axis[r0:r1, None] - lat) * 111320.0
+        east_m = (lon_axis[None, c0:c1] - lon) * m_per_dlon
+        dist = np.hypot(north_m, east_m)
+        ray = np.rint(np.arctan2(east_m, north_m) % (2 * np.pi) / (2 * np.pi / n_rays)).astype(np.intp) % n_rays
+        step = np.clip(np.rint(dist / step_m).astype(np.intp) - 1, 0, n_steps - 1)
+        count[r0:r1, c0:c1] += (visible[ray, step] & (dist <= radius_m)).astype(np.uint16)
+    return count
+
+
+def find_gaps(count, lat_axis, lon_axis, cell_area_km2, node_lats, node_lons, min_gap_km2=1.0, max_gaps=MAX_GAPS):
+    """
+    Connected uncovered areas of the region grid (8-connected), largest first.
+    Returns: (gaps, labels) - gaps as dicts {area_km2, centroid, bounds,
+    nearest_node_km}; labels the (rows, cols) component id of each cell
+    (0 for covered cells and gaps smaller than min_gap_km2).
+    """
+    labels, n = scipy.ndimage.label(count == 0, structure=np.ones((3, 3), dtype=bool))
+    if n == 0:
+        return [], labels
+    sizes = np.bincount(labels.ravel(), minlength=n + 1)
+    sizes[0] = 0
+    kept = np.flatnonzero(sizes * cell_area_km2 >= min_gap_km2)
+    small = np.ones(n + 1, dtype=bool)
+    small[kept] = False
+    labels[small[labels]] = 0
+
+    kept = kept[np.argsort(-sizes[kept], kind="stable")][:max_gaps]
+    centres = scipy.ndimage.center_of_mass(labels > 0, labels, kept) if len(kept) else []
+    slices = scipy.ndimage.find_objects(labels)
+    rows_idx = np.arange(len(lat_axis))
+    cols_idx = np.arange(len(lon_axis))
+
+    gaps = []
+    for label, (r, c) in zip(kept, centres):
+        lat = float(np.interp(r, rows_idx, lat_axis))
+        lon = float(np.interp(c, cols_idx, lon_axis))
+        rs, cs = slices[label - 1]
+        nearest = geodesy.haversine(lat, lon, np.asarray(node_lats), np.asarray(node_lons))
+        gaps.append({
+            "area_km2": round(float(sizes[label] * cell_area_km2), 2),
+            "centroid": {"lat": round(lat, 6), "lon": round(lon, 6)},
+            "bounds": {
+                "north": round(float(lat_axis[rs.start]), 6), "south": round(float(lat_axis[rs.stop - 1]), 6),
+                "west": round(float(lon_axis[cs.start]), 6), "east": round(float(lon_axis[cs.stop - 1]), 6),
+            },
+            "nearest_node_km": round(float(nearest.min()) / 1000, 2) if np.size(nearest) else None,
+        })
+    return gaps, labels
+
+
+def partitions(links, lats, lons):
+    """
+    Connected components of the link graph, largest first.
+    links: (N, N) symmetric bool matrix of usable links.
+    Returns: list of {nodes, size, centroid, nearest_km}, where nearest_km is
+    the shortest distance from any member to a node of another partition
+    (None when there is a single partition).
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    if n == 0:
+        return []
+    n_parts, part = connected_components(csr_matrix(links), directed=False)
+    order = sorted(range(n_parts), key=lambda p: (-int(np.sum(part == p)), int(np.argmax(part == p))))
+    dist = geodesy.haversine(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+    result = []
+    for p in order:
+        members = np.flatnonzero(part == p)
+        others = part != p
+        nearest = dist[np.ix_(members, np.flatnonzero(others))]
+        result.append({
+            "nodes": members.tolist(),
+            "size": int(members.size),
+            "centroid": {"lat": round(float(lats[members].mean()), 6), "lon": round(float(lons[members].mean()), 6)},
+            "nearest_km": round(float(nearest.min()) / 1000, 2) if nearest.size else None,
+        })
+    return result
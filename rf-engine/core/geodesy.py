@@ -0,0 +1,91 @@
+import numpy as np
+from rf_physics import EARTH_RADIUS_KM
+
+# Vectorized spherical geodesy shared by profile, viewshed and optimizer code.
+# All functions broadcast over NumPy arrays (scalars work too).
+
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000.0
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in meters.
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.asarray(lon2, dtype=np.float64) - lon1)
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    """
+    Initial great-circle bearing in degrees (0 = north, clockwise).
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dlambda = np.radians(np.asarray(lon2, dtype=np.float64) - lon1)
+
+    y = np.sin(dlambda) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def destination_point(lat, lon, bearing_deg, dist_m):
+    """
+    Point reached travelling dist_m along a great circle from (lat, lon).
+    Returns: (lat, lon) in degrees, lon normalised to [-180, 180).
+    """
+    phi1 = np.radians(lat)
+    lambda1 = np.radians(lon)
+    theta = np.radians(bearing_deg)
+    delta = np.asarray(dist_m, dtype=np.float64) / EARTH_RADIUS_M
+
+    sin_phi2 = np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(theta)
+    phi2 = np.arcsin(np.clip(sin_phi2, -1.0, 1.0))
+    lambda2 = lambda1 + np.arctan2(
+        np.sin(theta) * np.sin(delta) * np.cos(phi1),
+        np.cos(delta) - np.sin(phi1) * sin_phi2
+    )
+    lon2 = (np.degrees(lambda2) + 540.0) % 360.0 - 180.0
+    return np.degrees(phi2), lon2
+
+
+def great_circle_points(lat1, lon1, lat2, lon2, samples):
+    """
+    Evenly spaced points (by arc length) along the great circle between endpoints.
+
+    Endpoints broadcast against each other, so one call generates thousands of
+    paths: inputs of shape (N,) return (lats, lons) of shape (N, samples).
+    The first and last samples are exactly the endpoints.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (lat1, lon1, lat2, lon2))
+    )
+    f = np.linspace(0.0, 1.0, samples)
+    shape = lat1.shape + (1,)
+
+    phi1, lambda1 = np.radians(lat1).reshape(shape), np.radians(lon1).reshape(shape)
+    phi2, lambda2 = np.radians(lat2).reshape(shape), np.radians(lon2).reshape(shape)
+    delta = (haversine(lat1, lon1, lat2, lon2) / EARTH_RADIUS_M).reshape(shape)
+
+    # Spherical linear interpolation; degenerate (coincident) paths fall back to linear weights
+    sin_delta = np.sin(delta)
+    safe = sin_delta > 1e-12
+    denom = np.where(safe, sin_delta, 1.0)
+    a = np.where(safe, np.sin((1.0 - f) * delta) / denom, 1.0 - f)
+    b = np.where(safe, np.sin(f * delta) / denom, f)
+
+    x = a * np.cos(phi1) * np.cos(lambda1) + b * np.cos(phi2) * np.cos(lambda2)
+    y = a * np.cos(phi1) * np.sin(lambda1) + b * np.cos(phi2) * np.sin(lambda2)
+    z = a * np.sin(phi1) + b * np.sin(phi2)
+
+    lats = np.degrees(np.arctan2(z, np.sqrt(x * x + y * y)))
+    lons = np.degrees(np.arctan2(y, x))
+
+    # Pin endpoints exactly (avoids round-off drift at the antenna sites)
+    lats[..., 0], lons[..., 0] = lat1, lon1
+    lats[..., -1], lons[..., -1] = lat2, lon2
+    return lats, lons
@@ -0,0 +1,420 @@
+import math
+import os
+
+import numpy as np
+
+# Inner loops that run sequentially along each path or ray.
+#
+# Numba is optional: when it is installed (and MESHRF_DISABLE_NUMBA is unset),
+# the kernels are compiled with nogil + parallel, so they release the GIL for
+# the thread pools and spread paths/rays across cores with prange. Otherwise
+# the NumPy versions below are used; they give the same results, but build
+# (N, S) temporaries for every intermediate.
+#
+# The path kernels take (N, S) float64 profiles sampled evenly from TX
+# (column 0) to RX (column S-1), like rf_physics.analyze_link, and clutter
+# heights broadcast to the same shape (a zero-stride view for a uniform value).
+
+try:
+    if os.environ.get("MESHRF_DISABLE_NUMBA"):
+        raise ImportError("disabled by MESHRF_DISABLE_NUMBA")
+    import numba
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+    # TBB (numba's first choice) can hang at interpreter exit once the process
+    # has forked (multiprocessing, Celery prefork); OpenMP is thread-safe and
+    # does not. NUMBA_THREADING_LAYER still overrides.
+    if "NUMBA_THREADING_LAYER" not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Deygout recursion depth: 1 is the single main edge (Bullington's max v),
+# 2 adds one sub-edge on each side of it (3 edges, as in ITU-R P.526).
+DEYGOUT_MAX_DEPTH = 2
+
+
+def _as_paths(values, n_paths):
+    return np.ascontiguousarray(np.broadcast_to(np.asarray(values, dtype=np.float64), (n_paths,)))
+
+
+def _as_samples(values, shape):
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), shape)
+
+
+# --- NumPy implementations (reference + fallback) ---
+
+def _min_clearance_ratio_np(elevs, dist_m, tx_h, rx_h, wavelength, r_eff, clutter):
+    num_points = elevs.shape[1]
+    frac = np.linspace(0.0, 1.0, num_points)[None, :]
+    dist = dist_m[:, None]
+    d1 = dist * frac
+    d2 = dist - d1
+
+    terrain_h = elevs + (d1 * d2) / (2 * r_eff) + clutter
+    tx_alt = elevs[:, :1] + tx_h[:, None]
+    rx_alt = elevs[:, -1:] + rx_h[:, None]
+    clearance = tx_alt + (rx_alt - tx_alt) * frac - terrain_h
+
+    valid = (d1 >= 1) & (d2 >= 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f1 = np.sqrt(wavelength * d1 * d2 / dist)
+        ratio = np.where(valid, clearance / f1, np.inf)
+
+    min_ratio = np.minimum(ratio.min(axis=1), 100.0)
+    return np.where(valid.any(axis=1), min_ratio, 0.0)
+
+
+def _max_knife_edge_v_np(elevs, dist_m, tx_h, rx_h, wavelength, r_eff, clutter):
+    num_points = elevs.shape[1]
+    frac = np.linspace(0.0, 1.0, num_points)[None, :]
+    dist = dist_m[:, None]
+    d1 = dist * frac
+    d2 = dist - d1
+
+    tx_alt = elevs[:, :1] + tx_h[:, None]
+    rx_alt = elevs[:, -1:] + rx_h[:, None]
+    h_vec = elevs + (d1 * d2) / (2 * r_eff) + clutter - (tx_alt + (rx_alt - tx_alt) * frac)
+
+    valid = (d1 > 1.0) & (d2 > 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        geom = np.sqrt((2 * dist) / (wavelength * d1 * d2))
+        v_vec = np.where(valid, h_vec * geom, -np.inf)
+    return v_vec.max(axis=1)
+
+
+def _knife_edge_db_np(v):
+    term = v - 0.1
+    with np.errstate(invalid='ignore'):
+        loss = 6.9 + 20 * np.log10(np.sqrt(term * term + 1) + term)
+    return np.where(v > -0.78, np.maximum(loss, 0.0), 0.0)
+
+
+def _deygout_np(elevs, dist_m, tx_h, rx_h, wavelength, r_eff, clutter, max_depth):
+    # Breadth-first over the recursion: level l holds 2**l segments per path
+    # as (start, end) sample indices. A segment without an edge above
+    # v = -0.78 becomes two empty (start == end) children, which have no
+    # interior samples and add 0 dB.
+    n_paths, num_points = elevs.shape
+    index = np.arange(num_points)
+    x = dist_m[:, None] * np.linspace(0.0, 1.0, num_points)[None, :]
+    h = elevs + x * (dist_m[:, None] - x) / (2 * r_eff) + clutter
+    h[:, 0] = elevs[:, 0] + tx_h
+    h[:, -1] = elevs[:, -1] + rx_h
+
+    start = np.zeros((n_paths, 1), dtype=np.intp)
+    end = np.full((n_paths, 1), num_points - 1, dtype=np.intp)
+    loss = np.zeros(n_paths)
+    for _ in range(max_depth):
+        xa, xb = np.take_along_axis(x, start, 1)[..., None], np.take_along_axis(x, end, 1)[..., None]
+        ha, hb = np.take_along_axis(h, start, 1)[..., None], np.take_along_axis(h, end, 1)[..., None]
+        d1 = x[:, None, :] - xa
+        d2 = xb - x[:, None, :]
+        inside = (index > start[..., None]) & (index < end[..., None]) & (d1 > 1.0) & (d2 > 1.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            height = h[:, None, :] - (ha + (hb - ha) * d1 / (xb - xa))
+            v = np.where(inside, height * np.sqrt(2 * (xb - xa) / (wavelength * d1 * d2)), -np.inf)
+
+        edge = np.argmax(v, axis=2)
+        v_edge = np.take_along_axis(v, edge[..., None], 2)[..., 0]
+        loss += _knife_edge_db_np(v_edge).sum(axis=1)
+
+        # Children (start, edge) and (edge, end); without a split, the empty
+        # (start, start) and (end, end)
+        split = v_edge > -0.78
+        start, end = (
+            np.concatenate([start, np.where(split, edge, end)], axis=1),
+            np.concatenate([np.where(split, edge, start), end], axis=1),
+        )
+    return loss
+
+
+def _horizon_sweep_np(heights, dists, tx_alt, rx_h, r_eff, clutter):
+    # Elevation angle proxy (rise over run, curvature as drop from the tangent)
+    drop = dists * dists / (2 * r_eff)
+    terrain_slope = (heights + clutter - drop - tx_alt[:, None]) / dists
+    target_slope = (heights + rx_h - drop - tx_alt[:, None]) / dists
+    horizon = np.maximum.accumulate(terrain_slope, axis=1)
+    # Compare against the horizon of the samples strictly before each one
+    prior = np.empty_like(horizon)
+    prior[:, 0] = -np.inf
+    prior[:, 1:] = horizon[:, :-1]
+    return target_slope >= prior
+
+
+def _key_col_sweep_py(elev, order, n_cols):
+    # Union-find over cells in descending elevation order. Each new cell joins
+    # its already-inserted 8-neighbours; when two components meet, the one with
+    # the lower summit ends there, at the col. Components are identified by
+    # their summit cell; rank (position in order) breaks elevation ties.
+    n = elev.size
+    rank = np.empty(n, dtype=np.int64)
+    for k in range(n):
+        rank[order[k]] = k
+    parent = np.full(n, -1, dtype=np.int64)  # -1: not inserted yet
+    summit = np.empty(n, dtype=np.int64)     # per root: highest cell of the component
+    joined = np.empty(n, dtype=np.int64)     # per cell: summit it was attached to
+    col = np.empty(n)                        # per summit: elevation where it was absorbed
+    absorbed_by = np.empty(n, dtype=np.int64)  # per summit: summit of the component it joined
+    n_rows = n // n_cols
+
+    for k in range(n):
+        i = order[k]
+        parent[i] = i
+        summit[i] = i
+        root = i
+        r, c = i // n_cols, i % n_cols
+        for dr in range(-1, 2):
+            for dc in range(-1, 2):
+                nr, nc = r + dr, c + dc
+                if (dr == 0 and dc == 0) or nr < 0 or nr >= n_rows or nc < 0 or nc >= n_cols:
+                    continue
+                j = nr * n_cols + nc
+                if parent[j] < 0:
+                    continue
+                while parent[j] != j:  # find, with path halving
+                    parent[j] = parent[parent[j]]
+                    j = parent[j]
+                if j == root:
+                    continue
+                if rank[summit[j]] < rank[summit[root]]:
+                    high, low = j, root
+                else:
+                    high, low = root, j
+                col[summit[low]] = elev[i]
+                absorbed_by[summit[low]] = summit[high]
+                parent[low] = high
+                root = high
+        joined[i] = summit[root]
+
+    # The highest summit never meets higher ground: its col is the window minimum
+    top = order[0]
+    col[top] = elev[order[n - 1]]
+    out = np.empty(n)
+    for i in range(n):
+        # A cell level with its hill's col (plateaus, saddles) belongs to the
+        # hill that absorbed it
+        s = joined[i]
+        while s != top and col[s] >= elev[i]:
+            s = absorbed_by[s]
+        out[i] = col[s]
+    return out
+
+
+# --- Numba implementations ---
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, nogil=True, cache=True)
+    def _min_clearance_ratio_nb(elevs, dist_m, tx_h, rx_h, wavelength, r_eff, clutter):
+        n_paths, num_points = elevs.shape
+        out = np.empty(n_paths)
+        step = 1.0 / (num_points - 1) if num_points > 1 else 0.0
+        for p in prange(n_paths):
+            dist = dist_m[p]
+            tx_alt = elevs[p, 0] + tx_h[p]
+            rx_alt = elevs[p, num_points - 1] + rx_h[p]
+            best = np.inf
+            evaluated = False
+            for i in range(num_points):
+                frac = i * step
+                d1 = dist * frac
+                d2 = dist - d1
+                if d1 < 1 or d2 < 1:
+                    continue
+                evaluated = True
+                terrain = elevs[p, i] + (d1 * d2) / (2 * r_eff) + clutter[p, i]
+                clearance = tx_alt + (rx_alt - tx_alt) * frac - terrain
+                ratio = clearance / math.sqrt(wavelength * d1 * d2 / dist)
+                if ratio < best:
+                    best = ratio
+            out[p] = min(best, 100.0) if evaluated else 0.0
+        return out
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _max_knife_edge_v_nb(elevs, dist_m, tx_h, rx_h, wavelength, r_eff, clutter):
+        n_paths, num_points = elevs.shape
+        out = np.empty(n_paths)
+        step = 1.0 / (num_points - 1) if num_points > 1 else 0.0
+        for p in prange(n_paths):
+            dist = dist_m[p]
+            tx_alt = elevs[p, 0] + tx_h[p]
+            rx_alt = elevs[p, num_points - 1] + rx_h[p]
+            best = -np.inf
+            for i in range(num_points):
+                frac = i * step
+                d1 = dist * frac
+                d2 = dist - d1
+                if d1 <= 1.0 or d2 <= 1.0:
+                    continue
+                h = elevs[p, i] + (d1 * d2) / (2 * r_eff) + clutter[p, i] - (tx_alt + (rx_alt - tx_alt) * frac)
+                v = h * math.sqrt((2 * dist) / (wavelength * d1 * d2))
+                if v > best:
+                    best = v
+            out[p] = best
+        return out
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _horizon_sweep_nb(heights, dists, tx_alt, rx_h, r_eff, clutter):
+        n_rays, n_steps = heights.shape
+        visible = np.zeros((n_rays, n_steps), dtype=np.bool_)
+        for r in prange(n_rays):
+            horizon = -np.inf
+            for j in range(n_steps):
+                drop = dists[j] * dists[j] / (2 * r_eff)
+                base = heights[r, j] - drop - tx_alt[r]
+                visible[r, j] = (base + rx_h) / dists[j] >= horizon
+                slope = (base + clutter[r, j]) / dists[j]
+                if slope > horizon:
+                    horizon = slope
+        return visible
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _deygout_nb(elevs, dist_m, tx_h, rx_h, wavelength, r_eff, clutter, max_depth):
+        n_paths, num_points = elevs.shape
+        out = np.zeros(n_paths)
+        step = 1.0 / (num_points - 1) if num_points > 1 else 0.0
+        stack_size = 2 ** max_depth
+        for p in prange(n_paths):
+            dist = dist_m[p]
+            h = np.empty(num_points)
+            for i in range(num_points):
+                x = dist * i * step
+                h[i] = elevs[p, i] + x * (dist - x) / (2 * r_eff) + clutter[p, i]
+            h[0] = elevs[p, 0] + tx_h[p]
+            h[num_points - 1] = elevs[p, num_points - 1] + rx_h[p]
+
+            # Depth-first with an explicit stack of (start, end, depth)
+            seg_start = np.empty(stack_size, dtype=np.int64)
+            seg_end = np.empty(stack_size, dtype=np.int64)
+            seg_depth = np.empty(stack_size, dtype=np.int64)
+            seg_start[0], seg_end[0], seg_depth[0] = 0, num_points - 1, 1
+            top = 1
+            total = 0.0
+            while top > 0:
+                top -= 1
+                a, b, depth = seg_start[top], seg_end[top], seg_depth[top]
+                xa, xb = dist * a * step, dist * b * step
+                best, edge = -np.inf, -1
+                for i in range(a + 1, b):
+                    x = dist * i * step
+                    d1 = x - xa
+                    d2 = xb - x
+                    if d1 <= 1.0 or d2 <= 1.0:
+                        continue
+                    height = h[i] - (h[a] + (h[b] - h[a]) * d1 / (xb - xa))
+                    v = height * math.sqrt(2 * (xb - xa) / (wavelength * d1 * d2))
+                    if v > best:
+                        best, edge = v, i
+                if best <= -0.78:
+                    continue
+                term = best - 0.1
+                total += max(0.0, 6.9 + 20 * math.log10(math.sqrt(term * term + 1) + term))
+                if depth < max_depth:
+                    seg_start[top], seg_end[top], seg_depth[top] = a, edge, depth + 1
+                    seg_start[top + 1], seg_end[top + 1], seg_depth[top + 1] = edge, b, depth + 1
+                    top += 2
+            out[p] = total
+        return out
+
+    _key_col_sweep_nb = njit(nogil=True, cache=True)(_key_col_sweep_py)
+
+
+# --- Public API ---
+
+def min_clearance_ratio(elevs, dist_m, freq_mhz, tx_h, rx_h, r_eff, clutter_height=0.0):
+    """
+    Minimum (clearance / first Fresnel radius) per path; 100.0 cap and 0.0
+    when no sample is evaluated, as in analyze_link.
+    clutter_height: scalar, or per sample (broadcastable to elevs).
+    Returns: (N,) float64
+    """
+    elevs = np.ascontiguousarray(elevs, dtype=np.float64)
+    n_paths = elevs.shape[0]
+    args = (
+        elevs, _as_paths(dist_m, n_paths), _as_paths(tx_h, n_paths), _as_paths(rx_h, n_paths),
+        2.99792e8 / (freq_mhz * 1e6), float(r_eff), _as_samples(clutter_height, elevs.shape)
+    )
+    if NUMBA_AVAILABLE:
+        return _min_clearance_ratio_nb(*args)
+    return _min_clearance_ratio_np(*args)
+
+
+def max_knife_edge_v(elevs, dist_m, freq_mhz, tx_h, rx_h, r_eff, clutter_height=0.0):
+    """
+    Largest Fresnel-Kirchhoff v over each path (-inf when no interior sample).
+    clutter_height: scalar, or per sample (broadcastable to elevs).
+    Returns: (N,) float64
+    """
+    elevs = np.ascontiguousarray(elevs, dtype=np.float64)
+    n_paths = elevs.shape[0]
+    args = (
+        elevs, _as_paths(dist_m, n_paths), _as_paths(tx_h, n_paths), _as_paths(rx_h, n_paths),
+        2.99792e8 / (freq_mhz * 1e6), float(r_eff), _as_samples(clutter_height, elevs.shape)
+    )
+    if NUMBA_AVAILABLE:
+        return _max_knife_edge_v_nb(*args)
+    return _max_knife_edge_v_np(*args)
+
+
+def horizon_sweep(heights, dists, tx_alt, rx_h, r_eff, clutter=0.0):
+    """
+    Radial line-of-sight: walk each ray outward keeping the highest terrain
+    elevation angle seen so far. A sample is visible when a receiver rx_h
+    above it clears that horizon.
+    heights: (R, S) terrain along R rays; dists: (S,) increasing, > 0.
+    tx_alt: antenna altitude, scalar or (R,) (rays from several observers).
+    clutter: obstruction height on top of the terrain, scalar or (R, S); it
+             raises the horizon, receivers still stand on the ground.
+    Returns: (R, S) bool
+    """
+    heights = np.ascontiguousarray(heights, dtype=np.float64)
+    dists = np.ascontiguousarray(dists, dtype=np.float64)
+    args = (
+        heights, dists, _as_paths(tx_alt, heights.shape[0]), float(rx_h), float(r_eff),
+        _as_samples(clutter, heights.shape)
+    )
+    if NUMBA_AVAILABLE:
+        return _horizon_sweep_nb(*args)
+    return _horizon_sweep_np(*args)
+
+
+def deygout_loss(elevs, dist_m, freq_mhz, tx_h, rx_h, r_eff, clutter_height=0.0, max_depth=DEYGOUT_MAX_DEPTH):
+    """
+    Deygout multiple knife-edge diffraction loss (dB) per path: the edge
+    with the largest v over TX-RX, then recursively the largest edge of
+    each side (TX-edge, edge-RX), down to max_depth levels. Sub-paths end
+    on the edge's effective terrain height.
+    clutter_height: scalar, or per sample (broadcastable to elevs).
+    Returns: (N,) float64
+    """
+    if max_depth < 1:
+        raise ValueError("max_depth must be at least 1")
+    elevs = np.ascontiguousarray(elevs, dtype=np.float64)
+    n_paths = elevs.shape[0]
+    if elevs.shape[1] < 3:
+        return np.zeros(n_paths)
+    args = (
+        elevs, _as_paths(dist_m, n_paths), _as_paths(tx_h, n_paths), _as_paths(rx_h, n_paths),
+        2.99792e8 / (freq_mhz * 1e6), float(r_eff), _as_samples(clutter_height, elevs.shape), int(max_depth)
+    )
+    if NUMBA_AVAILABLE:
+        return _deygout_nb(*args)
+    return _deygout_np(*args)
+
+
+def key_col_levels(elevation):
+    """
+    Key col of every cell of a raster: the elevation at which the hill the
+    cell belongs to merges into higher ground. elevation - key_col is the
+    topographic prominence at summits and the height above that col on their
+    slopes (0 in pits). The highest summit's col is the raster minimum.
+    Returns: float64 array shaped like elevation.
+    """
+    elevation = np.asarray(elevation, dtype=np.float64)
+    flat = np.ascontiguousarray(elevation.ravel())
+    if flat.size == 0:
+        return np.zeros(elevation.shape)
+    order = np.argsort(-flat, kind="stable")
+    n_cols = elevation.shape[-1] if elevation.ndim > 1 else flat.size
+    sweep = _key_col_sweep_nb if NUMBA_AVAILABLE else _key_col_sweep_py
+    return sweep(flat, order, n_cols).reshape(elevation.shape)
@@ -0,0 +1,272 @@
+import numpy as np
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Popcount lookup for packed uint8 bitsets
+POPCOUNT_LUT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def pack_coverage(grid):
+    """
+    Pack a boolean coverage raster into a flat uint8 bitset.
+    """
+    return np.packbits(np.asarray(grid, dtype=bool).ravel())
+
+
+class SiteSelectionProblem:
+    """
+    Fixed-size subset selection over candidate sites.
+
+    Each individual is a (k,) array of candidate indices. Objectives are
+    returned in minimisation form: -coverage_km2, cost, -connectivity.
+    """
+
+    def __init__(self, coverage_bits, cell_area_km2, costs, link_matrix,
+                 objectives=None, max_cost=None, n_workers=4, chunk_size=16):
+        self.coverage_bits = np.ascontiguousarray(coverage_bits, dtype=np.uint8)
+        self.cell_area_km2 = float(cell_area_km2)
+        self.costs = np.asarray(costs, dtype=np.float64)
+        self.link_matrix = np.asarray(link_matrix, dtype=bool)
+        self.max_cost = max_cost
+        self.n_workers = max(1, int(n_workers))
+        self.chunk_size = max(1, int(chunk_size))
+
+        objectives = objectives or {"coverage": 1.0}
+        # Only objectives with a non-zero weight take part in the ranking
+        self.active = [name for name in ("coverage", "cost", "connectivity")
+                       if objectives.get(name, 0.0)]
+        if not self.active:
+            self.active = ["coverage"]
+
+    @property
+    def n_candidates(self):
+        return self.coverage_bits.shape[0]
+
+    def coverage_km2(self, pop):
+        """
+        Union coverage of every individual: OR the member bitsets and popcount.
+        """
+        union = np.bitwise_or.reduce(self.coverage_bits[pop], axis=1)
+        return POPCOUNT_LUT[union].sum(axis=1) * self.cell_area_km2
+
+    def cost(self, pop):
+        return self.costs[pop].sum(axis=1)
+
+    def connectivity(self, pop):
+        """
+        Fraction of selected nodes in the largest multi-hop connected component.
+        Uses batched boolean matrix squaring to get the transitive closure.
+        """
+        k = pop.shape[1]
+        if k <= 1:
+            return np.ones(pop.shape[0])
+
+        reach = self.link_matrix[pop[:, :, None], pop[:, None, :]]
+        reach = reach | np.eye(k, dtype=bool)[None, :, :]
+        reach = reach.astype(np.int32)
+        steps = 1
+        while steps < k:
+            reach = (np.matmul(reach, reach) > 0).astype(np.int32)
+            steps *= 2
+        return reach.sum(axis=2).max(axis=1) / float(k)
+
+    def _evaluate_chunk(self, pop):
+        coverage = self.coverage_km2(pop)
+        cost = self.cost(pop)
+        columns = []
+        for name in self.active:
+            if name == "coverage":
+                columns.append(-coverage)
+            elif name == "cost":
+                columns.append(cost)
+            elif name == "connectivity":
+                columns.append(-self.connectivity(pop))
+        objs = np.column_stack(columns)
+
+        if self.max_cost is not None:
+            violation = np.maximum(0.0, cost - float(self.max_cost))
+        else:
+            violation = np.zeros(len(pop))
+        return objs, violation
+
+    def evaluate(self, pop):
+        """
+        Evaluate a population in parallel chunks.
+        NumPy releases the GIL inside the bitwise/popcount kernels, so threads scale.
+        Returns: (objectives (P, M), constraint_violation (P,))
+        """
+        chunks = [pop[i:i + self.chunk_size] for i in range(0, len(pop), self.chunk_size)]
+        if len(chunks) == 1 or self.n_workers == 1:
+            results = [self._evaluate_chunk(c) for c in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix='nsga_') as executor:
+                results = list(executor.map(self._evaluate_chunk, chunks))
+        objs = np.vstack([r[0] for r in results])
+        violation = np.concatenate([r[1] for r in results])
+        return objs, violation
+
+    def describe(self, pop):
+        """
+        Raw (non-negated) metrics for a set of individuals.
+        """
+        return {
+            "coverage_km2": self.coverage_km2(pop),
+            "cost": self.cost(pop),
+            "connectivity": self.connectivity(pop),
+        }
+
+
+def _domination_matrix(objs, violation):
+    """
+    dom[i, j] is True when individual i constraint-dominates individual j.
+    """
+    le = np.all(objs[:, None, :] <= objs[None, :, :], axis=2)
+    lt = np.any(objs[:, None, :] < objs[None, :, :], axis=2)
+    dom = le & lt
+
+    feasible = violation <= 0
+    both_feasible = feasible[:, None] & feasible[None, :]
+    i_only = feasible[:, None] & ~feasible[None, :]
+    both_infeasible = ~feasible[:, None] & ~feasible[None, :]
+    less_violation = violation[:, None] < violation[None, :]
+
+    return (both_feasible & dom) | i_only | (both_infeasible & less_violation)
+
+
+def fast_non_dominated_sort(objs, violation):
+    """
+    Returns a rank array (0 = Pareto front) for the population.
+    """
+    n = len(objs)
+    dom = _domination_matrix(objs, violation)
+    dominated_count = dom.sum(axis=0)
+    ranks = np.full(n, -1, dtype=np.int64)
+
+    current = np.nonzero(dominated_count == 0)[0]
+    rank = 0
+    while len(current) > 0:
+        ranks[current] = rank
+        # Remove the current front's domination edges
+        dominated_count = dominated_count - dom[current].sum(axis=0)
+        dominated_count[ranks >= 0] = -1
+        current = np.nonzero(dominated_count == 0)[0]
+        rank += 1
+    return ranks
+
+
+def crowding_distance(objs, ranks):
+    """
+    Crowding distance computed independently within each front.
+    """
+    n, m = objs.shape
+    distance = np.zeros(n)
+    for rank in np.unique(ranks):
+        idx = np.nonzero(ranks == rank)[0]
+        if len(idx) <= 2:
+            distance[idx] = np.inf
+            continue
+        for k in range(m):
+            order = idx[np.argsort(objs[idx, k], kind='stable')]
+            values = objs[order, k]
+            span = values[-1] - values[0]
+            distance[order[0]] = np.inf
+            distance[order[-1]] = np.inf
+            if span <= 0:
+                continue
+            distance[order[1:-1]] += (values[2:] - values[:-2]) / span
+    return distance
+
+
+def _tournament(rng, ranks, crowd, size):
+    a = rng.integers(0, len(ranks), size)
+    b = rng.integers(0, len(ranks), size)
+    a_wins = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (crowd[a] >= crowd[b]))
+    return np.where(a_wins, a, b)
+
+
+def _crossover(rng, parent_a, parent_b, n_candidates):
+    """
+    Subset crossover: keep genes shared by both parents, fill the rest
+    from the remaining genes of either parent.
+    """
+    k = len(parent_a)
+    shared = np.intersect1d(parent_a, parent_b)
+    pool = np.setdiff1d(np.union1d(parent_a, parent_b), shared)
+    fill = rng.choice(pool, size=k - len(shared), replace=False) if k > len(shared) else []
+    return np.concatenate([shared, fill]).astype(np.int64)
+
+
+def _mutate(rng, child, n_candidates, rate):
+    k = len(child)
+    if n_candidates <= k:
+        return child
+    for g in range(k):
+        if rng.random() < rate:
+            replacement = rng.integers(0, n_candidates)
+            while replacement in child:
+                replacement = rng.integers(0, n_candidates)
+            child[g] = replacement
+    return child
+
+
+def _random_population(rng, size, n_candidates, k):
+    return np.argsort(rng.random((size, n_candidates)), axis=1)[:, :k].astype(np.int64)
+
+
+def run_nsga2(problem, subset_size, population_size=64, generations=50,
+              mutation_rate=None, seed=None, progress_cb=None, should_stop=None):
+    """
+    NSGA-II over fixed-size subsets of candidate indices.
+
+    progress_cb(generation, generations, front_size) is invoked after every generation.
+    should_stop() is polled before every generation; returning True ends the
+    search early with the current front.
+    Returns: (pareto_population (F, k), objectives (F, M), violation (F,))
+    """
+    rng = np.random.default_rng(seed)
+    n = problem.n_candidates
+    k = int(subset_size)
+    if k <= 0 or k > n:
+        raise ValueError(f"subset_size must be between 1 and {n}, got {k}")
+
+    if mutation_rate is None:
+        mutation_rate = 1.0 / k
+
+    pop = _random_population(rng, population_size, n, k)
+    objs, viol = problem.evaluate(pop)
+    ranks = fast_non_dominated_sort(objs, viol)
+    crowd = crowding_distance(objs, ranks)
+
+    for gen in range(generations):
+        if should_stop is not None and should_stop():
+            break
+        parents = _tournament(rng, ranks, crowd, population_size * 2)
+        offspring = np.empty((population_size, k), dtype=np.int64)
+        for i in range(population_size):
+            child = _crossover(rng, pop[parents[2 * i]], pop[parents[2 * i + 1]], n)
+            offspring[i] = _mutate(rng, child, n, mutation_rate)
+
+        off_objs, off_viol = problem.evaluate(offspring)
+
+        # Elitist (mu + lambda) environmental selection
+        union_pop = np.vstack([pop, offspring])
+        union_objs = np.vstack([objs, off_objs])
+        union_viol = np.concatenate([viol, off_viol])
+        union_ranks = fast_non_dominated_sort(union_objs, union_viol)
+        union_crowd = crowding_distance(union_objs, union_ranks)
+
+        order = np.lexsort((-union_crowd, union_ranks))[:population_size]
+        pop, objs, viol = union_pop[order], union_objs[order], union_viol[order]
+        ranks, crowd = union_ranks[order], union_crowd[order]
+
+        if progress_cb is not None:
+            progress_cb(gen + 1, generations, int(np.sum(ranks == 0)))
+
+    front = ranks == 0
+    front_pop = np.sort(pop[front], axis=1)
+    # Drop duplicate individuals (same subset reached by different lineages)
+    _, unique_idx = np.unique(front_pop, axis=0, return_index=True)
+    unique_idx = np.sort(unique_idx)
+    return front_pop[unique_idx], objs[front][unique_idx], viol[front][unique_idx]
@@ -0,0 +1,72 @@
+import numpy as np
+import os
+
+# Native posting of the OpenTopoData datasets we deploy against (meters)
+DATASET_RESOLUTION_M = {
+    "ned10m": 10.0,
+    "eudem25m": 25.0,
+    "srtm30m": 30.0,
+    "aster30m": 30.0,
+    "mapzen": 30.0,
+    "srtm90m": 90.0,
+    "emod2018": 115.0,
+    "bkg200m": 200.0,
+    "gebco2020": 460.0,
+    "etopo1": 1850.0,
+}
+DEFAULT_RESOLUTION_M = 30.0
+
+# (min, max) samples per profile by caller.
+# Links feed the profile chart and ITM, so they keep a higher floor;
+# viewshed paths are evaluated by the thousand and stay cheap.
+PROFILE_LIMITS = {
+    "link": (32, 512),
+    "matrix": (16, 256),
+    "fresnel": (8, 128),
+    "viewshed": (6, 96),
+}
+
+# Viewshed sample counts are rounded up to this step so cells can be
+# grouped into a handful of vectorized passes.
+SAMPLE_BAND = 4
+
+
+def dataset_resolution_m(dataset=None):
+    """
+    Native resolution of an elevation dataset (defaults to ELEVATION_DATASET).
+    """
+    if dataset is None:
+        dataset = os.environ.get('ELEVATION_DATASET', 'srtm30m')
+    return DATASET_RESOLUTION_M.get(dataset, DEFAULT_RESOLUTION_M)
+
+
+def plan_samples(dist_m, resolution_m, purpose="link"):
+    """
+    Number of profile samples so spacing roughly matches the terrain resolution.
+    Vectorized: dist_m may be a scalar or array.
+    """
+    min_samples, max_samples = PROFILE_LIMITS[purpose]
+    samples = np.ceil(np.asarray(dist_m, dtype=np.float64) / max(float(resolution_m), 1.0)) + 1
+    samples = np.clip(samples, min_samples, max_samples).astype(np.int64)
+    if samples.ndim == 0:
+        return int(samples)
+    return samples
+
+
+def plan_profile(dist_m, resolution_m, purpose="link"):
+    """
+    Sampling plan for a single path, suitable for inclusion in API responses.
+    """
+    samples = plan_samples(dist_m, resolution_m, purpose)
+    return {
+        "samples": samples,
+        "spacing_m": round(float(dist_m) / max(samples - 1, 1), 1),
+        "resolution_m": round(float(resolution_m), 1),
+    }
+
+
+def band_samples(samples):
+    """
+    Round sample counts up to the next SAMPLE_BAND multiple (vectorized).
+    """
+    return ((np.asarray(samples) + SAMPLE_BAND - 1) // SAMPLE_BAND) * SAMPLE_BAND
@@ -0,0 +1,111 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core import kernels
+from tile_manager import sample_window
+
+# Topographic prominence from terrain windows.
+#
+# kernels.key_col_levels finds the key col of every cell of a window in one
+# union-find pass over the cells sorted by elevation. Prominence at a point is
+# then its elevation minus the key col of the pixel it falls in, so samples
+# finer than the window (site_search refinement) still get an exact-height
+# answer.
+#
+# Cols farther than the margin outside the requested bbox are not seen: a hill
+# whose higher neighbour lies beyond it counts as the window's summit. The
+# default margin matches the 5 km radius of the old neighbourhood-mean
+# approximation.
+#
+# Windows are cached per region (bbox snapped outward to REGION_SNAP_DEG) in
+# an in-process LRU, and a cached window that contains a later request at a
+# similar resolution serves it as well.
+
+DEFAULT_MARGIN_M = 5000.0
+MAX_DIM = 512           # Window edge cap; the sweep is O(cells log cells)
+REGION_SNAP_DEG = 0.05
+RESOLUTION_SLACK = 2.0  # Reuse a cached window up to this much coarser
+MAX_ENTRIES = 8
+
+
+class ProminenceCache:
+    """
+    Key-col windows per region, with prominence lookups for point arrays.
+    Call clear() when the elevation dataset changes.
+    """
+
+    def __init__(self, tile_manager, max_entries=MAX_ENTRIES, max_dim=MAX_DIM):
+        self.tile_manager = tile_manager
+        self.max_entries = max_entries
+        self.max_dim = max_dim
+        self._entries = OrderedDict()  # region key -> (bounds, resolution_m, key_col, transform)
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _resolution_m(self, min_lat, min_lon, max_lat, max_lon):
+        mid_lat = (min_lat + max_lat) / 2.0
+        height_m = (max_lat - min_lat) * 111320.0
+        width_m = (max_lon - min_lon) * 111320.0 * max(0.01, math.cos(math.radians(mid_lat)))
+        return max(self.tile_manager.effective_resolution_m(mid_lat), max(height_m, width_m) / (self.max_dim - 1))
+
+    def window(self, min_lat, min_lon, max_lat, max_lon, margin_m=DEFAULT_MARGIN_M):
+        """
+        Key-col raster covering the bbox plus margin_m on every side.
+        Returns: (key_col, transform) as from TileManager.get_elevation_window.
+        """
+        mid_lat = (min_lat + max_lat) / 2.0
+        dlat = margin_m / 111320.0
+        dlon = margin_m / (111320.0 * max(0.01, math.cos(math.radians(mid_lat))))
+        snap = REGION_SNAP_DEG
+        bounds = (
+            math.floor((min_lat - dlat) / snap) * snap, math.floor((min_lon - dlon) / snap) * snap,
+            math.ceil((max_lat + dlat) / snap) * snap, math.ceil((max_lon + dlon) / snap) * snap,
+        )
+        resolution_m = self._resolution_m(*bounds)
+
+        with self._lock:
+            for key, (cached, cached_res, key_col, transform) in self._entries.items():
+                if (cached[0] <= bounds[0] and cached[1] <= bounds[1] and cached[2] >= bounds[2]
+                        and cached[3] >= bounds[3] and cached_res <= resolution_m * RESOLUTION_SLACK):
+                    self._entries.move_to_end(key)
+                    return key_col, transform
+
+        elevation, transform = self.tile_manager.get_elevation_window(*bounds, resolution_m=resolution_m)
+        key_col = kernels.key_col_levels(elevation)
+
+        key = tuple(round(b / snap) for b in bounds)
+        with self._lock:
+            self._entries[key] = (bounds, resolution_m, key_col, transform)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key_col, transform
+
+    def prominence(self, lats, lons, elevations=None, margin_m=DEFAULT_MARGIN_M):
+        """
+        Prominence (m, >= 0) at arrays of points, from one cached window
+        around all of them. elevations: the points' own elevations when the
+        caller already has them (otherwise sampled here).
+        Returns: array shaped like lats.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if lats.size == 0:
+            return np.zeros(lats.shape)
+        key_col, transform = self.window(
+            float(lats.min()), float(lons.min()), float(lats.max()), float(lons.max()), margin_m
+        )
+        if elevations is None:
+            elevations = self.tile_manager.sample_elevations(lats, lons)
+        # Nearest pixel: key cols are constant across a hill, bilinear blending would mix hills
+        cols = sample_window(key_col, transform, lats, lons, order=0)
+        return np.maximum(0.0, np.asarray(elevations, dtype=np.float64) - cols)
@@ -0,0 +1,149 @@
+import heapq
+import math
+
+import numpy as np
+import scipy.ndimage
+
+from core import geodesy
+from core.prominence import DEFAULT_MARGIN_M, ProminenceCache
+from tile_manager import sample_window
+
+# Coarse-to-fine site search for /optimize-location.
+#
+# Level 0 scores a grid over the whole bbox on elevation and prominence only,
+# both read from terrain windows (prominence from a cached key-col window).
+# The BEAM best cells become regions (+/- one grid spacing) that are
+# resampled REFINE_DIM x REFINE_DIM, i.e. at a quarter
+# of the spacing, and the best of those are refined again until the spacing
+# reaches the terrain resolution. Hilltops between coarse grid points are
+# found without ever scoring a fine grid over the whole bbox, and the
+# expensive Fresnel checks are left to the caller for the final few sites.
+
+COARSE_DIM = 64   # Level-0 grid edge
+REFINE_DIM = 9    # Samples per region edge (odd: keeps the region centre)
+BEAM = 16         # Regions kept per level
+MAX_LEVELS = 6
+MIN_SPACING_M = 10.0
+# Key cols are searched this far around the bbox (core.prominence)
+PROMINENCE_RADIUS_M = DEFAULT_MARGIN_M
+
+
+def _metres_to_degrees(lat):
+    return 1 / 111320.0, 1 / (111320.0 * max(0.01, math.cos(math.radians(lat))))
+
+
+def _spread(points, n, min_sep_m):
+    """
+    Greedy pick of up to n (score, lat, lon, ...) tuples, best first, at least
+    min_sep_m apart, so the beam covers distinct hills.
+    """
+    heap = [(-p[0], i) for i, p in enumerate(points)]
+    heapq.heapify(heap)
+    chosen = []
+    while heap and len(chosen) < n:
+        _, i = heapq.heappop(heap)
+        lat, lon = points[i][1], points[i][2]
+        if chosen:
+            sep = geodesy.haversine(lat, lon, np.array([c[1] for c in chosen]), np.array([c[2] for c in chosen]))
+            if np.min(sep) < min_sep_m:
+                continue
+        chosen.append(points[i])
+    return chosen
+
+
+def coarse_to_fine_search(tile_manager, min_lat, min_lon, max_lat, max_lon, weights,
+                          beam=BEAM, n_results=10, coarse_dim=COARSE_DIM, prominence_cache=None):
+    """
+    Best candidate sites in a bbox by elevation and prominence.
+    weights: {elevation, prominence} (other keys ignored).
+    prominence_cache: a shared core.prominence.ProminenceCache (a private one otherwise).
+    Returns: {
+        candidates: [{lat, lon, elevation, prominence}], best first, at least
+                    one coarse spacing apart (<= n_results),
+        coarse: the level-0 grid as [{lat, lon, elevation, prominence}],
+        max_elevation, max_prominence: maxima over every point scored,
+        levels, resolution_m: refinement passes run and final spacing,
+        evaluated_points
+    }
+    """
+    mid_lat = (min_lat + max_lat) / 2.0
+    lat_per_m, lon_per_m = _metres_to_degrees(mid_lat)
+    height_m = (max_lat - min_lat) / lat_per_m
+    width_m = (max_lon - min_lon) / lon_per_m
+    fine_m = max(tile_manager.effective_resolution_m(mid_lat) / 2.0, MIN_SPACING_M)
+    spacing_m = max(fine_m, max(height_m, width_m) / (coarse_dim - 1))
+
+    # One key-col window over the bbox plus the radius serves every level
+    if prominence_cache is None:
+        prominence_cache = ProminenceCache(tile_manager)
+    key_col, key_col_transform = prominence_cache.window(min_lat, min_lon, max_lat, max_lon, PROMINENCE_RADIUS_M)
+
+    def prominence(lats, lons, elev):
+        return np.maximum(0.0, elev - sample_window(key_col, key_col_transform, lats, lons, order=0))
+
+    # Level 0
+    rows = max(2, int(round(height_m / spacing_m)) + 1)
+    cols = max(2, int(round(width_m / spacing_m)) + 1)
+    elev0, (west, dlon, _, north, _, neg_dlat) = tile_manager.get_elevation_window(
+        min_lat, min_lon, max_lat, max_lon, shape=(rows, cols)
+    )
+    lat_grid, lon_grid = np.meshgrid(north + np.arange(rows) * neg_dlat, west + np.arange(cols) * dlon, indexing='ij')
+    prom0 = prominence(lat_grid, lon_grid, elev0)
+
+    max_elev = float(elev0.max())
+    max_prom = float(prom0.max())
+    # Ranking uses the level-0 maxima throughout so scores stay comparable across levels
+    norm_elev = max_elev if max_elev > 0 else 1.0
+    norm_prom = max_prom if max_prom > 0 else 1.0
+    w_elev = weights.get("elevation", 0.3)
+    w_prom = weights.get("prominence", 0.4)
+
+    def score(elev, prom):
+        return w_elev * elev / norm_elev + w_prom * prom / norm_prom
+
+    score0 = score(elev0, prom0)
+    # Prefer local maxima so the beam does not spend itself on one slope
+    peaks = score0 == scipy.ndimage.maximum_filter(score0, size=3, mode='nearest')
+    r, c = np.nonzero(peaks)
+    points = [(float(score0[i, j]), float(lat_grid[i, j]), float(lon_grid[i, j]), float(elev0[i, j]), float(prom0[i, j]))
+              for i, j in zip(r, c)]
+    regions = heapq.nlargest(beam, points)
+
+    coarse_spacing_m = spacing_m
+    evaluated = elev0.size
+    levels = 0
+    half = (REFINE_DIM - 1) // 2
+    offsets = np.arange(-half, half + 1) / half  # Region spans +/- one parent spacing
+    while spacing_m > fine_m and levels < MAX_LEVELS and regions:
+        centre_lat = np.array([p[1] for p in regions])[:, None, None]
+        centre_lon = np.array([p[2] for p in regions])[:, None, None]
+        lats = np.clip(centre_lat + offsets[None, :, None] * spacing_m * lat_per_m, min_lat, max_lat)
+        lons = np.clip(centre_lon + offsets[None, None, :] * spacing_m * lon_per_m, min_lon, max_lon)
+        lats, lons = np.broadcast_arrays(lats, lons)
+
+        elev = tile_manager.sample_elevations(lats, lons)
+        prom = prominence(lats, lons, elev)
+        scores = score(elev, prom)
+        max_elev = max(max_elev, float(elev.max()))
+        max_prom = max(max_prom, float(prom.max()))
+        evaluated += elev.size
+
+        points = list(zip(scores.ravel().tolist(), lats.ravel().tolist(), lons.ravel().tolist(),
+                          elev.ravel().tolist(), prom.ravel().tolist()))
+        regions = _spread(points, beam, spacing_m)
+        spacing_m /= half
+        levels += 1
+
+    finals = _spread(regions, n_results, coarse_spacing_m)
+    return {
+        "candidates": [{"lat": p[1], "lon": p[2], "elevation": p[3], "prominence": p[4]} for p in finals],
+        "coarse": [
+            {"lat": float(la), "lon": float(lo), "elevation": float(e), "prominence": float(p)}
+            for la, lo, e, p in zip(lat_grid.ravel(), lon_grid.ravel(), elev0.ravel(), prom0.ravel())
+        ],
+        "max_elevation": max_elev,
+        "max_prominence": max_prom,
+        "levels": levels,
+        "resolution_m": spacing_m,
+        "evaluated_points": int(evaluated),
+    }
@@ -0,0 +1,209 @@
+import math
+
+import numpy as np
+
+import rf_physics
+from core import geodesy, kernels
+from core.algorithms import VIEWSHED_MAX_RAYS
+
+# Scenario sweeps: one terrain fetch, many parameter combinations.
+#
+# Planners compare k-factors (1.0, 4/3, infinity), frequencies and antenna
+# heights on the same path. Terrain, clutter and distances do not depend on
+# any of them, so they are looked up once and the grid is evaluated by
+# broadcasting:
+#   terrain + curvature   (K, S)        one row per k-factor
+#   line of sight         (T, R, S)     one row per TX/RX height pair
+#   first Fresnel radius  (F, S)        one row per frequency
+# and the minimum clearance ratio over S gives the (K, F, T, R) cube. The
+# Bullington knife-edge v is the same ratio scaled by -sqrt(2), so path loss
+# comes out of the same reduction. Deygout runs one batched kernel call per
+# (k, f) over all height pairs.
+#
+# Axis order everywhere: k_factor, frequency_mhz, tx_height, rx_height.
+# k = inf (flat earth) is allowed.
+
+MAX_COMBINATIONS = 4096
+SPEED_OF_LIGHT = 2.99792e8
+
+
+def _axis(values):
+    return np.atleast_1d(np.asarray(values, dtype=np.float64))
+
+
+def _inverse_diameter(k_factors):
+    # 1 / (2 * R_eff); 0 for k = inf
+    return 1.0 / (2 * _axis(k_factors) * geodesy.EARTH_RADIUS_M)
+
+
+def link_sweep(elevs, dist_m, k_factors, frequencies_mhz, tx_heights, rx_heights, clutter_height=0.0,
+               model='bullington', environment='suburban'):
+    """
+    analyze_link / calculate_path_loss over a parameter grid for one profile.
+    elevs: (S,) profile TX -> RX; clutter_height: scalar or (S,).
+    Returns: {min_clearance_ratio, path_loss_db}, each (K, F, T, R).
+    """
+    elevs = np.asarray(elevs, dtype=np.float64)
+    freqs, ks = _axis(frequencies_mhz), _axis(k_factors)
+    tx_h, rx_h = _axis(tx_heights), _axis(rx_heights)
+    shape = (ks.size, freqs.size, tx_h.size, rx_h.size)
+    if math.prod(shape) > MAX_COMBINATIONS:
+        raise ValueError(f"Sweep has {math.prod(shape)} combinations (max {MAX_COMBINATIONS})")
+
+    n = elevs.size
+    frac = np.linspace(0.0, 1.0, n)
+    d1 = dist_m * frac
+    d2 = dist_m - d1
+    clutter = np.broadcast_to(np.asarray(clutter_height, dtype=np.float64), (n,))
+
+    # Only interior samples matter (the kernels' masks); the v mask is strict
+    valid = (d1 >= 1) & (d2 >= 1)
+    v_valid = (d1 > 1.0) & (d2 > 1.0)
+    cols = np.nonzero(valid)[0]
+
+    ratio = np.zeros(shape)
+    max_v = np.full(shape, -np.inf)
+    if cols.size:
+        terrain = (elevs + clutter)[cols] + (d1 * d2)[cols] * _inverse_diameter(ks)[:, None]  # (K, S)
+        tx_alt = elevs[0] + tx_h
+        rx_alt = elevs[-1] + rx_h
+        los = tx_alt[:, None, None] + (rx_alt[None, :, None] - tx_alt[:, None, None]) * frac[cols]  # (T, R, S)
+        clearance = los[None] - terrain[:, None, None, :]  # (K, T, R, S)
+        wavelength = SPEED_OF_LIGHT / (freqs * 1e6)
+        f1 = np.sqrt(wavelength[:, None] * (d1 * d2)[cols] / dist_m)  # (F, S)
+        ratios = clearance[:, None] / f1[None, :, None, None, :]  # (K, F, T, R, S)
+
+        lowest = ratios.min(axis=-1)
+        ratio = np.minimum(lowest, 100.0)
+        # Knife-edge v = -sqrt(2) * clearance / F1
+        strict = v_valid[cols]
+        if strict.all():
+            max_v = -math.sqrt(2) * lowest
+        elif strict.any():
+            max_v = -math.sqrt(2) * ratios[..., strict].min(axis=-1)
+
+    if model == 'deygout':
+        diffraction = _deygout_cube(elevs, dist_m, ks, freqs, tx_h, rx_h, clutter)
+    else:
+        diffraction = rf_physics.knife_edge_loss(max_v)
+    loss = _path_loss(dist_m, n, freqs, tx_h, rx_h, diffraction, model, environment, shape)
+    return {"min_clearance_ratio": ratio, "path_loss_db": loss}
+
+
+def _deygout_cube(elevs, dist_m, ks, freqs, tx_h, rx_h, clutter):
+    # Edge selection depends on every parameter, so each (k, f) is one batched
+    # kernel call over the T x R height pairs of the shared profile.
+    tx_grid, rx_grid = np.meshgrid(tx_h, rx_h, indexing='ij')
+    profiles = np.broadcast_to(elevs, (tx_grid.size, elevs.size))
+    out = np.zeros((ks.size, freqs.size, tx_h.size, rx_h.size))
+    for i, k in enumerate(ks):
+        for j, f in enumerate(freqs):
+            out[i, j] = kernels.deygout_loss(
+                profiles, dist_m, f, tx_grid.ravel(), rx_grid.ravel(), k * geodesy.EARTH_RADIUS_M, clutter
+            ).reshape(tx_grid.shape)
+    return out
+
+
+def _path_loss(dist_m, n_samples, freqs, tx_h, rx_h, diffraction, model, environment, shape):
+    if dist_m / 1000.0 < 0.001:
+        return np.zeros(shape)
+
+    if model == 'hata':
+        loss = np.array([[[rf_physics.calculate_hata_loss(dist_m, f, t, r, environment)
+                           for r in rx_h] for t in tx_h] for f in freqs])
+        return np.broadcast_to(loss, shape).copy()
+
+    fspl = 20 * math.log10(dist_m / 1000.0) + 20 * np.log10(freqs) + 32.45  # (F,)
+    loss = np.broadcast_to(fspl[None, :, None, None], shape).copy()
+    if model in ('bullington', 'itm', 'itm_wasm', 'deygout') and n_samples >= 3:
+        loss += diffraction
+    return loss
+
+
+def viewshed_sweep(tile_manager, lat, lon, radius_m, k_factors, tx_heights, rx_heights, resolution_m=100.0,
+                   clutter_height=0.0, clutter_mode='auto'):
+    """
+    Visible area around a site for every (k_factor, tx_height, rx_height).
+    Rays are sampled once (as the radial calculate_viewshed method does);
+    each k-factor / RX height is one horizon sweep over all rays of every TX
+    height. Visual line of sight does not depend on frequency.
+    Returns: {area_km2, visible_fraction}, each (K, T, R).
+    """
+    ks, tx_h, rx_h = _axis(k_factors), _axis(tx_heights), _axis(rx_heights)
+    n_rays = min(VIEWSHED_MAX_RAYS, max(8, int(math.ceil(2 * math.pi * radius_m / resolution_m))))
+    n_steps = max(1, int(math.ceil(radius_m / resolution_m)))
+    bearings = np.arange(n_rays) * (360.0 / n_rays)
+    dists = np.arange(1, n_steps + 1) * (radius_m / n_steps)
+
+    ray_lats, ray_lons = geodesy.destination_point(lat, lon, bearings[:, None], dists[None, :])
+    heights = tile_manager.sample_elevations(ray_lats, ray_lons)
+    clutter = tile_manager.sample_clutter(ray_lats, ray_lons, clutter_height, clutter_mode)
+    ground = float(tile_manager.sample_elevations(np.array([lat]), np.array([lon]))[0])
+
+    # Every TX height in one kernel call: rays stacked per height
+    stacked = np.tile(heights, (tx_h.size, 1))
+    stacked_clutter = clutter if np.ndim(clutter) == 0 else np.tile(clutter, (tx_h.size, 1))
+    tx_alt = np.repeat(ground + tx_h, n_rays)
+    sector_m2 = 2 * np.pi * dists * (radius_m / n_steps) / n_rays
+
+    area = np.zeros((ks.size, tx_h.size, rx_h.size))
+    for i, k in enumerate(ks):
+        for j, rx in enumerate(rx_h):
+            visible = kernels.horizon_sweep(
+                stacked, dists, tx_alt, rx, k * geodesy.EARTH_RADIUS_M, stacked_clutter
+            ).reshape(tx_h.size, n_rays, n_steps)
+            area[i, :, j] = (visible * sector_m2).sum(axis=(1, 2)) / 1e6
+
+    return {"area_km2": area, "visible_fraction": area / (math.pi * radius_m ** 2 / 1e6)}
+
+
+def link_sweep_report(elevs, dist_m, k_factors, frequencies_mhz, tx_heights, rx_heights, clutter_height=0.0,
+                      model='bullington', environment='suburban'):
+    """
+    link_sweep as JSON: axes plus rounded cubes.
+    """
+    result = link_sweep(elevs, dist_m, k_factors, frequencies_mhz, tx_heights, rx_heights,
+                        clutter_height, model, environment)
+    return {
+        "axes": axes(k_factors, frequencies_mhz, tx_heights, rx_heights),
+        "min_clearance_ratio": cube(result["min_clearance_ratio"], 3),
+        "path_loss_db": cube(result["path_loss_db"], 2),
+    }
+
+
+def viewshed_sweep_report(tile_manager, lat, lon, radius_m, k_factors, tx_heights, rx_heights, resolution_m=100.0,
+                          clutter_height=0.0, clutter_mode='auto'):
+    """
+    viewshed_sweep as JSON: axes (no frequency axis) plus rounded cubes.
+    """
+    result = viewshed_sweep(tile_manager, lat, lon, radius_m, k_factors, tx_heights, rx_heights,
+                            resolution_m, clutter_height, clutter_mode)
+    return {
+        "axes": axes(k_factors, None, tx_heights, rx_heights),
+        "area_km2": cube(result["area_km2"], 3),
+        "visible_fraction": cube(result["visible_fraction"], 4),
+    }
+
+
+def axes(k_factors, frequencies_mhz, tx_heights, rx_heights):
+    """
+    Axis labels for JSON, in cube order (k = inf as the string "inf").
+    frequencies_mhz=None leaves the frequency axis out.
+    """
+    labels = {"k_factor": [v if math.isfinite(v) else "inf" for v in _axis(k_factors).tolist()]}
+    if frequencies_mhz is not None:
+        labels["frequency_mhz"] = _axis(frequencies_mhz).tolist()
+    labels["tx_height"] = _axis(tx_heights).tolist()
+    labels["rx_height"] = _axis(rx_heights).tolist()
+    return labels
+
+
+def cube(values, decimals):
+    """
+    Nested lists for JSON, rounded; non-finite entries become None.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals).astype(object)
+    rounded[~np.isfinite(values)] = None
+    return rounded.tolist()
+
@@ -0,0 +1,182 @@
+import math
+
+import numpy as np
+
+from core import kernels
+from core.geodesy import EARTH_RADIUS_M
+from tile_manager import sample_window
+
+# Cumulative (total) viewshed: for every observer cell of a grid, the area
+# visible from an antenna there within a radius.
+#
+# Running calculate_viewshed per cell is far too slow, so each observer casts
+# n_rays sampled rays instead. Every ray is read from one shared terrain window
+# (the bbox plus the radius) and kernels.horizon_sweep does the line of sight
+# for all rays of a chunk of observers at once. A visible sample stands for its
+# sector of the annulus around the observer, so the sum estimates the visible
+# area. Rays are laid out in the window's pixel space (flat-earth offsets),
+# which is accurate to well under a pixel for radii up to a few tens of km.
+
+DEFAULT_RAYS = 32
+MAX_STEPS = 128
+OBSERVER_CHUNK = 256
+K_FACTOR = 1.333
+
+
+def ray_layout(radius_m, resolution_m, n_rays=DEFAULT_RAYS):
+    """
+    Bearings (R,) in radians and sample distances (S,) in meters.
+    """
+    n_steps = int(min(MAX_STEPS, max(4, math.ceil(radius_m / max(resolution_m, 1.0)))))
+    bearings = np.arange(n_rays) * (2 * np.pi / n_rays)
+    dists = np.arange(1, n_steps + 1) * (radius_m / n_steps)
+    return bearings, dists
+
+
+def terrain_window(tile_manager, min_lat, min_lon, max_lat, max_lon, radius_m):
+    """
+    One elevation window covering every ray cast from inside the bbox.
+    Returns: (elevation, transform) as from TileManager.get_elevation_window.
+    """
+    mid_lat = (min_lat + max_lat) / 2.0
+    dlat = radius_m / 111320.0
+    dlon = radius_m / (111320.0 * max(0.01, math.cos(math.radians(mid_lat))))
+    resolution_m = max(tile_manager.effective_resolution_m(mid_lat), radius_m / MAX_STEPS)
+    return tile_manager.get_elevation_window(
+        min_lat - dlat, min_lon - dlon, max_lat + dlat, max_lon + dlon, resolution_m=resolution_m
+    )
+
+
+def ray_visibility(elevation, transform, lats, lons, tx_h, radius_m, rx_h=2.0, n_rays=DEFAULT_RAYS,
+                   k_factor=K_FACTOR, resolution_m=None, clutter=None):
+    """
+    Line of sight along n_rays rays cast from each observer at lats/lons.
+    elevation/transform: a window from terrain_window() (or any window that
+    covers the rays).
+    tx_h: antenna height, scalar or one per observer.
+    resolution_m: ray step (default: the window's pixel size).
+    clutter: optional callable(lats, lons) -> obstruction height at the ray
+             samples (scalar or array), e.g. TileManager.sample_clutter.
+    Returns: (visible (N, R, S) bool, dists (S,) meters)
+    """
+    lats = np.asarray(lats, dtype=np.float64).ravel()
+    lons = np.asarray(lons, dtype=np.float64).ravel()
+
+    west, dlon, _, north, _, neg_dlat = transform
+    mid_lat = north + neg_dlat * (elevation.shape[0] - 1) / 2.0
+    pixel_lat_m = -neg_dlat * 111320.0
+    pixel_lon_m = dlon * 111320.0 * max(0.01, math.cos(math.radians(mid_lat)))
+    if resolution_m is None:
+        resolution_m = min(pixel_lat_m, pixel_lon_m)
+    bearings, dists = ray_layout(radius_m, resolution_m, n_rays)
+    if lats.size == 0:
+        return np.zeros((0, n_rays, dists.size), dtype=bool), dists
+
+    # (R, S) pixel offsets of the ray samples
+    d_row = -np.cos(bearings)[:, None] * dists[None, :] / pixel_lat_m
+    d_col = np.sin(bearings)[:, None] * dists[None, :] / pixel_lon_m
+    row0 = (lats - north) / neg_dlat
+    col0 = (lons - west) / dlon
+
+    ground = sample_window(elevation, transform, lats, lons)
+    rows = row0[:, None, None] + d_row[None]
+    cols = col0[:, None, None] + d_col[None]
+    # Identity transform: rows/cols are already pixel coordinates
+    heights = sample_window(elevation, (0.0, 1.0, 0.0, 0.0, 0.0, 1.0), rows, cols)
+
+    n_obs, n_steps = lats.size, dists.size
+    obstruction = 0.0
+    if clutter is not None:
+        obstruction = clutter(north + rows * neg_dlat, west + cols * dlon)
+        if np.ndim(obstruction):
+            obstruction = obstruction.reshape(n_obs * n_rays, n_steps)
+    tx_alt = np.repeat(ground + np.broadcast_to(np.asarray(tx_h, dtype=np.float64), ground.shape), n_rays)
+    visible = kernels.horizon_sweep(
+        heights.reshape(n_obs * n_rays, n_steps), dists, tx_alt, rx_h, k_factor * EARTH_RADIUS_M, obstruction
+    )
+    return visible.reshape(n_obs, n_rays, n_steps), dists
+
+
+def visible_area(elevation, transform, lats, lons, tx_h, radius_m, rx_h=2.0, n_rays=DEFAULT_RAYS, k_factor=K_FACTOR,
+                 clutter=None):
+    """
+    Estimated visible area (km^2) within radius_m for observers at lats/lons.
+    elevation/transform: a window from terrain_window().
+    clutter: optional obstruction-height callable (see ray_visibility).
+    Returns: array shaped like lats.
+    """
+    shape = np.shape(lats)
+    visible, dists = ray_visibility(
+        elevation, transform, lats, lons, tx_h, radius_m, rx_h, n_rays, k_factor, clutter=clutter
+    )
+    if visible.shape[0] == 0:
+        return np.zeros(shape)
+
+    # Annulus sector around each sample: 2*pi*d*step / n_rays
+    step = radius_m / dists.size
+    sector_m2 = 2 * np.pi * dists * step / n_rays
+    return (visible * sector_m2).sum(axis=(1, 2)).reshape(shape) / 1e6
+
+
+def observer_grid(min_lat, min_lon, max_lat, max_lon, grid_dim):
+    """
+    Observer cell centres over the bbox, north-up.
+    Returns: (lat_grid, lon_grid), both (rows, cols).
+    """
+    mid_lat = (min_lat + max_lat) / 2.0
+    height_m = (max_lat - min_lat) * 111320.0
+    width_m = (max_lon - min_lon) * 111320.0 * max(0.01, math.cos(math.radians(mid_lat)))
+    spacing = max(height_m, width_m) / grid_dim
+    rows = max(1, int(round(height_m / spacing)))
+    cols = max(1, int(round(width_m / spacing)))
+    lats = max_lat - (np.arange(rows) + 0.5) * (max_lat - min_lat) / rows
+    lons = min_lon + (np.arange(cols) + 0.5) * (max_lon - min_lon) / cols
+    return np.meshgrid(lats, lons, indexing='ij')
+
+
+def total_viewshed(tile_manager, min_lat, min_lon, max_lat, max_lon, tx_h, radius_m, rx_h=2.0,
+                   grid_dim=64, n_rays=DEFAULT_RAYS, clutter_height=0.0, clutter_mode='auto', executor=None,
+                   chunk=OBSERVER_CHUNK, cancel_check=None, progress=None, out=None):
+    """
+    Visible area for every observer cell of a grid_dim grid over the bbox.
+    clutter_height/clutter_mode: obstructions along the rays (see
+                                 TileManager.sample_clutter).
+    executor: optional concurrent.futures executor; chunks of observers run in
+              parallel (the Numba kernel releases the GIL).
+    cancel_check: called between chunks; raise from it to abort.
+    progress: called with (done, total) observers after each chunk.
+    out: optional (rows, cols) float array (see observer_grid) filled in place
+         chunk by chunk, so the finished chunks survive an abort. Cells not
+         yet computed keep their value (NaN when allocated here).
+    Returns: (area_km2 (rows, cols), lat_grid, lon_grid)
+    """
+    lat_grid, lon_grid = observer_grid(min_lat, min_lon, max_lat, max_lon, grid_dim)
+    if out is None:
+        out = np.full(lat_grid.shape, np.nan)
+    elif out.shape != lat_grid.shape or not out.flags.c_contiguous:
+        raise ValueError(f"out must be a C-contiguous {lat_grid.shape} array")
+    elevation, transform = terrain_window(tile_manager, min_lat, min_lon, max_lat, max_lon, radius_m)
+
+    def clutter(sample_lats, sample_lons):
+        return tile_manager.sample_clutter(sample_lats, sample_lons, clutter_height, clutter_mode)
+
+    flat_lats, flat_lons = lat_grid.ravel(), lon_grid.ravel()
+    area = out.reshape(-1)
+    starts = list(range(0, flat_lats.size, chunk))
+
+    def run(start):
+        if cancel_check is not None:
+            cancel_check()
+        end = start + chunk
+        area[start:end] = visible_area(
+            elevation, transform, flat_lats[start:end], flat_lons[start:end], tx_h, radius_m, rx_h, n_rays,
+            clutter=clutter
+        )
+        return end
+
+    results = executor.map(run, starts) if executor is not None else map(run, starts)
+    for end in results:
+        if progress is not None:
+            progress(min(end, flat_lats.size), flat_lats.size)
+
+    return out, lat_grid, lon_grid
@@ -0,0 +1,129 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import msgpack
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Coordinates are rounded to 1e-5 deg (~1.1 m) so UI round-trips of the same
+# marker hit the same entry; parameters are rounded to what the physics resolves.
+COORD_DECIMALS = 5
+GENERATION_KEY = "linkcache:generation"
+
+
+class LinkCache:
+    """
+    Two-tier memo for point-to-point link analyses.
+
+    An in-process LRU sits in front of Redis so repeated lookups of the same
+    link stay in-process (no network round-trip). Redis shares results across
+    API workers and restarts.
+
+    Entries are scoped by elevation dataset and a generation counter held in
+    Redis. invalidate() bumps the counter, which orphans every old key at once;
+    the Redis TTL reclaims them. Other processes pick up the new generation
+    within generation_ttl seconds.
+    """
+
+    def __init__(self, redis_client, max_local=4096, ttl=7 * 24 * 60 * 60, generation_ttl=5.0):
+        self.redis = redis_client
+        self.max_local = max_local
+        self.ttl = ttl
+        self.generation_ttl = generation_ttl
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked = 0.0
+
+    def _current_generation(self):
+        now = time.monotonic()
+        if self._generation is not None and now - self._generation_checked < self.generation_ttl:
+            return self._generation
+        try:
+            raw = self.redis.get(GENERATION_KEY)
+            generation = int(raw) if raw else 0
+        except Exception as e:
+            logger.warning(f"Link cache generation lookup failed: {e}")
+            generation = self._generation or 0
+        if generation != self._generation:
+            with self._lock:
+                self._local.clear()
+        self._generation = generation
+        self._generation_checked = now
+        return generation
+
+    def key(self, tx_lat, tx_lon, rx_lat, rx_lon, frequency_mhz, tx_height, rx_height,
+            model, environment, k_factor, clutter_height, clutter_mode="uniform", dataset=None):
+        """
+        Cache key for one link. The dataset defaults to ELEVATION_DATASET.
+        """
+        if dataset is None:
+            dataset = os.environ.get('ELEVATION_DATASET', 'srtm30m')
+        parts = (
+            f"{tx_lat:.{COORD_DECIMALS}f}", f"{tx_lon:.{COORD_DECIMALS}f}",
+            f"{rx_lat:.{COORD_DECIMALS}f}", f"{rx_lon:.{COORD_DECIMALS}f}",
+            f"{frequency_mhz:.3f}", f"{tx_height:.2f}", f"{rx_height:.2f}",
+            model, environment, f"{k_factor:.4f}", f"{clutter_height:.2f}", clutter_mode,
+        )
+        return f"link:{dataset}:g{self._current_generation()}:" + ":".join(parts)
+
+    def get(self, key):
+        """
+        Returns: cached result dict (a shallow copy) or None.
+        """
+        with self._lock:
+            result = self._local.get(key)
+            if result is not None:
+                self._local.move_to_end(key)
+        if result is not None:
+            metrics.LINK_CACHE.labels('local', 'hit').inc()
+            return dict(result)
+        metrics.LINK_CACHE.labels('local', 'miss').inc()
+
+        try:
+            packed = self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Link cache read failed: {e}")
+            packed = None
+        if not packed:
+            metrics.LINK_CACHE.labels('redis', 'miss').inc()
+            return None
+        metrics.LINK_CACHE.labels('redis', 'hit').inc()
+
+        result = msgpack.unpackb(packed)
+        self._remember(key, result)
+        return dict(result)
+
+    def set(self, key, result):
+        self._remember(key, result)
+        try:
+            self.redis.setex(key, self.ttl, msgpack.packb(result))
+        except Exception as e:
+            logger.warning(f"Link cache write failed: {e}")
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._local[key] = dict(result)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+    def invalidate(self):
+        """
+        Drop every cached link (e.g. after the elevation tiles were refreshed).
+        """
+        with self._lock:
+            self._local.clear()
+        try:
+            self._generation = int(self.redis.incr(GENERATION_KEY))
+        except Exception as e:
+            logger.warning(f"Link cache invalidation failed: {e}")
+            self._generation = (self._generation or 0) + 1
+        self._generation_checked = time.monotonic()
+        logger.info(f"Link cache invalidated (generation {self._generation})")
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# MeshCore node overlay served from an in-process snapshot.
+#
+# A background task fetches the upstream node list every REFRESH_SECONDS and
+# swaps in a new grid index; requests only ever read the current snapshot, so
+# they never wait on the upstream. A request that finds the snapshot older
+# than REFRESH_SECONDS (refresher stalled, or never started) still gets it and
+# schedules one refresh (stale-while-revalidate). The snapshot is mirrored to
+# Redis so other API workers and restarts can adopt it instead of refetching.
+
+API_URL = os.environ.get("MESHCORE_API_URL", "https://api.meshcore.nz/api/v1/map/nodes")
+REFRESH_SECONDS = float(os.environ.get("MESHCORE_REFRESH_SECONDS", 300))
+FETCH_TIMEOUT = 10.0
+SNAPSHOT_KEY = "meshcore:snapshot"
+SNAPSHOT_TTL = 24 * 60 * 60
+
+CELL_DEG = 0.5  # Index cell; a few hundred rows cover the globe
+# Below this zoom, nodes sharing a CLUSTER_PX screen cell are merged
+CLUSTER_MAX_ZOOM = int(os.environ.get("MESHCORE_CLUSTER_MAX_ZOOM", 9))
+CLUSTER_PX = 64
+
+
+class NodeIndex:
+    """
+    Uniform lat/lon grid over node positions.
+
+    Node ids are sorted by (row, col) cell key, so a bbox query is one
+    searchsorted pair per cell row followed by an exact bounds test on the
+    candidates.
+    """
+
+    def __init__(self, nodes, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self.n_cols = int(math.ceil(360.0 / cell_deg))
+        self.n_rows = int(math.ceil(180.0 / cell_deg))
+
+        valid = [n for n in nodes if _position(n) is not None]
+        positions = np.array([_position(n) for n in valid], dtype=np.float64).reshape(-1, 2)
+        keys = self._rows(positions[:, 0]) * self.n_cols + self._cols(positions[:, 1])
+        order = np.argsort(keys, kind="stable")
+
+        self.nodes = [valid[i] for i in order]
+        self.lats = positions[order, 0]
+        self.lons = positions[order, 1]
+        self.keys = keys[order]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _rows(self, lats):
+        return np.clip(((np.asarray(lats) + 90.0) // self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+
+    def _cols(self, lons):
+        return np.clip(((np.asarray(lons) + 180.0) // self.cell_deg).astype(np.int64), 0, self.n_cols - 1)
+
+    def query(self, south, west, north, east):
+        """
+        Positions (into self.nodes) of nodes inside the bbox, in index order.
+        A bbox with west > east crosses the antimeridian.
+        """
+        if west > east:
+            return np.concatenate((self.query(south, west, north, 180.0), self.query(south, -180.0, north, east)))
+        if not len(self) or south > north:
+            return np.empty(0, dtype=np.int64)
+
+        c0, c1 = int(self._cols(west)), int(self._cols(east))
+        spans = []
+        for row in range(int(self._rows(south)), int(self._rows(north)) + 1):
+            lo = np.searchsorted(self.keys, row * self.n_cols + c0, side="left")
+            hi = np.searchsorted(self.keys, row * self.n_cols + c1, side="right")
+            if hi > lo:
+                spans.append(np.arange(lo, hi))
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        ids = np.concatenate(spans)
+        lats, lons = self.lats[ids], self.lons[ids]
+        return ids[(lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)]
+
+
+def _position(node):
+    try:
+        lat, lon = float(node["latitude"]), float(node["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return lat, lon
+
+
+def cluster(index, ids, zoom):
+    """
+    Merge nodes that fall in the same CLUSTER_PX Web Mercator screen cell
+    at zoom. Returns (single nodes, clusters), where each cluster is its
+    mean position and node count.
+    """
+    scale = 2.0 ** zoom * 256.0 / CLUSTER_PX
+    lats, lons = index.lats[ids], index.lons[ids]
+    x = np.floor((lons + 180.0) / 360.0 * scale)
+    sin_lat = np.clip(np.sin(np.radians(lats)), -0.9999, 0.9999)
+    y = np.floor((0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)) * scale)
+
+    _, group, counts = np.unique(np.stack((x, y), axis=1), axis=0, return_inverse=True, return_counts=True)
+    group = group.reshape(-1)
+    singles = [index.nodes[i] for i, g in zip(ids, group) if counts[g] == 1]
+    clusters = []
+    for g in np.flatnonzero(counts > 1):
+        members = group == g
+        clusters.append({
+            "latitude": round(float(lats[members].mean()), 6),
+            "longitude": round(float(lons[members].mean()), 6),
+            "count": int(counts[g]),
+        })
+    return singles, clusters
+
+
+class MeshCoreNodes:
+    """
+    Spatially indexed snapshot of the MeshCore node map, kept fresh by a
+    background task (see module comment).
+    """
+
+    def __init__(self, redis_client, api_url=API_URL, refresh_seconds=REFRESH_SECONDS, timeout=FETCH_TIMEOUT,
+                 transport=None):
+        self.redis = redis_client
+        self.api_url = api_url
+        self.refresh_seconds = refresh_seconds
+        self.timeout = timeout
+        self.transport = transport  # httpx transport override (tests)
+
+        self.index = NodeIndex([])
+        self.fetched_at = None   # Upstream fetch time (UTC datetime)
+        self._loaded_at = None   # time.monotonic() equivalent of fetched_at
+        self._refresh = None     # In-flight refresh task
+        self._runner = None      # Background refresh loop
+
+    def age(self):
+        """
+        Seconds since the snapshot was fetched upstream (inf before the first).
+        """
+        return math.inf if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    async def _load_shared(self):
+        """
+        Adopt a snapshot another worker mirrored to Redis if it is newer than
+        ours and still fresh. Returns True if adopted.
+        """
+        try:
+            raw = await asyncio.to_thread(self.redis.get, SNAPSHOT_KEY)
+        except Exception as e:
+            logger.warning(f"MeshCore snapshot lookup failed: {e}")
+            return False
+        if not raw:
+            return False
+        snapshot = await asyncio.to_thread(json.loads, raw)
+        fetched_at = datetime.fromisoformat(snapshot["fetched_at"])
+        if self.fetched_at is not None and fetched_at <= self.fetched_at:
+            return False
+        age = (datetime.now(timezone.utc) - fetched_at).total_seconds()
+        if age >= self.refresh_seconds:
+            return False
+        index = await asyncio.to_thread(NodeIndex, snapshot["nodes"])
+        self.index, self.fetched_at, self._loaded_at = index, fetched_at, time.monotonic() - max(age, 0.0)
+        return True
+
+    async def _fetch(self):
+        async with httpx.AsyncClient(transport=self.transport) as client:
+            resp = await client.get(self.api_url, timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        fetched_at = datetime.now(timezone.utc)
+        nodes = data.get("nodes", []) if isinstance(data, dict) else data
+        index = await asyncio.to_thread(NodeIndex, nodes)
+        self.index, self.fetched_at, self._loaded_at = index, fetched_at, time.monotonic()
+
+        snapshot = await asyncio.to_thread(json.dumps, {"fetched_at": fetched_at.isoformat(), "nodes": index.nodes})
+        try:
+            await asyncio.to_thread(self.redis.setex, SNAPSHOT_KEY, SNAPSHOT_TTL, snapshot)
+        except Exception as e:
+            logger.warning(f"MeshCore snapshot store failed: {e}")
+
+    async def refresh(self):
+        """
+        Bring the snapshot up to date: adopt a fresh shared one, else fetch
+        upstream. On failure the previous snapshot stays in place.
+        """
+        try:
+            if not await self._load_shared():
+                await self._fetch()
+        except Exception as e:
+            if self._loaded_at is None:
+                logger.warning(f"MeshCore node refresh failed (no snapshot yet): {e}")
+            else:
+                logger.warning(f"MeshCore node refresh failed (serving snapshot aged {self.age():.0f}s): {e}")
+
+    def revalidate(self):
+        """
+        Schedule a refresh unless one is already running. Returns its task.
+        """
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.get_running_loop().create_task(self.refresh())
+        return self._refresh
+
+    async def _run(self):
+        while True:
+            await self.revalidate()
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        for task in (self._runner, self._refresh):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._runner = self._refresh = None
+
+    def query(self, south, west, north, east, zoom=None):
+        """
+        Nodes inside the bbox from the current snapshot, without waiting on
+        the upstream. Below CLUSTER_MAX_ZOOM, nearby nodes come back as
+        clusters. A snapshot older than refresh_seconds is served as-is and
+        revalidated in the background.
+        """
+        stale = self.age() >= self.refresh_seconds
+        if stale:
+            self.revalidate()
+
+        index = self.index
+        ids = index.query(south, west, north, east)
+        if zoom is not None and zoom <= CLUSTER_MAX_ZOOM:
+            nodes, clusters = cluster(index, ids, zoom)
+        else:
+            nodes, clusters = [index.nodes[i] for i in ids], []
+        return {
+            "nodes": nodes,
+            "clusters": clusters,
+            "count": len(ids),
+            "fetched_at": self.fetched_at.isoformat() if self.fetched_at else None,
+            "stale": stale,
+        }
@@ -0,0 +1,146 @@
+import os
+import time
+import weakref
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Prometheus instrumentation for the rf-engine.
+#
+# Counters and histograms are cheap (a lock + float add) and safe to leave on.
+# The Celery worker runs prefork children, so it sets PROMETHEUS_MULTIPROC_DIR
+# and exposes an aggregated registry on WORKER_METRICS_PORT (see worker.py).
+# The API process serves its own registry on /metrics.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TASK_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+TILE_CACHE = Counter(
+    "meshrf_tile_cache_total",
+    "Terrain tile lookups by cache tier and result (hit/miss)",
+    ["tier", "result"]
+)
+LINK_CACHE = Counter(
+    "meshrf_link_cache_total",
+    "Link analysis result lookups by cache tier and result (hit/miss)",
+    ["tier", "result"]
+)
+ELEVATION_FETCH_SECONDS = Histogram(
+    "meshrf_elevation_fetch_seconds",
+    "OpenTopoData batch request latency",
+    buckets=LATENCY_BUCKETS
+)
+ELEVATION_FETCH_ERRORS = Counter(
+    "meshrf_elevation_fetch_errors_total",
+    "OpenTopoData batch request failures",
+    ["reason"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "meshrf_http_request_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+VIEWSHED_CELLS = Counter(
+    "meshrf_viewshed_cells_total",
+    "Viewshed cells evaluated (divide by meshrf_viewshed_seconds_sum for cells/s)"
+)
+VIEWSHED_SECONDS = Histogram(
+    "meshrf_viewshed_seconds",
+    "Single-site viewshed computation time",
+    buckets=LATENCY_BUCKETS
+)
+TASK_SECONDS = Histogram(
+    "meshrf_celery_task_seconds",
+    "Celery task duration by task name and final state",
+    ["task", "state"],
+    buckets=TASK_BUCKETS
+)
+
+
+class ExecutorCollector:
+    """
+    Reports the pending work-queue depth of registered thread pools at scrape time.
+    Reading qsize() on scrape keeps the hot path free of gauge updates.
+    """
+
+    def __init__(self):
+        self._executors = weakref.WeakValueDictionary()
+
+    def track(self, name, executor):
+        self._executors[name] = executor
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "meshrf_executor_queue_depth",
+            "Work items waiting in thread pool queues",
+            labels=["executor"]
+        )
+        for name, executor in list(self._executors.items()):
+            queue = getattr(executor, "_work_queue", None)
+            family.add_metric([name], queue.qsize() if queue is not None else 0)
+        yield family
+
+
+executor_collector = ExecutorCollector()
+REGISTRY.register(executor_collector)
+
+
+def track_executor(name, executor):
+    executor_collector.track(name, executor)
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+    Labels use the matched route template (e.g. /tiles/{z}/{x}/{y}.png) to keep cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], path, str(status[0])).observe(
+                time.perf_counter() - start
+            )
+
+
+def multiprocess_registry():
+    """
+    Registry aggregating every process that writes to PROMETHEUS_MULTIPROC_DIR.
+    """
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_latest():
+    """
+    Returns: (payload bytes, content type) for a /metrics response.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = multiprocess_registry()
+        registry.register(executor_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Literal, Optional, Tuple
+
+# How clutter_height combines with the clutter raster (tile_manager.CLUTTER_MODES)
+ClutterMode = Literal["auto", "uniform", "raster"]
 
 class NodeConfig(BaseModel):
     id: str
@@ -8,6 +11,7 @@ class NodeConfig(BaseModel):
     height: float = 10.0
     name: Optional[str] = None
     radius: float = 5000.0  # Max coverage radius in meters
+    cost: float = 1.0  # Relative deployment cost (used by the site optimizer)
 
     @field_validator('lat')
     @classmethod
@@ -37,5 +41,85 @@ class CoverageResult(BaseModel):
 class OptimizationScenario(BaseModel):
     candidate_nodes: List[NodeConfig]
     num_nodes_to_place: int = 3
-    objectives: dict = {"coverage": 1.0, "cost": 0.0}
+    objectives: dict = {"coverage": 1.0, "cost": 0.0, "connectivity": 0.0}
     constraints: dict = {"max_cost": 1000}
+    radius: float = 5000.0
+    frequency_mhz: float = 915.0
+    rx_height: float = 2.0
+    k_factor: float = 1.333
+    clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
+    max_link_km: Optional[float] = None  # Defaults to 2x radius
+    population_size: int = 64
+    generations: int = 40
+    seed: Optional[int] = None
+
+    @field_validator('num_nodes_to_place')
+    @classmethod
+    def validate_num_nodes(cls, v):
+        if v < 1:
+            raise ValueError('num_nodes_to_place must be at least 1')
+        return v
+
+    @field_validator('population_size')
+    @classmethod
+    def validate_population(cls, v):
+        if not 8 <= v <= 512:
+            raise ValueError('population_size must be between 8 and 512')
+        return v
+
+    @field_validator('generations')
+    @classmethod
+    def validate_generations(cls, v):
+        if not 1 <= v <= 500:
+            raise ValueError('generations must be between 1 and 500')
+        return v
+
+MAX_SWEEP_COMBINATIONS = 4096 # core.sweep.MAX_COMBINATIONS
+
+class ScenarioGrid(BaseModel):
+    """
+    Parameter axes of a scenario sweep (core/sweep.py). Heights left unset
+    use the request's own tx/rx height.
+    """
+    k_factors: List[float] = [1.0, 1.333]
+    frequencies_mhz: List[float] = [915.0]
+    tx_heights: Optional[List[float]] = None
+    rx_heights: Optional[List[float]] = None
+
+    @field_validator('k_factors', 'frequencies_mhz', 'tx_heights', 'rx_heights')
+    @classmethod
+    def validate_axis(cls, v):
+        if v is not None and not 1 <= len(v) <= 64:
+            raise ValueError('Sweep axes take between 1 and 64 values')
+        return v
+
+    @field_validator('k_factors')
+    @classmethod
+    def validate_k_factors(cls, v):
+        if any(not k > 0 for k in v):
+            raise ValueError('k-factors must be positive (inf for a flat earth)')
+        return v
+
+    @field_validator('frequencies_mhz')
+    @classmethod
+    def validate_frequencies(cls, v):
+        if any(not 0 < f < 1e6 for f in v):
+            raise ValueError('Frequencies must be positive MHz values')
+        return v
+
+    @model_validator(mode='after')
+    def validate_size(self):
+        n = len(self.k_factors) * len(self.frequencies_mhz)
+        n *= len(self.tx_heights or [0]) * len(self.rx_heights or [0])
+        if n > MAX_SWEEP_COMBINATIONS:
+            raise ValueError(f'Sweep exceeds {MAX_SWEEP_COMBINATIONS} combinations')
+        return self
+
+    def axes(self, tx_height, rx_height):
+        """
+        (k_factors, frequencies_mhz, tx_heights, rx_heights) with defaults filled in.
+        """
+        tx = self.tx_heights if self.tx_heights is not None else [tx_height]
+        rx = self.rx_heights if self.rx_heights is not None else [rx_height]
+        return self.k_factors, self.frequencies_mhz, tx, rx
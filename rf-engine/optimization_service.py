@@ -3,48 +3,34 @@ import numpy as np
 
 import math
 import rf_physics
+from core import geodesy
+from core.prominence import ProminenceCache
+from core.profile_planner import band_samples, plan_samples
 
 class OptimizationService:
     def __init__(self, tile_manager):
         self.tile_manager = tile_manager
+        self.prominence_cache = ProminenceCache(tile_manager)
 
     def calculate_prominence(self, lat, lon, radius_km=5.0):
         """
-        Calculate topographic prominence: height of peak relative to the lowest
-        contour line encircling it but no higher summit.
-        Simplified approximation for grid: Peak Elevation - Mean Elevation in neighborhood.
+        Topographic prominence: height of the point above the key col of its
+        hill (the highest col leading to higher ground), searched within
+        radius_km. Served from the cached key-col window of the region.
         """
-        delta_deg = radius_km / 111.0
-        
-        # Sampling grid around point (10x10)
-        steps = 10
-        min_lat, max_lat = lat - delta_deg, lat + delta_deg
-        min_lon, max_lon = lon - delta_deg, lon + delta_deg
-        
-        lat_step = (max_lat - min_lat) / steps
-        lon_step = (max_lon - min_lon) / steps
-        
-        coords = []
-        for i in range(steps + 1):
-            for j in range(steps + 1):
-                c_lat = min_lat + (i * lat_step)
-                c_lon = min_lon + (j * lon_step)
-                coords.append((c_lat, c_lon))
-                
-        elevs = self.tile_manager.get_elevations_batch(coords)
-        
-        if not elevs:
-            return 0
-            
-        center_elevation = self.tile_manager.get_elevation(lat, lon)
-        mean_elevation = sum(elevs) / len(elevs)
-        
-        # Prominence approximation: Peak - Mean
-        prominence = center_elevation - mean_elevation
-        
-        return max(0, prominence)
+        return float(self.calculate_prominence_batch(
+            [lat], [lon], elevations=[self.tile_manager.get_elevation(lat, lon)], radius_km=radius_km
+        )[0])
 
-    def check_fresnel_clearance(self, tx_lat, tx_lon, tx_h_m, rx_list, freq_mhz, k_factor=1.333, clutter_height=0.0):
+    def calculate_prominence_batch(self, lats, lons, elevations=None, radius_km=5.0):
+        """
+        calculate_prominence() for arrays of points, by lookup in one window.
+        Returns: array shaped like lats.
+        """
+        return self.prominence_cache.prominence(lats, lons, elevations, margin_m=radius_km * 1000.0)
+
+    def check_fresnel_clearance(self, tx_lat, tx_lon, tx_h_m, rx_list, freq_mhz, k_factor=1.333, clutter_height=0.0,
+                                clutter_mode="auto"):
         """
         Check Fresnel zone clearance to a list of existing nodes.
         Rx_list: list of dicts {lat, lon, height}
@@ -60,15 +46,19 @@ class OptimizationService:
             dist_m = rf_physics.haversine_distance(tx_lat, tx_lon, rx['lat'], rx['lon'])
             if dist_m < 100: continue # Skip too close
             
-            # Get profile
-            profile = self.tile_manager.get_elevation_profile(
-                tx_lat, tx_lon, rx['lat'], rx['lon'], samples=20
+            # Get profile (sample count follows distance and terrain resolution)
+            samples = plan_samples(
+                dist_m, self.tile_manager.effective_resolution_m(tx_lat), purpose="fresnel"
+            )
+            profile, clutter = self.tile_manager.get_elevation_profiles(
+                tx_lat, tx_lon, rx['lat'], rx['lon'], samples=samples,
+                clutter_height=clutter_height, clutter_mode=clutter_mode
             )
             
             # Analyze
             res = rf_physics.analyze_link(
                 profile, dist_m, freq_mhz, tx_h_m, rx['height'],
-                k_factor=k_factor, clutter_height=clutter_height
+                k_factor=k_factor, clutter_height=clutter
             )
             
             # Use min_clearance_ratio from rf_physics
@@ -85,6 +75,47 @@ class OptimizationService:
             
         return total_clearance / count if count > 0 else 1.0
 
+    def check_fresnel_clearance_batch(self, tx_lats, tx_lons, tx_h_m, rx_list, freq_mhz, k_factor=1.333, clutter_height=0.0,
+                                      clutter_mode="auto"):
+        """
+        check_fresnel_clearance() for many candidate sites at once.
+        Every candidate/node profile is looked up in one vectorized pass.
+        Returns: (N,) average clearance per candidate.
+        """
+        tx_lats = np.asarray(tx_lats, dtype=np.float64)
+        tx_lons = np.asarray(tx_lons, dtype=np.float64)
+        if not rx_list or tx_lats.size == 0:
+            return np.ones(tx_lats.size)
+
+        rx_lats = np.array([rx['lat'] for rx in rx_list], dtype=np.float64)
+        rx_lons = np.array([rx['lon'] for rx in rx_list], dtype=np.float64)
+        rx_h = np.array([rx['height'] for rx in rx_list], dtype=np.float64)
+        cand = np.repeat(np.arange(tx_lats.size), len(rx_list))
+        node = np.tile(np.arange(len(rx_list)), tx_lats.size)
+        dist_m = geodesy.haversine(tx_lats[cand], tx_lons[cand], rx_lats[node], rx_lons[node])
+        keep = dist_m >= 100 # Skip too close
+        cand, node, dist_m = cand[keep], node[keep], dist_m[keep]
+
+        total = np.zeros(tx_lats.size)
+        count = np.zeros(tx_lats.size)
+        if cand.size:
+            samples = band_samples(plan_samples(
+                dist_m, self.tile_manager.effective_resolution_m(float(np.mean(tx_lats))), purpose="fresnel"
+            ))
+            groups = self.tile_manager.get_elevation_profile_groups(
+                tx_lats[cand], tx_lons[cand], rx_lats[node], rx_lons[node], samples,
+                clutter_height=clutter_height, clutter_mode=clutter_mode
+            )
+            for idx, profiles, clutter in groups:
+                ratios = rf_physics.min_clearance_ratio_batch(
+                    profiles, dist_m[idx], freq_mhz, tx_h_m, rx_h[node[idx]],
+                    k_factor=k_factor, clutter_height=clutter
+                )
+                # Blocked counts as 0, clearance is capped at 1.0 (100%)
+                np.add.at(total, cand[idx], np.clip(ratios, 0.0, 1.0))
+                np.add.at(count, cand[idx], 1)
+        return np.where(count > 0, total / np.maximum(count, 1), 1.0)
+
     def score_candidate(self, candidate, weights, rx_list=None, tx_height=10.0, rx_height=2.0, freq_mhz=915.0, k_factor=1.333, clutter_height=0.0):
         """
         candidate: {lat, lon, elevation}
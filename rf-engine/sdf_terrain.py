@@ -0,0 +1,211 @@
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Offline elevation source backed by SPLAT! SDF terrain blocks.
+#
+# An SDF file covers one 1x1 degree block. The header is four lines,
+# max_west, min_north, min_west, max_north (longitudes in degrees WEST,
+# 0-360), followed by ppd x ppd integer elevations in meters (1200 for
+# 3-arcsecond blocks, 3600 for "-hd"). SPLAT stores them row by row from
+# the southern edge northwards, each row running from east to west.
+#
+# Parsing the text takes a second or two per block, so every block is
+# converted once to a north-up int16 .npy next to it (or in cache_dir) and
+# memory-mapped from then on: processes share the pages through the OS cache.
+
+SDF_SUFFIX = ".sdf"
+# Some SMB/Windows checkouts store ':' in file names as U+F03A
+COLON_ALIASES = ("\uf03a",)
+
+
+def read_sdf_header(path):
+    """
+    Returns: (max_west, min_north, min_west, max_north) as ints.
+    """
+    with open(path, "r") as f:
+        values = [int(float(f.readline())) for _ in range(4)]
+    return tuple(values)
+
+
+def parse_sdf(path):
+    """
+    Parse an SDF block.
+    Returns: (header, elevation) with elevation an int16 (ppd, ppd) array,
+    north-up (row 0 = max_north) and west to east (column 0 = max_west).
+    """
+    header = read_sdf_header(path)
+    with open(path, "r") as f:
+        for _ in range(4):
+            f.readline()
+        values = np.array(f.read().split(), dtype=np.float64)
+
+    ppd = math.isqrt(values.size)
+    if ppd < 2 or ppd * ppd != values.size:
+        raise ValueError(f"{path}: {values.size} samples is not a square SDF block")
+
+    # File order is [south->north][east->west]; flip both axes to north-up, west-east
+    elevation = np.clip(np.rint(values), -32768, 32767).astype(np.int16).reshape(ppd, ppd)
+    return header, np.ascontiguousarray(elevation[::-1, ::-1])
+
+
+class SDFTerrain:
+    """
+    Elevation lookups from a directory of SDF blocks.
+    Blocks are indexed by their header at startup and loaded on first use.
+    """
+
+    def __init__(self, directory, cache_dir=None):
+        self.directory = directory
+        self.cache_dir = cache_dir or directory
+        self._paths = {}   # (min_north, min_west) -> sdf path
+        self._blocks = {}  # (min_north, min_west) -> (ppd, ppd) int16
+        self._lock = threading.Lock()
+
+        for name in sorted(os.listdir(directory)):
+            if not name.lower().endswith(SDF_SUFFIX):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                _, min_north, min_west, _ = read_sdf_header(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable SDF {path}: {e}")
+                continue
+            key = (min_north, min_west % 360)
+            # Prefer the high-definition block when both exist
+            if key not in self._paths or "-hd" in name.lower():
+                self._paths[key] = path
+        logger.info(f"SDF terrain: {len(self._paths)} blocks in {directory}")
+
+    def __len__(self):
+        return len(self._paths)
+
+    def _npy_path(self, sdf_path):
+        stem = os.path.splitext(os.path.basename(sdf_path))[0]
+        for alias in COLON_ALIASES:
+            stem = stem.replace(alias, ":")
+        return os.path.join(self.cache_dir, stem.replace(":", "_") + ".npy")
+
+    def _block(self, key):
+        block = self._blocks.get(key)
+        if block is not None:
+            return block
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                block = self._load(self._paths[key])
+                self._blocks[key] = block
+        return block
+
+    def _load(self, sdf_path):
+        npy_path = self._npy_path(sdf_path)
+        try:
+            if os.path.getmtime(npy_path) >= os.path.getmtime(sdf_path):
+                return np.load(npy_path, mmap_mode="r")
+        except (OSError, ValueError):
+            pass
+
+        _, elevation = parse_sdf(sdf_path)
+        tmp_path = f"{npy_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, elevation)
+            os.replace(tmp_path, npy_path)  # Atomic: concurrent converters never see a partial file
+            logger.info(f"Converted {sdf_path} -> {npy_path}")
+            return np.load(npy_path, mmap_mode="r")
+        except OSError as e:
+            logger.warning(f"Cannot write {npy_path} ({e}); keeping SDF block in memory")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return elevation
+
+    def covers(self, lats, lons):
+        """
+        Boolean mask of points inside a known block.
+        """
+        north, west = _block_keys(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        return np.array([(int(n), int(w)) in self._paths for n, w in zip(north.ravel(), west.ravel())],
+                        dtype=bool).reshape(north.shape)
+
+    def sample_elevations(self, lats, lons):
+        """
+        Bilinear elevation lookup for arrays of any shape.
+        Returns: (elevation, covered); elevation is 0.0 where not covered.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        shape = np.broadcast_shapes(lats.shape, lons.shape)
+        lats = np.broadcast_to(lats, shape).ravel()
+        lons = np.broadcast_to(lons, shape).ravel()
+
+        result = np.zeros(lats.size)
+        covered = np.zeros(lats.size, dtype=bool)
+        if lats.size == 0 or not self._paths:
+            return result.reshape(shape), covered.reshape(shape)
+
+        north, west = _block_keys(lats, lons)
+        packed = north * 360 + west
+        for key in np.unique(packed):
+            block_key = (int(key // 360), int(key % 360))
+            if block_key not in self._paths:
+                continue
+            idx = np.nonzero(packed == key)[0]
+            block = self._block(block_key)
+            ppd = block.shape[0]
+
+            # Pixel (r, c) sits at lat = min_north + (ppd - 1 - r) / ppd and
+            # west longitude = min_west + 1 - c / ppd (SPLAT's own indexing)
+            w = (-lons[idx]) % 360.0
+            r = np.clip((ppd - 1) - (lats[idx] - block_key[0]) * ppd, 0, ppd - 1)
+            c = np.clip((block_key[1] + 1 - w) * ppd, 0, ppd - 1)
+            r0 = np.floor(r).astype(np.intp)
+            c0 = np.floor(c).astype(np.intp)
+            r1 = np.minimum(r0 + 1, ppd - 1)
+            c1 = np.minimum(c0 + 1, ppd - 1)
+            fr = r - r0
+            fc = c - c0
+
+            top = block[r0, c0] * (1 - fc) + block[r0, c1] * fc
+            bottom = block[r1, c0] * (1 - fc) + block[r1, c1] * fc
+            result[idx] = top * (1 - fr) + bottom * fr
+            covered[idx] = True
+
+        return result.reshape(shape), covered.reshape(shape)
+
+    def get_elevation(self, lat, lon):
+        """
+        Elevation at one point, or None when no block covers it.
+        """
+        value, covered = self.sample_elevations(np.array([lat]), np.array([lon]))
+        return float(value[0]) if covered[0] else None
+
+
+def _block_keys(lats, lons):
+    """
+    (min_north, min_west) of the block containing each point.
+    """
+    west = (-lons) % 360.0
+    return np.floor(lats).astype(np.int64), np.floor(west).astype(np.int64) % 360
+
+
+def from_env():
+    """
+    SDFTerrain for TERRAIN_SDF_DIR, or None when unset, empty or unreadable
+    (the TileManager then uses OpenTopoData tiles only).
+    """
+    directory = os.environ.get("TERRAIN_SDF_DIR")
+    if not directory:
+        return None
+    try:
+        terrain = SDFTerrain(directory, cache_dir=os.environ.get("TERRAIN_SDF_CACHE_DIR") or None)
+    except OSError as e:
+        logger.warning(f"SDF terrain disabled ({directory}): {e}")
+        return None
+    return terrain if len(terrain) else None
@@ -1,9 +1,7 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import Optional
-import io
 from starlette.responses import Response
-from PIL import Image
 import numpy as np
 import mercantile
 import os
@@ -13,9 +11,19 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from starlette.requests import Request
 from pydantic import field_validator
+import metrics
+from metrics import PrometheusMiddleware
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app):
+    # Background services defined further down (MeshCore node refresher)
+    meshcore_nodes.start()
+    yield
+    await meshcore_nodes.stop()
 
 limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="MeshRF Engine")
+app = FastAPI(title="MeshRF Engine", lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -26,12 +34,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PrometheusMiddleware)
 
 # --- Dependencies ---
 import redis
 from tile_manager import TileManager
 import rf_physics
+import terrain_rgb
 from optimization_service import OptimizationService
+from link_cache import LinkCache
+from models import ClutterMode, ScenarioGrid
+from core import geodesy
+from core import site_search, sweep, total_viewshed
+from core.algorithms import find_relay_chain
+from core.profile_planner import band_samples, plan_profile, plan_samples
 
 # --- Initialization ---
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
@@ -40,6 +56,12 @@ REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD", "changeme")
 redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, password=REDIS_PASSWORD)
 tile_manager = TileManager(redis_client)
 optimization_service = OptimizationService(tile_manager)
+link_cache = LinkCache(redis_client)
+tile_manager.add_invalidation_hook(link_cache.invalidate)
+tile_manager.add_invalidation_hook(optimization_service.prominence_cache.clear)
+
+MAX_BATCH_LINKS = 5000 # 100-node full mesh = 4950 pairs
+MAX_SWEEP_SITES = 50
 
 class LinkRequest(BaseModel):
     tx_lat: float
@@ -49,10 +71,12 @@ class LinkRequest(BaseModel):
     frequency_mhz: float
     tx_height: float
     rx_height: float
-    model: str = "bullington" # bullington, fspl
+    model: str = "bullington" # bullington, deygout, fspl, hata
     environment: str = "suburban"
     k_factor: float = 1.333
     clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto" # Raster clutter where available (see TileManager.sample_clutter)
+    sweep: Optional[ScenarioGrid] = None # Also evaluate a k-factor/frequency/height grid on the same profile
 
     @field_validator('tx_lat', 'rx_lat')
     @classmethod
@@ -73,18 +97,37 @@ def calculate_link_endpoint(req: LinkRequest):
     """
     Synchronous endpoint for real-time link analysis.
     Uses cached TileManager to fetch elevation profile.
+    Results are memoized in link_cache (keyed by ~1 m quantized endpoints + parameters).
+    With `sweep`, the response also carries a (k, frequency, tx height, rx
+    height) cube evaluated on the same profile (core/sweep.py).
     """
+    cache_key = link_cache.key(
+        req.tx_lat, req.tx_lon, req.rx_lat, req.rx_lon,
+        req.frequency_mhz, req.tx_height, req.rx_height,
+        req.model, req.environment, req.k_factor, req.clutter_height, req.clutter_mode
+    )
+    # A sweep needs the profile, so it always samples terrain
+    cached = link_cache.get(cache_key) if req.sweep is None else None
+    if cached is not None:
+        return cached
+
     # Calculate distance between points
     dist_m = rf_physics.haversine_distance(
         req.tx_lat, req.tx_lon,
         req.rx_lat, req.rx_lon
     )
     
-    # Get elevation profile along path
-    elevs = tile_manager.get_elevation_profile(
+    # Sample density follows path length and the served terrain resolution
+    plan = plan_profile(
+        dist_m, tile_manager.effective_resolution_m((req.tx_lat + req.rx_lat) / 2.0), purpose="link"
+    )
+    
+    # Get elevation profile along path, with clutter from the same sample points
+    elevs, clutter = tile_manager.get_elevation_profiles(
         req.tx_lat, req.tx_lon,
         req.rx_lat, req.rx_lon,
-        samples=100 # Increased samples for ITM accuracy
+        samples=plan["samples"],
+        clutter_height=req.clutter_height, clutter_mode=req.clutter_mode
     )
     
     # Calculate Path Loss (ITM or FSPL)
@@ -98,7 +141,7 @@ def calculate_link_endpoint(req: LinkRequest):
         model=req.model,
         environment=req.environment,
         k_factor=req.k_factor,
-        clutter_height=req.clutter_height
+        clutter_height=clutter
     )
     
     # Analyze link with correct signature
@@ -109,14 +152,157 @@ def calculate_link_endpoint(req: LinkRequest):
         req.tx_height,
         req.rx_height,
         k_factor=req.k_factor,
-        clutter_height=req.clutter_height
+        clutter_height=clutter
     )
     
     result['path_loss_db'] = float(path_loss_db)
     result['model_used'] = req.model
+    result['profile_plan'] = plan
     
+    link_cache.set(cache_key, result)
+    if req.sweep is not None:
+        result['sweep'] = sweep.link_sweep_report(
+            elevs, dist_m, *req.sweep.axes(req.tx_height, req.rx_height),
+            clutter_height=clutter, model=req.model, environment=req.environment
+        )
     return result
 
+class LinkEndpoints(BaseModel):
+    tx_lat: float
+    tx_lon: float
+    rx_lat: float
+    rx_lon: float
+    tx_height: Optional[float] = None # Falls back to the request-level height
+    rx_height: Optional[float] = None
+    id: Optional[str] = None
+
+    @field_validator('tx_lat', 'rx_lat')
+    @classmethod
+    def validate_lat(cls, v):
+        if not -90 <= v <= 90:
+            raise ValueError('Latitude must be between -90 and 90')
+        return v
+
+    @field_validator('tx_lon', 'rx_lon')
+    @classmethod
+    def validate_lon(cls, v):
+        if not -180 <= v <= 180:
+            raise ValueError('Longitude must be between -180 and 180')
+        return v
+
+class BatchLinkRequest(BaseModel):
+    links: list[LinkEndpoints]
+    frequency_mhz: float
+    tx_height: float = 10.0
+    rx_height: float = 2.0
+    model: str = "bullington"
+    environment: str = "suburban"
+    k_factor: float = 1.333
+    clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
+    include_profile: bool = False # Per-sample arrays are large; summaries by default
+
+    @field_validator('links')
+    @classmethod
+    def validate_links(cls, v):
+        if not 1 <= len(v) <= MAX_BATCH_LINKS:
+            raise ValueError(f'Between 1 and {MAX_BATCH_LINKS} links per request')
+        return v
+
+@app.post("/calculate-links")
+@limiter.limit("20/minute")
+def calculate_links_endpoint(req: BatchLinkRequest, request: Request):
+    """
+    Batch point-to-point analysis: N links in one round-trip.
+    All profiles share one tile fetch pass; clearance and path loss are
+    computed vectorized per sample-count group.
+    """
+    n = len(req.links)
+    tx_lat = np.array([l.tx_lat for l in req.links])
+    tx_lon = np.array([l.tx_lon for l in req.links])
+    rx_lat = np.array([l.rx_lat for l in req.links])
+    rx_lon = np.array([l.rx_lon for l in req.links])
+    tx_h = np.array([req.tx_height if l.tx_height is None else l.tx_height for l in req.links])
+    rx_h = np.array([req.rx_height if l.rx_height is None else l.rx_height for l in req.links])
+
+    dist_m = geodesy.haversine(tx_lat, tx_lon, rx_lat, rx_lon)
+    resolution_m = tile_manager.effective_resolution_m(float(np.mean((tx_lat + rx_lat) / 2.0)))
+
+    results = [None] * n
+    if req.include_profile:
+        # Full results are interchangeable with /calculate-link, so share its cache
+        # and sampling plan (per-link resolution, no banding).
+        keys = [
+            link_cache.key(
+                tx_lat[i], tx_lon[i], rx_lat[i], rx_lon[i], req.frequency_mhz, tx_h[i], rx_h[i],
+                req.model, req.environment, req.k_factor, req.clutter_height, req.clutter_mode
+            )
+            for i in range(n)
+        ]
+        plans = [None] * n
+        for i in range(n):
+            results[i] = link_cache.get(keys[i])
+            if results[i] is None:
+                plans[i] = plan_profile(
+                    dist_m[i], tile_manager.effective_resolution_m((tx_lat[i] + rx_lat[i]) / 2.0), purpose="link"
+                )
+        pending = np.array([i for i in range(n) if results[i] is None], dtype=int)
+        samples = np.array([p["samples"] if p else 0 for p in plans], dtype=int)
+    else:
+        pending = np.arange(n)
+        samples = band_samples(plan_samples(dist_m, resolution_m, purpose="matrix"))
+
+    groups = []
+    if len(pending):
+        groups = tile_manager.get_elevation_profile_groups(
+            tx_lat[pending], tx_lon[pending], rx_lat[pending], rx_lon[pending], samples[pending],
+            clutter_height=req.clutter_height, clutter_mode=req.clutter_mode
+        )
+    for group_idx, profiles, clutter in groups:
+        idx = pending[group_idx]
+        ratios = rf_physics.min_clearance_ratio_batch(
+            profiles, dist_m[idx], req.frequency_mhz, tx_h[idx], rx_h[idx],
+            k_factor=req.k_factor, clutter_height=clutter
+        )
+        losses = rf_physics.calculate_path_loss_batch(
+            dist_m[idx], profiles, req.frequency_mhz, tx_h[idx], rx_h[idx],
+            model=req.model, environment=req.environment,
+            k_factor=req.k_factor, clutter_height=clutter
+        )
+        statuses = rf_physics.link_status(ratios)
+
+        for row, i in enumerate(idx):
+            if req.include_profile:
+                entry = rf_physics.analyze_link(
+                    profiles[row], dist_m[i], req.frequency_mhz, tx_h[i], rx_h[i],
+                    k_factor=req.k_factor, clutter_height=clutter if np.ndim(clutter) == 0 else clutter[row]
+                )
+                entry["path_loss_db"] = float(losses[row])
+                entry["model_used"] = req.model
+                entry["profile_plan"] = plans[i]
+                link_cache.set(keys[i], entry)
+                entry = dict(entry)
+            else:
+                entry = {
+                    "dist_km": float(dist_m[i]) / 1000,
+                    "status": str(statuses[row]),
+                    "min_clearance_ratio": float(ratios[row]),
+                    "path_loss_db": float(losses[row]),
+                    "profile_samples": int(samples[i]),
+                }
+            results[i] = entry
+
+    for i, entry in enumerate(results):
+        entry["id"] = req.links[i].id
+
+    return {
+        "status": "success",
+        "model_used": req.model,
+        "profile_resolution_m": round(resolution_m, 1),
+        "count": n,
+        "links": results
+    }
+
 class ElevationRequest(BaseModel):
     lat: float
     lon: float
@@ -199,32 +385,30 @@ def get_batch_elevation(req: BatchElevationRequest, request: Request):
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint.
+    """
+    payload, content_type = metrics.render_latest()
+    return Response(content=payload, media_type=content_type)
+
 @app.get("/tiles/{z}/{x}/{y}.png")
-def get_elevation_tile(z: int, x: int, y: int):
+def get_elevation_tile(z: int, x: int, y: int, request: Request):
     """
     Serve elevation data as Terrain-RGB tiles.
     Format: height = -10000 + ((R * 256 * 256 + G * 256 + B) * 0.1)
+    Zooms past the base level are resampled from cached base tiles, lower
+    ones from the overview pyramid (TileManager.render_tile).
+    Clients that accept image/webp get lossless WebP, others fast PNG.
     """
-    grid = tile_manager.get_interpolated_grid(x, y, z, size=256)
-    
-    # Encode to Terrain-RGB format
-    # h = -10000 + (v * 0.1) => v = (h + 10000) * 10
-    h_scaled = (grid + 10000) * 10
-    h_scaled = np.clip(h_scaled, 0, 16777215) # Clip to 24-bit max
-    h_scaled = h_scaled.astype(np.uint32)
-    
-    r = (h_scaled >> 16) & 0xFF
-    g = (h_scaled >> 8) & 0xFF
-    b = h_scaled & 0xFF
-    
-    rgb = np.stack((r, g, b), axis=-1).astype(np.uint8)
-    
-    img = Image.fromarray(rgb, mode='RGB')
-    buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    buf.seek(0)
-    
-    return Response(content=buf.getvalue(), media_type="image/png")
+    grid = tile_manager.render_tile(x, y, z, size=256)
+    fmt = terrain_rgb.negotiate(request.headers.get("accept"))
+    return Response(
+        content=terrain_rgb.encode(grid, fmt),
+        media_type=terrain_rgb.MEDIA_TYPES[fmt],
+        headers={"Vary": "Accept"},
+    )
 
 
 
@@ -240,6 +424,8 @@ class ScanRequest(BaseModel):
     rx_height: float = 2.0
     k_factor: float = 1.333
     clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
+    supersedes: Optional[str] = None # Task id of a previous scan to cancel
 
     @field_validator('radius')
     @classmethod
@@ -253,14 +439,18 @@ class ScanRequest(BaseModel):
 def start_scan_endpoint(req: ScanRequest, request: Request):
     """
     Start asynchronous batch viewshed scan (Celery).
+    An identical scan that is still running (or completed recently) is joined
+    instead of enqueued again; `supersedes` cancels the caller's previous scan.
     """
+    from celery.result import AsyncResult
     from tasks.viewshed import calculate_batch_viewshed
+    from tasks import control, routing
+    from worker import celery_app
     
     if not req.nodes:
         return {"status": "error", "message": "No nodes provided"}
 
-    # Start Celery Task
-    task = calculate_batch_viewshed.delay({
+    payload = {
         "nodes": [n.model_dump() for n in req.nodes], # Convert Pydantic models to dicts
         "options": {
             "radius": req.radius,
@@ -268,12 +458,187 @@ def start_scan_endpoint(req: ScanRequest, request: Request):
             "frequency_mhz": req.frequency_mhz,
             "rx_height": req.rx_height,
             "k_factor": req.k_factor,
-            "clutter_height": req.clutter_height
+            "clutter_height": req.clutter_height,
+            "clutter_mode": req.clutter_mode
         }
-    })
+    }
+    fingerprint = control.scan_fingerprint(payload)
+
+    existing_id = control.find_task(redis_client, fingerprint)
+    if existing_id and not control.is_cancelled(redis_client, existing_id):
+        state = AsyncResult(existing_id, app=celery_app).state
+        if state not in ('FAILURE', 'REVOKED'):
+            return {"status": "started", "task_id": existing_id, "deduplicated": True}
+
+    if req.supersedes and req.supersedes != existing_id:
+        _cancel_task(req.supersedes)
+
+    # Start Celery Task on the queue matching its size
+    task, route = routing.submit(
+        calculate_batch_viewshed, payload, routing.estimate_cost(len(req.nodes), req.radius), redis_client
+    )
+    control.register_task(redis_client, fingerprint, task.id, route["time_limit"])
     
-    return {"status": "started", "task_id": task.id}
+    return {"status": "started", "task_id": task.id, "queue": route["queue"]}
+
+
+def _cancel_task(task_id):
+    """
+    Flag a running task for cooperative cancellation and drop it if still queued.
+    """
+    from tasks import control
+    from worker import celery_app
+
+    control.request_cancel(redis_client, task_id)
+    celery_app.control.revoke(task_id)
+
+
+@app.post("/scan/cancel/{task_id}")
+def cancel_scan_endpoint(task_id: str):
+    """
+    Cancel a batch viewshed scan. Running scans stop at their next check
+    (within about a second) and return the results computed so far.
+    """
+    _cancel_task(task_id)
+    return {"status": "cancelling", "task_id": task_id}
+
+
+from models import OptimizationScenario
+
+@app.post("/optimize/start")
+@limiter.limit("5/minute")
+def start_optimization_endpoint(req: OptimizationScenario, request: Request):
+    """
+    Start asynchronous NSGA-II site selection (Celery).
+    Progress and the resulting Pareto front are streamed via /task_status.
+    """
+    from tasks.optimize import run_optimization
+    from tasks import routing
+
+    if not req.candidate_nodes:
+        return {"status": "error", "message": "No candidate nodes provided"}
+    if req.num_nodes_to_place > len(req.candidate_nodes):
+        return {"status": "error", "message": "num_nodes_to_place exceeds candidate count"}
+
+    task, route = routing.submit(
+        run_optimization, req.model_dump(),
+        routing.estimate_cost(len(req.candidate_nodes), req.radius), redis_client
+    )
+    return {"status": "started", "task_id": task.id, "queue": route["queue"]}
+
+
+class TotalViewshedRequest(BaseModel):
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+    tx_height: float = 10.0
+    rx_height: float = 2.0
+    radius: float = 5000.0
+    grid_dim: int = 64 # Observer cells along the longer bbox edge
+    clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
+
+    @field_validator('min_lat', 'max_lat')
+    @classmethod
+    def validate_lat(cls, v):
+        if not -90 <= v <= 90:
+            raise ValueError('Latitude must be between -90 and 90')
+        return v
+
+    @field_validator('min_lon', 'max_lon')
+    @classmethod
+    def validate_lon(cls, v):
+        if not -180 <= v <= 180:
+            raise ValueError('Longitude must be between -180 and 180')
+        return v
+
+    @field_validator('radius')
+    @classmethod
+    def validate_radius(cls, v):
+        if not 100 <= v <= 50000:
+            raise ValueError('Radius must be between 100 and 50000 meters')
+        return v
+
+    @field_validator('grid_dim')
+    @classmethod
+    def validate_grid_dim(cls, v):
+        if not 4 <= v <= 128:
+            raise ValueError('grid_dim must be between 4 and 128')
+        return v
+
+@app.post("/total-viewshed/start")
+@limiter.limit("5/minute")
+def start_total_viewshed_endpoint(req: TotalViewshedRequest, request: Request):
+    """
+    Start an asynchronous cumulative viewshed (Celery): visible area from
+    every cell of a grid over the bbox. The raster streams via /task_status.
+    """
+    from tasks.total_viewshed import calculate_total_viewshed, estimate_cost
+    from tasks import routing
+
+    if req.max_lat <= req.min_lat or req.max_lon <= req.min_lon:
+        return {"status": "error", "message": "Invalid bounding box"}
+
+    resolution_m = tile_manager.effective_resolution_m((req.min_lat + req.max_lat) / 2.0)
+    task, route = routing.submit(
+        calculate_total_viewshed, req.model_dump(),
+        estimate_cost(req.grid_dim, req.radius, resolution_m), redis_client
+    )
+    return {"status": "started", "task_id": task.id, "queue": route["queue"]}
+
+
+class SweepRequest(BaseModel):
+    links: list[LinkEndpoints] = []
+    sites: list[NodeConfig] = [] # Viewshed sweeps; height is the default TX height, radius the range
+    grid: ScenarioGrid = ScenarioGrid()
+    tx_height: float = 10.0
+    rx_height: float = 2.0
+    model: str = "bullington"
+    environment: str = "suburban"
+    clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
+
+    @field_validator('links')
+    @classmethod
+    def validate_links(cls, v):
+        if len(v) > MAX_BATCH_LINKS:
+            raise ValueError(f'At most {MAX_BATCH_LINKS} links per sweep')
+        return v
+
+    @field_validator('sites')
+    @classmethod
+    def validate_sites(cls, v):
+        if len(v) > MAX_SWEEP_SITES:
+            raise ValueError(f'At most {MAX_SWEEP_SITES} sites per sweep')
+        if any(not 100 <= s.radius <= 50000 for s in v):
+            raise ValueError('Site radius must be between 100 and 50000 meters')
+        return v
 
+@app.post("/sweep/start")
+@limiter.limit("5/minute")
+def start_sweep_endpoint(req: SweepRequest, request: Request):
+    """
+    Start an asynchronous scenario sweep (Celery): links and site viewsheds
+    evaluated over a k-factor/frequency/height grid, terrain fetched once.
+    The cubes stream via /task_status.
+    """
+    from tasks.sweep import run_sweep
+    from tasks import routing
+
+    if not req.links and not req.sites:
+        return {"status": "error", "message": "No links or sites provided"}
+
+    # One horizon pass per (k, tx, rx); links are cheap next to viewsheds
+    k_factors, _, tx_heights, rx_heights = req.grid.axes(req.tx_height, req.rx_height)
+    passes = len(k_factors) * len(tx_heights) * len(rx_heights)
+    cost = sum(routing.estimate_cost(passes, s.radius) for s in req.sites) + len(req.links)
+    task, route = routing.submit(run_sweep, req.model_dump(), cost, redis_client)
+    return {"status": "started", "task_id": task.id, "queue": route["queue"]}
+
+
+SSE_POLL_INTERVAL = 0.5
+SSE_MAX_QUEUE_WAIT = 30 * 60 # Bulk jobs may queue behind each other
 
 @app.get("/task_status/{task_id}")
 async def task_status_endpoint(task_id: str):
@@ -281,31 +646,52 @@ async def task_status_endpoint(task_id: str):
     SSE Endpoint for Task Progress.
     """
     from sse_starlette.sse import EventSourceResponse
+    from celery.exceptions import TimeLimitExceeded
     from celery.result import AsyncResult
     from worker import celery_app
+    from tasks import routing
     import json
     import asyncio
 
+    # Poll budget follows the task's hard time limit (plus queueing time), so
+    # long bulk jobs are not cut off by the stream and stuck ones still end.
+    queue = await asyncio.to_thread(routing.task_queue, redis_client, task_id)
+    _, hard_limit = routing.TIME_LIMITS[queue]
+    max_running_polls = int((hard_limit + 30) / SSE_POLL_INTERVAL)
+    max_pending_polls = int(SSE_MAX_QUEUE_WAIT / SSE_POLL_INTERVAL)
+
     async def event_generator():
         task = AsyncResult(task_id, app=celery_app)
-        max_polls = 600  # 5 minutes at 0.5s
-        polls = 0
-        while polls < max_polls:
-            polls += 1
+        running_polls = 0
+        pending_polls = 0
+        while running_polls < max_running_polls and pending_polls < max_pending_polls:
             if task.state == 'PENDING':
-                yield json.dumps({"event": "progress", "data": {"progress": 0}})
+                pending_polls += 1
+                yield json.dumps({"event": "progress", "data": {"progress": 0, "message": "Queued..."}})
             elif task.state == 'PROGRESS':
+                running_polls += 1
                 meta = task.info or {}
                 yield json.dumps({"event": "progress", "data": meta})
             elif task.state == 'SUCCESS':
                 yield json.dumps({"event": "complete", "data": task.result})
                 return
             elif task.state == 'FAILURE':
-                yield json.dumps({"event": "error", "data": str(task.info)})
+                if isinstance(task.info, TimeLimitExceeded):
+                    yield json.dumps({"event": "error", "data": f"Task exceeded its {hard_limit}s time limit"})
+                else:
+                    yield json.dumps({"event": "error", "data": str(task.info)})
                 return
+            elif task.state == 'REVOKED':
+                yield json.dumps({"event": "error", "data": "Task cancelled"})
+                return
+            else:
+                running_polls += 1
             
-            await asyncio.sleep(0.5)
-        yield json.dumps({"event": "error", "data": "Task timed out after 5 minutes"})
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+        if pending_polls >= max_pending_polls:
+            yield json.dumps({"event": "error", "data": f"Task still queued after {SSE_MAX_QUEUE_WAIT // 60} minutes"})
+        else:
+            yield json.dumps({"event": "error", "data": f"No result {hard_limit}s after the task started"})
 
     return EventSourceResponse(event_generator())
 
@@ -320,8 +706,10 @@ class OptimizeRequest(BaseModel):
     rx_height: float = 2.0
     k_factor: float = 1.333
     clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
     return_heatmap: bool = False
-    weights: dict = {"elevation": 0.5, "prominence": 0.3, "fresnel": 0.2}
+    weights: dict = {"elevation": 0.5, "prominence": 0.3, "fresnel": 0.2} # + optional "visibility"
+    visibility_radius: float = 5000.0 # Radius for the "visibility" (visible area) weight
     existing_nodes: list = [] # List of {lat, lon, height}
 
     @field_validator('min_lat', 'max_lat')
@@ -338,6 +726,13 @@ class OptimizeRequest(BaseModel):
             raise ValueError('Longitude must be between -180 and 180')
         return v
 
+    @field_validator('visibility_radius')
+    @classmethod
+    def validate_visibility_radius(cls, v):
+        if not 100 <= v <= 50000:
+            raise ValueError('Visibility radius must be between 100 and 50000 meters')
+        return v
+
 @app.post("/optimize-location")
 @limiter.limit("10/minute")
 def optimize_location_endpoint(req: OptimizeRequest, request: Request):
@@ -345,62 +740,42 @@ def optimize_location_endpoint(req: OptimizeRequest, request: Request):
     Find best location using multi-criteria analysis (elevation, prominence, fresnel).
     """
     try:
-        # Adaptive Grid
-        # Calculate dimensions in km
-        dist_lat_km = rf_physics.haversine_distance(req.min_lat, req.min_lon, req.max_lat, req.min_lon) / 1000.0
-        dist_lon_km = rf_physics.haversine_distance(req.min_lat, req.min_lon, req.min_lat, req.max_lon) / 1000.0
-        
-        # Target resolution: 150m (0.15 km)
-        target_res_km = 0.15
-        
-        steps_lat = int(dist_lat_km / target_res_km)
-        steps_lon = int(dist_lon_km / target_res_km)
-        
-        # Safety Caps (Min 10, Max 50 -> 2500 points max)
-        steps_lat = max(10, min(50, steps_lat))
-        steps_lon = max(10, min(50, steps_lon))
-        
-        lat_step = (req.max_lat - req.min_lat) / steps_lat
-        lon_step = (req.max_lon - req.min_lon) / steps_lon
-        
-        coords = []
-        for i in range(steps_lat + 1):
-            for j in range(steps_lon + 1):
-                lat = req.min_lat + (i * lat_step)
-                lon = req.min_lon + (j * lon_step)
-                coords.append((lat, lon))
-                
-        # Batch fetch elevations
-        elevs = tile_manager.get_elevations_batch(coords)
-        
-        candidates = []
-        for i, (lat, lon) in enumerate(coords):
-            # Basic Candidate
-            cand = {
-                "lat": lat, 
-                "lon": lon, 
-                "elevation": elevs[i]
-            }
-            # Score Components
-            metrics = optimization_service.score_candidate(
-                cand, 
-                req.weights, 
-                req.existing_nodes,
-                tx_height=req.tx_height,
-                rx_height=req.rx_height,
-                freq_mhz=req.frequency_mhz,
-                k_factor=req.k_factor,
-                clutter_height=req.clutter_height
-            )
-            cand.update(metrics) # Adds prominence, fresnel
-            candidates.append(cand)
-
-        # Normalize and Calculate Final Score
+        # Coarse-to-fine search on elevation + prominence; only the final
+        # candidates get Fresnel checks against the existing nodes.
+        search = site_search.coarse_to_fine_search(
+            tile_manager, req.min_lat, req.min_lon, req.max_lat, req.max_lon, req.weights,
+            prominence_cache=optimization_service.prominence_cache
+        )
+        candidates = search["candidates"]
         if not candidates:
              return {"status": "success", "locations": []}
+
+        fresnel = optimization_service.check_fresnel_clearance_batch(
+            [c['lat'] for c in candidates], [c['lon'] for c in candidates],
+            req.tx_height, req.existing_nodes, req.frequency_mhz,
+            k_factor=req.k_factor, clutter_height=req.clutter_height, clutter_mode=req.clutter_mode
+        )
+        for c, f in zip(candidates, fresnel):
+            c['fresnel'] = float(f)
+
+        # Visible area (cumulative-viewshed sweeps), only when weighted
+        w_vis = req.weights.get("visibility", 0.0)
+        max_vis = 0.0
+        if w_vis > 0:
+            window = total_viewshed.terrain_window(
+                tile_manager, req.min_lat, req.min_lon, req.max_lat, req.max_lon, req.visibility_radius
+            )
+            areas = total_viewshed.visible_area(
+                *window, [c['lat'] for c in candidates], [c['lon'] for c in candidates],
+                req.tx_height, req.visibility_radius, rx_h=req.rx_height,
+                clutter=lambda lats, lons: tile_manager.sample_clutter(lats, lons, req.clutter_height, req.clutter_mode)
+            )
+            for c, a in zip(candidates, areas):
+                c['visible_area_km2'] = round(float(a), 3)
+            max_vis = float(areas.max())
              
-        max_elev = max([c['elevation'] for c in candidates]) or 1.0
-        max_prom = max([c['prominence'] for c in candidates]) or 1.0
+        max_elev = search["max_elevation"] or 1.0
+        max_prom = search["max_prominence"] or 1.0
         # Fresnel is already 0-1
         
         w_elev = req.weights.get("elevation", 0.3)
@@ -410,8 +785,9 @@ def optimize_location_endpoint(req: OptimizeRequest, request: Request):
         for c in candidates:
             norm_elev = c['elevation'] / max_elev if max_elev > 0 else 0
             norm_prom = c['prominence'] / max_prom if max_prom > 0 else 0
+            norm_vis = c.get('visible_area_km2', 0.0) / max_vis if max_vis > 0 else 0
             
-            c['score'] = (norm_elev * w_elev) + (norm_prom * w_prom) + (c['fresnel'] * w_fres)
+            c['score'] = (norm_elev * w_elev) + (norm_prom * w_prom) + (c['fresnel'] * w_fres) + (norm_vis * w_vis)
             # Scale to 0-100 for display
             c['score'] = round(c['score'] * 100, 1)
 
@@ -426,16 +802,24 @@ def optimize_location_endpoint(req: OptimizeRequest, request: Request):
             "locations": top_results,
             "metadata": {
                 "max_elevation": max_elev,
-                "max_prominence": max_prom
+                "max_prominence": max_prom,
+                "search_levels": search["levels"],
+                "resolution_m": round(search["resolution_m"], 1),
+                "evaluated_points": search["evaluated_points"],
+                "max_visible_area_km2": round(max_vis, 3)
             }
         }
         
         if req.return_heatmap:
-            # Send simplified data for heatmap (lat, lon, score)
-            # To save bandwidth, maybe round lat/lon?
+            # Coarse grid (lat, lon, score). No Fresnel term there, so the
+            # elevation/prominence weights are rescaled to keep the 0-100 range.
+            w_terrain = (w_elev + w_prom) or 1.0
             heatmap_data = [
-                {"lat": round(c['lat'], 5), "lon": round(c['lon'], 5), "score": c['score']}
-                for c in candidates
+                {
+                    "lat": round(c['lat'], 5), "lon": round(c['lon'], 5),
+                    "score": round((c['elevation'] / max_elev * w_elev + c['prominence'] / max_prom * w_prom) / w_terrain * 100, 1)
+                }
+                for c in search["coarse"]
             ]
             response["heatmap"] = heatmap_data
 
@@ -448,6 +832,94 @@ def optimize_location_endpoint(req: OptimizeRequest, request: Request):
             content={"status": "error", "message": f"Server Error: {str(e)}"}
         )
 
+class RelaySite(BaseModel):
+    lat: float
+    lon: float
+    height: float = 10.0
+
+    @field_validator('lat')
+    @classmethod
+    def validate_lat(cls, v):
+        if not -90 <= v <= 90:
+            raise ValueError('Latitude must be between -90 and 90')
+        return v
+
+    @field_validator('lon')
+    @classmethod
+    def validate_lon(cls, v):
+        if not -180 <= v <= 180:
+            raise ValueError('Longitude must be between -180 and 180')
+        return v
+
+class RelayRequest(BaseModel):
+    source: RelaySite
+    target: RelaySite
+    frequency_mhz: float
+    relay_height: float = 10.0
+    max_link_km: float = 20.0
+    max_hops: int = 6
+    objective: str = "hops" # hops, loss (worst-link path loss)
+    min_clearance_ratio: float = 0.6 # 0.6 = "viable" in /calculate-link
+    max_path_loss_db: Optional[float] = None
+    model: str = "bullington"
+    environment: str = "suburban"
+    k_factor: float = 1.333
+    clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
+
+    @field_validator('objective')
+    @classmethod
+    def validate_objective(cls, v):
+        if v not in ("hops", "loss"):
+            raise ValueError('objective must be "hops" or "loss"')
+        return v
+
+    @field_validator('max_hops')
+    @classmethod
+    def validate_max_hops(cls, v):
+        if not 1 <= v <= 12:
+            raise ValueError('max_hops must be between 1 and 12')
+        return v
+
+    @field_validator('max_link_km')
+    @classmethod
+    def validate_max_link(cls, v):
+        if not 0 < v <= 100:
+            raise ValueError('max_link_km must be between 0 and 100')
+        return v
+
+@app.post("/relay-path")
+@limiter.limit("10/minute")
+def relay_path_endpoint(req: RelayRequest, request: Request):
+    """
+    Relay chain between two sites that cannot link directly.
+    Hilltop cells around the pair form the candidate graph; links are analysed
+    lazily in batches while the search expands.
+    """
+    result = find_relay_chain(
+        tile_manager,
+        (req.source.lat, req.source.lon, req.source.height),
+        (req.target.lat, req.target.lon, req.target.height),
+        req.frequency_mhz,
+        relay_height=req.relay_height,
+        max_link_m=req.max_link_km * 1000,
+        max_hops=req.max_hops,
+        objective=req.objective,
+        min_clearance_ratio=req.min_clearance_ratio,
+        max_path_loss_db=req.max_path_loss_db,
+        model=req.model,
+        environment=req.environment,
+        k_factor=req.k_factor,
+        clutter_height=req.clutter_height,
+        clutter_mode=req.clutter_mode,
+    )
+    if result is None:
+        return {
+            "status": "no_path",
+            "message": f"No relay chain within {req.max_hops} hops of at most {req.max_link_km} km",
+        }
+    return {"status": "success", "objective": req.objective, **result}
+
 class ExportRequest(BaseModel):
     locations: list
     format: str = "csv" # csv, kml
@@ -476,60 +948,113 @@ def export_results_endpoint(req: ExportRequest):
 
 
 # --- MeshCore Node Overlay ---
-import httpx
-import json
-from datetime import datetime, timezone
+from fastapi import Query
+from meshcore import MeshCoreNodes
+
+meshcore_nodes = MeshCoreNodes(redis_client)
+
+# Default view when a client sends no bbox (the original PNW overlay)
+PNW_BBOX = (
+    float(os.environ.get("PNW_BBOX_SOUTH", 47.0)),
+    float(os.environ.get("PNW_BBOX_WEST", -124.0)),
+    float(os.environ.get("PNW_BBOX_NORTH", 49.5)),
+    float(os.environ.get("PNW_BBOX_EAST", -120.5)),
+)
 
 @app.get("/nodes/meshcore")
-async def get_meshcore_nodes():
-    cache_key = "meshcore_nodes_pnw"
-    cached = redis_client.get(cache_key)
-    if cached:
-        return json.loads(cached)
-
-    north = float(os.environ.get("PNW_BBOX_NORTH", 49.5))
-    south = float(os.environ.get("PNW_BBOX_SOUTH", 47.0))
-    east = float(os.environ.get("PNW_BBOX_EAST", -120.5))
-    west = float(os.environ.get("PNW_BBOX_WEST", -124.0))
-    api_url = os.environ.get("MESHCORE_API_URL", "https://api.meshcore.nz/api/v1/map/nodes")
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(api_url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+async def get_meshcore_nodes(
+    south: Optional[float] = Query(None, ge=-90, le=90),
+    west: Optional[float] = Query(None, ge=-180, le=180),
+    north: Optional[float] = Query(None, ge=-90, le=90),
+    east: Optional[float] = Query(None, ge=-180, le=180),
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+):
+    """
+    MeshCore nodes inside the bbox (default PNW_BBOX) from the background
+    snapshot; never waits on the upstream. west > east crosses the
+    antimeridian. Below MESHCORE_CLUSTER_MAX_ZOOM nearby nodes are merged
+    into clusters.
+    """
+    bbox = [PNW_BBOX[i] if v is None else v for i, v in enumerate((south, west, north, east))]
+    return meshcore_nodes.query(*bbox, zoom=zoom)
 
-    nodes = [
-        n for n in data.get("nodes", [])
-        if south <= n["latitude"] <= north
-        and west <= n["longitude"] <= east
-    ]
 
-    result = {"nodes": nodes, "fetched_at": datetime.now(timezone.utc).isoformat(), "count": len(nodes)}
-    redis_client.setex(cache_key, 300, json.dumps(result))
-    return result
+class CoverageGapRequest(BaseModel):
+    south: float
+    west: float
+    north: float
+    east: float
+    node_height: float = 10.0 # MeshCore nodes do not report antenna height
+    rx_height: float = 2.0
+    radius: float = 5000.0
+    resolution_m: float = 100.0
+    frequency_mhz: float = 915.0
+    k_factor: float = 1.333
+    max_link_km: Optional[float] = None # Default: 2 x radius
+    clutter_height: float = 0.0
+    clutter_mode: ClutterMode = "auto"
+    min_gap_km2: float = 1.0
 
+    @field_validator('south', 'north')
+    @classmethod
+    def validate_lat(cls, v):
+        if not -90 <= v <= 90:
+            raise ValueError('Latitude must be between -90 and 90')
+        return v
 
-# --- MeshCore Node Overlay ---
-import httpx
-import json
-from datetime import datetime, timezone
+    @field_validator('west', 'east')
+    @classmethod
+    def validate_lon(cls, v):
+        if not -180 <= v <= 180:
+            raise ValueError('Longitude must be between -180 and 180')
+        return v
 
-@app.get("/nodes/meshcore")
-async def get_meshcore_nodes():
-    cache_key = "meshcore_nodes_pnw"
-    cached = redis_client.get(cache_key)
-    if cached:
-        return json.loads(cached)
-    north = float(os.environ.get("PNW_BBOX_NORTH", 49.5))
-    south = float(os.environ.get("PNW_BBOX_SOUTH", 47.0))
-    east = float(os.environ.get("PNW_BBOX_EAST", -120.5))
-    west = float(os.environ.get("PNW_BBOX_WEST", -124.0))
-    api_url = os.environ.get("MESHCORE_API_URL", "https://api.meshcore.nz/api/v1/map/nodes")
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(api_url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    nodes = [n for n in data.get("nodes", []) if south <= n["latitude"] <= north and west <= n["longitude"] <= east]
-    result = {"nodes": nodes, "fetched_at": datetime.now(timezone.utc).isoformat(), "count": len(nodes)}
-    redis_client.setex(cache_key, 300, json.dumps(result))
-    return result
+    @field_validator('radius')
+    @classmethod
+    def validate_radius(cls, v):
+        if not 100 <= v <= 50000:
+            raise ValueError('Radius must be between 100 and 50000 meters')
+        return v
+
+    @field_validator('resolution_m')
+    @classmethod
+    def validate_resolution(cls, v):
+        if not 30 <= v <= 1000:
+            raise ValueError('resolution_m must be between 30 and 1000 meters')
+        return v
+
+MAX_GAP_NODES = 1000
+
+@app.post("/coverage-gap/start")
+@limiter.limit("5/minute")
+async def start_coverage_gap_endpoint(req: CoverageGapRequest, request: Request):
+    """
+    Start an asynchronous coverage-gap analysis (Celery) of the live MeshCore
+    nodes inside the bbox: coverage union, uncovered areas and network
+    partitions. The report streams via /task_status.
+    """
+    from tasks.coverage_gap import run_coverage_gap
+    from tasks import routing
+    import asyncio
+
+    if req.north <= req.south or req.east <= req.west:
+        return {"status": "error", "message": "Invalid bounding box"}
+
+    found = meshcore_nodes.query(req.south, req.west, req.north, req.east)
+    if not found["nodes"]:
+        return {"status": "error", "message": "No MeshCore nodes in the bounding box"}
+    if len(found["nodes"]) > MAX_GAP_NODES:
+        return {"status": "error", "message": f"{len(found['nodes'])} nodes in the bounding box (max {MAX_GAP_NODES})"}
+
+    nodes = [
+        {"id": n.get("public_key"), "name": n.get("name"), "lat": n["latitude"], "lon": n["longitude"]}
+        for n in found["nodes"]
+    ]
+    payload = {**req.model_dump(), "nodes": nodes}
+    cost = routing.estimate_cost(len(nodes), req.radius, req.resolution_m)
+    # Enqueueing talks to Redis synchronously; keep it off the event loop
+    task, route = await asyncio.to_thread(routing.submit, run_coverage_gap, payload, cost, redis_client)
+    return {
+        "status": "started", "task_id": task.id, "queue": route["queue"],
+        "nodes": len(nodes), "snapshot_fetched_at": found["fetched_at"],
+    }
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import time
+
+# Scan deduplication and cooperative cancellation, shared by the API and workers.
+#
+# The API maps a content hash of the scan payload to the task id that computes
+# it, so identical /scan/start calls join the running (or recently completed)
+# task. A completed scan stays joinable for RESULT_DEDUP_TTL; a failed,
+# cancelled or cut-short one is forgotten as soon as it ends. Cancellation is
+# a Redis flag the task polls between units of work; revoke() alone only drops
+# tasks that have not started yet.
+
+DEDUP_QUEUE_WAIT = 15 * 60  # Queueing allowance on top of the task's hard time limit
+RESULT_DEDUP_TTL = 15 * 60  # Completed scans stay joinable this long
+CANCEL_TTL = 60 * 60
+CANCEL_POLL_INTERVAL = 0.5  # Seconds between Redis checks -> stops within ~1 s
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task once its cancel flag is seen."""
+
+
+def scan_fingerprint(payload):
+    """
+    Stable hash of a scan payload (key order and node id fields ignored).
+    """
+    nodes = [{k: v for k, v in node.items() if k != 'id'} for node in payload.get('nodes', [])]
+    canonical = json.dumps({"nodes": nodes, "options": payload.get('options', {})}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _dedup_key(fingerprint):
+    return f"scan:dedup:{fingerprint}"
+
+
+def _cancel_key(task_id):
+    return f"task:cancel:{task_id}"
+
+
+def find_task(redis_client, fingerprint):
+    raw = redis_client.get(_dedup_key(fingerprint))
+    return raw.decode() if isinstance(raw, bytes) else raw
+
+
+def register_task(redis_client, fingerprint, task_id, time_limit):
+    """
+    Map the fingerprint to task_id for as long as the task may be queued or
+    running: DEDUP_QUEUE_WAIT plus its hard time_limit (seconds).
+    """
+    redis_client.setex(_dedup_key(fingerprint), int(time_limit + DEDUP_QUEUE_WAIT), task_id)
+
+
+def forget_task(redis_client, fingerprint, task_id):
+    """
+    Drop the mapping if it still points to task_id (a newer identical scan
+    may have replaced it).
+    """
+    if find_task(redis_client, fingerprint) == task_id:
+        redis_client.delete(_dedup_key(fingerprint))
+
+
+def finish_task(redis_client, fingerprint, task_id, completed):
+    """
+    Called by the task as it ends: a completed scan stays joinable for
+    RESULT_DEDUP_TTL, anything else is forgotten. No-op once the mapping
+    points to a newer task.
+    """
+    if not completed:
+        forget_task(redis_client, fingerprint, task_id)
+    elif find_task(redis_client, fingerprint) == task_id:
+        redis_client.expire(_dedup_key(fingerprint), RESULT_DEDUP_TTL)
+
+
+def request_cancel(redis_client, task_id):
+    redis_client.setex(_cancel_key(task_id), CANCEL_TTL, 1)
+
+
+def is_cancelled(redis_client, task_id):
+    return bool(redis_client.exists(_cancel_key(task_id)))
+
+
+class CancellationToken:
+    """
+    Cheap stop check for hot loops: hits Redis at most once per interval.
+    Also trips once the optional monotonic deadline (soft time limit) passes.
+    reason is "cancelled" or "time_limit" after it trips.
+    """
+
+    def __init__(self, redis_client, task_id, interval=CANCEL_POLL_INTERVAL, deadline=None):
+        self.redis = redis_client
+        self.task_id = task_id
+        self.interval = interval
+        self.deadline = deadline
+        self.reason = None
+        self._next_check = 0.0
+
+    @property
+    def cancelled(self):
+        if self.reason is not None:
+            return True
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            self.reason = "time_limit"
+            return True
+        if self.task_id and now >= self._next_check:
+            self._next_check = now + self.interval
+            try:
+                if is_cancelled(self.redis, self.task_id):
+                    self.reason = "cancelled"
+            except Exception:
+                pass  # Redis hiccup: keep working rather than abort
+        return self.reason is not None
+
+    def stop(self, reason):
+        """Trip the token from outside the loop (e.g. SoftTimeLimitExceeded)."""
+        if self.reason is None:
+            self.reason = reason
+
+    def check(self):
+        if self.cancelled:
+            raise TaskCancelled(self.task_id)
@@ -0,0 +1,201 @@
+from worker import celery_app
+import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.utils.log import get_task_logger
+from PIL import Image
+
+from core import coverage_gap
+from link_cache import COORD_DECIMALS, GENERATION_KEY
+from tasks.control import CancellationToken, TaskCancelled
+from tasks.optimize import link_matrix
+from tasks.routing import soft_deadline
+
+logger = get_task_logger(__name__)
+
+# Node chunks of a block run on threads (see core/coverage_gap.py).
+COVERAGE_GAP_WORKERS = int(os.environ.get("COVERAGE_GAP_WORKERS", 4))
+# Per-node polar visibility, keyed by position and analysis parameters
+NODE_CACHE_TTL = 7 * 24 * 60 * 60
+
+
+def node_cache_keys(redis_client, nodes, params, n_rays):
+    """
+    Cache key of each node's visibility table. Scoped like LinkCache keys by
+    elevation dataset and invalidation generation, so refreshed tiles orphan
+    every entry.
+    """
+    dataset = os.environ.get('ELEVATION_DATASET', 'srtm30m')
+    try:
+        generation = int(redis_client.get(GENERATION_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"Coverage cache generation lookup failed: {e}")
+        generation = 0
+    shared = (
+        f"{params['node_height']:.2f}", f"{params['rx_height']:.2f}", f"{params['radius']:.0f}",
+        f"{params['resolution_m']:.1f}", str(n_rays), f"{params['k_factor']:.4f}",
+        f"{params['clutter_height']:.2f}", params['clutter_mode'],
+    )
+    return [
+        f"coverage:node:{dataset}:g{generation}:{n['lat']:.{COORD_DECIMALS}f}:{n['lon']:.{COORD_DECIMALS}f}:"
+        + ":".join(shared)
+        for n in nodes
+    ]
+
+
+def _load_cached(redis_client, keys, shape):
+    """
+    Returns: (visibility (N, R, S) bool, hit mask (N,))
+    """
+    visibility = np.zeros((len(keys),) + shape, dtype=bool)
+    hit = np.zeros(len(keys), dtype=bool)
+    try:
+        values = redis_client.mget(keys) if keys else []
+    except Exception as e:
+        logger.warning(f"Coverage cache read failed: {e}")
+        values = [None] * len(keys)
+    n_bits = int(np.prod(shape))
+    for i, raw in enumerate(values):
+        if raw:
+            visibility[i] = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=n_bits).reshape(shape)
+            hit[i] = True
+    return visibility, hit
+
+
+def _store_cached(redis_client, keys, visibility):
+    try:
+        for key, visible in zip(keys, visibility):
+            redis_client.setex(key, NODE_CACHE_TTL, np.packbits(visible).tobytes())
+    except Exception as e:
+        logger.warning(f"Coverage cache write failed: {e}")
+
+
+def _overlay(count, labels):
+    """
+    RGBA overlay: covered cells cyan, reported gaps orange.
+    """
+    rgba = np.zeros(count.shape + (4,), dtype=np.uint8)
+    rgba[count > 0] = (0, 242, 255, 110)
+    rgba[labels > 0] = (255, 120, 0, 150)
+    buffered = BytesIO()
+    Image.fromarray(rgba, mode='RGBA').save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode()
+
+
+@celery_app.task(bind=True)
+def run_coverage_gap(self, params):
+    """
+    Coverage union and connectivity graph of existing nodes over a region.
+    params: CoverageGapRequest.model_dump() plus nodes - {nodes: [{id, name, lat, lon}],
+            south, west, north, east, node_height, rx_height, radius, resolution_m,
+            frequency_mhz, k_factor, max_link_km, clutter_height, clutter_mode, min_gap_km2}
+    Reports uncovered areas (gaps) and network partitions.
+    """
+    from tasks.viewshed import redis_client, tile_manager
+
+    nodes = params.get('nodes') or []
+    bbox = [float(params[k]) for k in ('south', 'west', 'north', 'east')]
+    radius = float(params.get('radius', 5000.0))
+    resolution_m = float(params.get('resolution_m', 100.0))
+    node_height = float(params.get('node_height', 10.0))
+    rx_height = float(params.get('rx_height', 2.0))
+    k_factor = float(params.get('k_factor', 1.333))
+    clutter_height = float(params.get('clutter_height', 0.0))
+    clutter_mode = params.get('clutter_mode', 'auto')
+    max_link_km = params.get('max_link_km')
+    max_link_m = float(max_link_km) * 1000.0 if max_link_km else 2.0 * radius
+    settings = {
+        'node_height': node_height, 'rx_height': rx_height, 'radius': radius, 'resolution_m': resolution_m,
+        'k_factor': k_factor, 'clutter_height': clutter_height, 'clutter_mode': clutter_mode,
+    }
+
+    self.update_state(state='PROGRESS', meta={'progress': 0, 'message': 'Loading cached coverage...'})
+    token = CancellationToken(
+        redis_client, self.request.id, deadline=soft_deadline(self.request, time.monotonic())
+    )
+
+    started = time.perf_counter()
+    lats = np.array([float(n['lat']) for n in nodes])
+    lons = np.array([float(n['lon']) for n in nodes])
+
+    # 1. Per-node visibility: cached tables first, the rest block by block
+    shape = coverage_gap.table_shape(radius, resolution_m)
+    keys = node_cache_keys(redis_client, nodes, settings, shape[0])
+    visibility, done = _load_cached(redis_client, keys, shape)
+    cached = int(done.sum())
+    todo = np.flatnonzero(~done)
+
+    status = "completed"
+    try:
+        with ThreadPoolExecutor(max_workers=COVERAGE_GAP_WORKERS, thread_name_prefix='coveragegap_') as pool:
+            blocks = coverage_gap.block_visibility(
+                tile_manager, lats[todo], lons[todo], node_height, radius, resolution_m, rx_h=rx_height,
+                k_factor=k_factor, clutter_height=clutter_height, clutter_mode=clutter_mode,
+                executor=pool, cancel_check=token.check
+            )
+            for idx, visible in blocks:
+                visibility[todo[idx]] = visible
+                done[todo[idx]] = True
+                _store_cached(redis_client, [keys[i] for i in todo[idx]], visible)
+                self.update_state(state='PROGRESS', meta={
+                    'progress': int(done.sum() / len(nodes) * 70),
+                    'message': f'Node coverage {int(done.sum())}/{len(nodes)}'
+                })
+    except TaskCancelled:
+        status = token.reason or "cancelled"
+    except SoftTimeLimitExceeded:
+        status = "time_limit"
+
+    # 2. Coverage union and uncovered areas (nodes analysed so far)
+    self.update_state(state='PROGRESS', meta={'progress': 70, 'message': 'Merging coverage...'})
+    lat_axis, lon_axis, cell_km2 = coverage_gap.region_grid(*bbox, resolution_m)
+    count = coverage_gap.coverage_count(visibility[done], lats[done], lons[done], radius, lat_axis, lon_axis)
+    gaps, labels = coverage_gap.find_gaps(
+        count, lat_axis, lon_axis, cell_km2, lats, lons, min_gap_km2=float(params.get('min_gap_km2', 1.0))
+    )
+
+    # 3. Connectivity graph of the existing nodes
+    links = np.zeros((len(nodes), len(nodes)), dtype=bool)
+    if status == "completed" and len(nodes) > 1:
+        self.update_state(state='PROGRESS', meta={'progress': 80, 'message': 'Analyzing node links...'})
+        try:
+            token.check()
+            links = link_matrix(
+                tile_manager, nodes, float(params.get('frequency_mhz', 915.0)), np.full(len(nodes), node_height),
+                max_link_m, k_factor, clutter_height, clutter_mode, cancel_check=token.check
+            )
+        except TaskCancelled:
+            status = token.reason or "cancelled"
+        except SoftTimeLimitExceeded:
+            status = "time_limit"
+    parts = coverage_gap.partitions(links, lats, lons) if status == "completed" else []
+    for part in parts:
+        part["nodes"] = [nodes[i].get('id') or nodes[i].get('name') or i for i in part["nodes"]]
+
+    region_km2 = count.size * cell_km2
+    covered_km2 = float((count > 0).sum() * cell_km2)
+    logger.info(f"Coverage gaps for {len(nodes)} nodes ({cached} cached) in {time.perf_counter() - started:.2f}s: "
+                f"{len(gaps)} gaps, {len(parts)} partitions")
+    return {
+        "status": status,
+        "partial": status != "completed",
+        "nodes_analyzed": int(done.sum()),
+        "nodes_cached": cached,
+        "region_km2": round(region_km2, 2),
+        "covered_km2": round(covered_km2, 2),
+        "covered_pct": round(covered_km2 / region_km2 * 100, 1) if region_km2 else 0.0,
+        "redundant_km2": round(float((count > 1).sum() * cell_km2), 2),
+        "gaps": gaps,
+        "partitions": parts,
+        "links": int(np.triu(links, k=1).sum()),
+        "isolated_nodes": sum(1 for p in parts if p["size"] == 1),
+        "composite": {
+            "image": _overlay(count, labels),
+            "bounds": dict(zip(('south', 'west', 'north', 'east'), bbox)),
+        },
+    }
@@ -1,11 +1,255 @@
 from worker import celery_app
+import numpy as np
+import os
 import time
 
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.utils.log import get_task_logger
+from core.algorithms import calculate_viewshed
+from core import geodesy
+from core.profile_planner import plan_samples
+from core.nsga2 import SiteSelectionProblem, pack_coverage, run_nsga2
+from tasks.control import CancellationToken
+from tasks.routing import soft_deadline
+import rf_physics
+
+logger = get_task_logger(__name__)
+
+# Coverage rasters are packed into bitsets on a shared master grid.
+# Cap the cell count so hundreds of candidates stay well within memory
+# (1M cells -> 125 KB per candidate bitset).
+MAX_COVERAGE_CELLS = 1_000_000
+NSGA_WORKERS = int(os.environ.get("NSGA_WORKERS", 4))
+LINK_CHUNK = 5000  # Candidate pairs profiled per vectorized pass
+
+
+def _master_grid(candidates, radius):
+    """
+    Bounding box and resolution of the shared coverage grid.
+    Returns: (min_lat, max_lat, min_lon, max_lon, rows, cols, res_m)
+    """
+    lats = [float(c['lat']) for c in candidates]
+    lons = [float(c['lon']) for c in candidates]
+    mean_lat = sum(lats) / len(lats)
+
+    lat_deg_per_m = 1.0 / 111320.0
+    lon_deg_per_m = 1.0 / (111320.0 * max(0.001, np.cos(np.radians(mean_lat))))
+
+    buffer_m = radius + 1000
+    min_lat = min(lats) - buffer_m * lat_deg_per_m
+    max_lat = max(lats) + buffer_m * lat_deg_per_m
+    min_lon = min(lons) - buffer_m * lon_deg_per_m
+    max_lon = max(lons) + buffer_m * lon_deg_per_m
+
+    res_m = 100.0
+    rows = int((max_lat - min_lat) / (res_m * lat_deg_per_m))
+    cols = int((max_lon - min_lon) / (res_m * lon_deg_per_m))
+    if rows * cols > MAX_COVERAGE_CELLS:
+        scale = float(np.sqrt(rows * cols / MAX_COVERAGE_CELLS))
+        res_m *= scale
+        rows = int((max_lat - min_lat) / (res_m * lat_deg_per_m))
+        cols = int((max_lon - min_lon) / (res_m * lon_deg_per_m))
+        logger.warning(f"Coverage grid too large. Scaling resolution to {res_m:.1f}m. Grid: {rows}x{cols}")
+
+    return min_lat, max_lat, min_lon, max_lon, max(rows, 1), max(cols, 1), res_m
+
+
+def _blit_coverage(grid, grid_lats, grid_lons, bounds, shape):
+    """
+    Map a single viewshed onto the master grid as a boolean raster.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounds
+    rows, cols = shape
+    master = np.zeros(shape, dtype=bool)
+
+    rows_idx, cols_idx = np.nonzero(grid > 0)
+    if len(rows_idx) == 0:
+        return master
+
+    y_vals = ((max_lat - grid_lats[rows_idx]) / (max_lat - min_lat) * (rows - 1)).astype(int)
+    x_vals = ((grid_lons[cols_idx] - min_lon) / (max_lon - min_lon) * (cols - 1)).astype(int)
+    valid_mask = (y_vals >= 0) & (y_vals < rows) & (x_vals >= 0) & (x_vals < cols)
+    master[y_vals[valid_mask], x_vals[valid_mask]] = True
+    return master
+
+
+def link_matrix(tile_manager, candidates, freq, heights, max_link_m, k_factor, clutter_height, clutter_mode="auto",
+                cancel_check=None):
+    """
+    Symmetric boolean matrix of viable/degraded links between candidates
+    (any [{lat, lon}] sites; also used by tasks.coverage_gap).
+    Pairs further apart than max_link_m are never evaluated; the rest are
+    profiled and analyzed in a single vectorized pass.
+    cancel_check: called before every chunk of pairs; raise from it to abort.
+    """
+    n = len(candidates)
+    links = np.zeros((n, n), dtype=bool)
+    lats = np.array([float(c['lat']) for c in candidates])
+    lons = np.array([float(c['lon']) for c in candidates])
+    heights = np.asarray(heights, dtype=np.float64)
+
+    dist = geodesy.haversine(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+    pair_i, pair_j = np.nonzero(np.triu(dist <= max_link_m, k=1))
+    if len(pair_i) == 0:
+        return links
+
+    # One sample count for the vectorized pass, planned for the longest pair
+    samples = plan_samples(
+        dist[pair_i, pair_j].max(), tile_manager.effective_resolution_m(float(lats.mean())), purpose="matrix"
+    )
+
+    for start in range(0, len(pair_i), LINK_CHUNK):
+        i_idx = pair_i[start:start + LINK_CHUNK]
+        j_idx = pair_j[start:start + LINK_CHUNK]
+        if cancel_check is not None:
+            cancel_check()
+        try:
+            profiles, clutter = tile_manager.get_elevation_profiles(
+                lats[i_idx], lons[i_idx], lats[j_idx], lons[j_idx], samples=samples,
+                clutter_height=clutter_height, clutter_mode=clutter_mode
+            )
+            ratios = rf_physics.min_clearance_ratio_batch(
+                profiles, dist[i_idx, j_idx], freq, heights[i_idx], heights[j_idx],
+                k_factor=k_factor, clutter_height=clutter
+            )
+        except Exception as e:
+            logger.error(f"Link analysis failed for candidate pairs {start}-{start + len(i_idx)}: {e}")
+            continue
+        # Viable or degraded (analyze_link status != blocked)
+        ok = ratios >= 0
+        links[i_idx[ok], j_idx[ok]] = True
+        links[j_idx[ok], i_idx[ok]] = True
+    return links
+
+
 @celery_app.task(bind=True)
 def run_optimization(self, params):
     """
-    Placeholder for NSGA-II optimization.
+    NSGA-II multi-objective site selection.
+    params: OptimizationScenario dict (candidate_nodes, num_nodes_to_place, objectives, constraints, ...)
+    Objectives: maximise coverage, minimise cost, maximise multi-hop connectivity.
     """
-    self.update_state(state='PROGRESS', meta={'progress': 0})
-    time.sleep(2)
-    return {"status": "completed", "pareto_front": []}
+    from tasks.viewshed import tile_manager
+
+    candidates = params.get('candidate_nodes', [])
+    k = int(params.get('num_nodes_to_place', 3))
+    objectives = params.get('objectives') or {"coverage": 1.0}
+    constraints = params.get('constraints') or {}
+    radius = float(params.get('radius', 5000.0))
+    freq = float(params.get('frequency_mhz', 915.0))
+    rx_height = float(params.get('rx_height', 2.0))
+    k_factor = float(params.get('k_factor', 1.333))
+    clutter_height = float(params.get('clutter_height', 0.0))
+    clutter_mode = params.get('clutter_mode', 'auto')
+    max_link_km = params.get('max_link_km')
+    max_link_m = float(max_link_km) * 1000.0 if max_link_km else 2.0 * radius
+
+    if not candidates:
+        return {"status": "completed", "pareto_front": []}
+    if k > len(candidates):
+        return {"status": "error", "message": f"num_nodes_to_place ({k}) exceeds candidate count ({len(candidates)})"}
+
+    self.update_state(state='PROGRESS', meta={'progress': 0, 'message': 'Computing candidate coverage...'})
+
+    # Stops early at the queue's soft time limit (or on cancel) with the best front so far
+    from tasks.viewshed import redis_client
+    token = CancellationToken(
+        redis_client, self.request.id, deadline=soft_deadline(self.request, time.monotonic())
+    )
+
+    # 1. Precompute coverage bitsets on a shared grid
+    min_lat, max_lat, min_lon, max_lon, rows, cols, res_m = _master_grid(candidates, radius)
+    bounds = (min_lat, max_lat, min_lon, max_lon)
+    cell_area_km2 = (res_m * res_m) / 1_000_000.0
+
+    n_bytes = (rows * cols + 7) // 8
+    coverage_bits = np.zeros((len(candidates), n_bytes), dtype=np.uint8)
+    total = len(candidates)
+    for i, cand in enumerate(candidates):
+        if token.cancelled:
+            break
+        try:
+            grid, grid_lats, grid_lons = calculate_viewshed(
+                tile_manager, float(cand['lat']), float(cand['lon']), float(cand.get('height', 10.0)),
+                radius, rx_h=rx_height, freq_mhz=freq, resolution_m=res_m,
+                clutter_height=clutter_height, clutter_mode=clutter_mode
+            )
+            coverage_bits[i] = pack_coverage(_blit_coverage(grid, grid_lats, grid_lons, bounds, (rows, cols)))
+        except SoftTimeLimitExceeded:
+            token.stop("time_limit")
+            break
+        except Exception as e:
+            logger.error(f"Coverage failed for candidate {i}: {e}")
+
+        progress = int((i + 1) / total * 60)
+        self.update_state(state='PROGRESS', meta={'progress': progress, 'message': f'Coverage {i + 1}/{total}'})
+
+    if token.cancelled:
+        # Without every candidate's coverage the objectives are meaningless
+        return {"status": token.reason, "partial": True, "objectives": [], "pareto_front": [],
+                "message": f"Stopped after coverage for {i}/{total} candidates"}
+
+    # 2. Candidate-to-candidate link matrix (only needed for connectivity)
+    if objectives.get('connectivity', 0.0):
+        self.update_state(state='PROGRESS', meta={'progress': 60, 'message': 'Analyzing candidate links...'})
+        heights = [float(c.get('height', 10.0)) for c in candidates]
+        links = link_matrix(tile_manager, candidates, freq, heights, max_link_m, k_factor, clutter_height, clutter_mode)
+    else:
+        links = np.zeros((len(candidates), len(candidates)), dtype=bool)
+
+    costs = [float(c.get('cost', 1.0)) for c in candidates]
+    problem = SiteSelectionProblem(
+        coverage_bits, cell_area_km2, costs, links,
+        objectives=objectives,
+        max_cost=constraints.get('max_cost'),
+        n_workers=NSGA_WORKERS
+    )
+
+    # 3. Evolve
+    def report(gen, generations, front_size):
+        progress = 70 + int(gen / generations * 30)
+        self.update_state(state='PROGRESS', meta={
+            'progress': progress,
+            'message': f'Generation {gen}/{generations}',
+            'generation': gen,
+            'front_size': front_size
+        })
+
+    front, _, violation = run_nsga2(
+        problem, k,
+        population_size=int(params.get('population_size', 64)),
+        generations=int(params.get('generations', 40)),
+        seed=params.get('seed'),
+        progress_cb=report,
+        should_stop=lambda: token.cancelled
+    )
+
+    # 4. Build Pareto front output (feasible solutions first, best coverage first)
+    metrics = problem.describe(front)
+    pareto_front = []
+    for idx, members in enumerate(front):
+        pareto_front.append({
+            "nodes": [
+                {
+                    "id": candidates[m].get('id'),
+                    "name": candidates[m].get('name'),
+                    "lat": candidates[m]['lat'],
+                    "lon": candidates[m]['lon'],
+                    "height": candidates[m].get('height', 10.0)
+                }
+                for m in members
+            ],
+            "coverage_km2": round(float(metrics['coverage_km2'][idx]), 2),
+            "cost": round(float(metrics['cost'][idx]), 2),
+            "connectivity": round(float(metrics['connectivity'][idx]), 3),
+            "feasible": bool(violation[idx] <= 0)
+        })
+    pareto_front.sort(key=lambda s: (not s['feasible'], -s['coverage_km2'], s['cost']))
+
+    return {
+        "status": token.reason or "completed",
+        "partial": token.reason is not None,
+        "objectives": problem.active,
+        "resolution_m": round(res_m, 1),
+        "pareto_front": pareto_front
+    }
@@ -0,0 +1,98 @@
+import math
+import os
+
+# Queue routing for Celery tasks.
+#
+# Work is split by estimated cost so a 40-node, 50 km scan cannot hold every
+# worker slot while small scans wait behind it:
+#   interactive - short jobs, dedicated workers, tight time limits
+#   bulk        - everything above INTERACTIVE_MAX_COST, generous limits
+# Within a queue, cheaper jobs get a better priority (Redis transport: 0 = first).
+#
+# Cost is the number of viewshed cells evaluated: nodes x (radius / resolution)^2.
+# ~250k cells/s per worker on the vectorized viewshed, so the default interactive
+# ceiling (1M cells) is a few seconds of compute.
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+QUEUES = (INTERACTIVE, BULK)
+
+INTERACTIVE_MAX_COST = float(os.environ.get("INTERACTIVE_MAX_COST", 1_000_000))
+PRIORITY_LEVELS = 10
+
+# (soft, hard) seconds. Soft limits end the task early with partial results;
+# the hard limit kills the worker child if that does not happen in time.
+TIME_LIMITS = {
+    INTERACTIVE: (
+        int(os.environ.get("INTERACTIVE_SOFT_TIME_LIMIT", 120)),
+        int(os.environ.get("INTERACTIVE_TIME_LIMIT", 150)),
+    ),
+    BULK: (
+        int(os.environ.get("BULK_SOFT_TIME_LIMIT", 1500)),
+        int(os.environ.get("BULK_TIME_LIMIT", 1800)),
+    ),
+}
+
+# Tasks stop at this fraction of the soft limit to leave time to assemble results
+FINISH_MARGIN = 0.1
+ROUTE_TTL = 24 * 60 * 60
+
+
+def estimate_cost(n_nodes, radius_m, resolution_m=100.0):
+    """
+    Viewshed cells a job will evaluate.
+    """
+    return max(int(n_nodes), 0) * (float(radius_m) / max(float(resolution_m), 1.0)) ** 2
+
+
+def route_for_cost(cost):
+    """
+    Returns: {queue, priority, soft_time_limit, time_limit, cost}
+    """
+    queue = INTERACTIVE if cost <= INTERACTIVE_MAX_COST else BULK
+    priority = min(PRIORITY_LEVELS - 1, int(math.log10(max(cost, 1.0))))
+    soft, hard = TIME_LIMITS[queue]
+    return {"queue": queue, "priority": priority, "soft_time_limit": soft, "time_limit": hard, "cost": cost}
+
+
+def submit(task, payload, cost, redis_client=None):
+    """
+    apply_async() with queue, priority and time limits chosen from cost.
+    The route is stored in Redis so /task_status can size its timeout.
+    Returns: (AsyncResult, route)
+    """
+    route = route_for_cost(cost)
+    result = task.apply_async(
+        args=[payload],
+        queue=route["queue"],
+        priority=route["priority"],
+        soft_time_limit=route["soft_time_limit"],
+        time_limit=route["time_limit"],
+    )
+    if redis_client is not None:
+        redis_client.setex(f"task:route:{result.id}", ROUTE_TTL, route["queue"])
+    return result, route
+
+
+def task_queue(redis_client, task_id):
+    """
+    Queue a task was routed to (bulk when unknown, i.e. the longest limits).
+    """
+    try:
+        raw = redis_client.get(f"task:route:{task_id}")
+    except Exception:
+        raw = None
+    queue = raw.decode() if isinstance(raw, bytes) else raw
+    return queue if queue in QUEUES else BULK
+
+
+def soft_deadline(request, now):
+    """
+    Monotonic deadline at which a running task should wrap up, from the soft
+    time limit Celery attached to the request (None when there is none).
+    """
+    limits = getattr(request, "timelimit", None) or (None, None)
+    soft = limits[1] if len(limits) > 1 else None
+    if not soft:
+        return None
+    return now + soft * (1.0 - FINISH_MARGIN)
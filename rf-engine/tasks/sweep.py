@@ -0,0 +1,125 @@
+from worker import celery_app
+import time
+
+import numpy as np
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.utils.log import get_task_logger
+from core import geodesy, sweep
+from core.profile_planner import band_samples, plan_samples
+from models import ScenarioGrid
+from tasks.control import CancellationToken, TaskCancelled
+from tasks.routing import soft_deadline
+
+logger = get_task_logger(__name__)
+
+
+def sweep_links(tile_manager, links, grid, tx_height, rx_height, model='bullington', environment='suburban',
+                clutter_height=0.0, clutter_mode='auto', cancel_check=None, out=None):
+    """
+    link_sweep_report for every link, from one profile lookup pass.
+    links: [{tx_lat, tx_lon, rx_lat, rx_lon, tx_height?, rx_height?, id?}]
+    cancel_check: called before each link; raise from it to abort.
+    out: optional list of len(links) filled in place link by link, so the
+         finished reports survive an abort. Links not yet computed keep
+         their value (None when allocated here).
+    Returns: out
+    """
+    tx_lat = np.array([l['tx_lat'] for l in links], dtype=np.float64)
+    tx_lon = np.array([l['tx_lon'] for l in links], dtype=np.float64)
+    rx_lat = np.array([l['rx_lat'] for l in links], dtype=np.float64)
+    rx_lon = np.array([l['rx_lon'] for l in links], dtype=np.float64)
+
+    dist_m = geodesy.haversine(tx_lat, tx_lon, rx_lat, rx_lon)
+    resolution_m = tile_manager.effective_resolution_m(float(np.mean((tx_lat + rx_lat) / 2.0)))
+    samples = band_samples(plan_samples(dist_m, resolution_m, purpose="link"))
+    groups = tile_manager.get_elevation_profile_groups(
+        tx_lat, tx_lon, rx_lat, rx_lon, samples, clutter_height=clutter_height, clutter_mode=clutter_mode
+    )
+
+    if out is None:
+        out = [None] * len(links)
+    elif len(out) != len(links):
+        raise ValueError(f"out must be a list of {len(links)} entries")
+    for idx, profiles, clutter in groups:
+        for row, i in enumerate(idx):
+            if cancel_check is not None:
+                cancel_check()
+            link = links[i]
+            axes = grid.axes(
+                tx_height if link.get('tx_height') is None else link['tx_height'],
+                rx_height if link.get('rx_height') is None else link['rx_height'],
+            )
+            entry = sweep.link_sweep_report(
+                profiles[row], float(dist_m[i]), *axes,
+                clutter_height=clutter if np.ndim(clutter) == 0 else clutter[row],
+                model=model, environment=environment
+            )
+            entry["id"] = link.get('id')
+            entry["dist_km"] = float(dist_m[i]) / 1000
+            out[i] = entry
+    return out
+
+
+@celery_app.task(bind=True)
+def run_sweep(self, params):
+    """
+    Scenario sweep over a k-factor/frequency/height grid (see core/sweep.py).
+    params: SweepRequest.model_dump() - {links, sites, grid, tx_height, rx_height,
+            model, environment, clutter_height, clutter_mode}
+    """
+    from tasks.viewshed import redis_client, tile_manager
+
+    links = params.get('links') or []
+    sites = params.get('sites') or []
+    grid = ScenarioGrid(**(params.get('grid') or {}))
+    tx_height = float(params.get('tx_height', 10.0))
+    rx_height = float(params.get('rx_height', 2.0))
+    clutter_height = float(params.get('clutter_height', 0.0))
+    clutter_mode = params.get('clutter_mode', 'auto')
+
+    self.update_state(state='PROGRESS', meta={'progress': 0, 'message': 'Loading terrain...'})
+    token = CancellationToken(
+        redis_client, self.request.id, deadline=soft_deadline(self.request, time.monotonic())
+    )
+
+    started = time.perf_counter()
+    # Filled in place, so links finished before a cancel or time limit are returned
+    link_results, site_results = [None] * len(links), []
+    status = "completed"
+    try:
+        if links:
+            sweep_links(
+                tile_manager, links, grid, tx_height, rx_height,
+                model=params.get('model', 'bullington'), environment=params.get('environment', 'suburban'),
+                clutter_height=clutter_height, clutter_mode=clutter_mode, cancel_check=token.check,
+                out=link_results
+            )
+
+        for n, site in enumerate(sites):
+            token.check()
+            self.update_state(state='PROGRESS', meta={
+                'progress': int(n / len(sites) * 100), 'message': f'Site {n + 1}/{len(sites)}'
+            })
+            k_factors, _, tx_heights, rx_heights = grid.axes(float(site.get('height', tx_height)), rx_height)
+            entry = sweep.viewshed_sweep_report(
+                tile_manager, float(site['lat']), float(site['lon']), float(site.get('radius', 5000.0)),
+                k_factors, tx_heights, rx_heights,
+                resolution_m=tile_manager.effective_resolution_m(float(site['lat'])),
+                clutter_height=clutter_height, clutter_mode=clutter_mode
+            )
+            entry["id"] = site.get('id')
+            site_results.append(entry)
+    except TaskCancelled:
+        status = token.reason or "cancelled"
+    except SoftTimeLimitExceeded:
+        status = "time_limit"
+
+    link_results = [r for r in link_results if r is not None]
+    logger.info(f"Sweep of {len(link_results)}/{len(links)} links, {len(site_results)}/{len(sites)} sites in "
+                f"{time.perf_counter() - started:.2f}s")
+    return {
+        "status": status,
+        "partial": status != "completed",
+        "links": link_results,
+        "sites": site_results,
+    }
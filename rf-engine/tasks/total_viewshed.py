@@ -0,0 +1,91 @@
+from worker import celery_app
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.utils.log import get_task_logger
+from core import total_viewshed
+from tasks.control import CancellationToken, TaskCancelled
+from tasks.routing import soft_deadline
+
+logger = get_task_logger(__name__)
+
+# Observer chunks run on threads: the horizon-sweep kernel releases the GIL,
+# so one prefork child uses several cores for a single raster.
+TOTAL_VIEWSHED_WORKERS = int(os.environ.get("TOTAL_VIEWSHED_WORKERS", 4))
+MAX_GRID_DIM = 128
+
+
+def estimate_cost(grid_dim, radius_m, resolution_m=100.0, n_rays=total_viewshed.DEFAULT_RAYS):
+    """
+    Ray samples evaluated, in the units of tasks.routing (cells).
+    """
+    bearings, dists = total_viewshed.ray_layout(radius_m, resolution_m, n_rays)
+    return grid_dim * grid_dim * len(bearings) * len(dists)
+
+
+@celery_app.task(bind=True)
+def calculate_total_viewshed(self, params):
+    """
+    Cumulative viewshed raster: visible area from every cell of a bbox grid.
+    params: {min_lat, min_lon, max_lat, max_lon, tx_height, rx_height, radius, grid_dim, n_rays,
+            clutter_height, clutter_mode}
+    """
+    from tasks.viewshed import redis_client, tile_manager
+
+    grid_dim = min(int(params.get('grid_dim', 64)), MAX_GRID_DIM)
+    radius = float(params.get('radius', 5000.0))
+    tx_height = float(params.get('tx_height', 10.0))
+    rx_height = float(params.get('rx_height', 2.0))
+    n_rays = int(params.get('n_rays', total_viewshed.DEFAULT_RAYS))
+    clutter_height = float(params.get('clutter_height', 0.0))
+    clutter_mode = params.get('clutter_mode', 'auto')
+    bbox = [float(params[k]) for k in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+
+    self.update_state(state='PROGRESS', meta={'progress': 0, 'message': 'Loading terrain...'})
+    token = CancellationToken(
+        redis_client, self.request.id, deadline=soft_deadline(self.request, time.monotonic())
+    )
+
+    def report(done, total):
+        self.update_state(state='PROGRESS', meta={
+            'progress': int(done / total * 100), 'message': f'Observers {done}/{total}'
+        })
+
+    lat_grid, lon_grid = total_viewshed.observer_grid(*bbox, grid_dim)
+    area = np.full(lat_grid.shape, np.nan)
+    status = "completed"
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=TOTAL_VIEWSHED_WORKERS, thread_name_prefix='totalvs_') as pool:
+            total_viewshed.total_viewshed(
+                tile_manager, *bbox, tx_height, radius, rx_h=rx_height, grid_dim=grid_dim,
+                n_rays=n_rays, clutter_height=clutter_height, clutter_mode=clutter_mode,
+                executor=pool, cancel_check=token.check, progress=report, out=area
+            )
+    except TaskCancelled:
+        status = token.reason or "cancelled"
+    except SoftTimeLimitExceeded:
+        status = "time_limit"
+
+    # Observer chunks that had not run are NaN; they come back as null
+    computed = ~np.isnan(area)
+    logger.info(f"Total viewshed {area.shape[0]}x{area.shape[1]} ({int(computed.sum())} observers, {status}) "
+                f"in {time.perf_counter() - started:.2f}s")
+    return {
+        "status": status,
+        "partial": status != "completed",
+        "bounds": dict(zip(('min_lat', 'min_lon', 'max_lat', 'max_lon'), bbox)),
+        "rows": int(area.shape[0]),
+        "cols": int(area.shape[1]),
+        "lats": [round(float(v), 6) for v in lat_grid[:, 0]],
+        "lons": [round(float(v), 6) for v in lon_grid[0, :]],
+        "area_km2": [[round(float(v), 3) if ok else None for v, ok in zip(row, mask)]
+                     for row, mask in zip(area, computed)],
+        "computed": computed.tolist(),
+        "observers_computed": int(computed.sum()),
+        "max_area_km2": round(float(area[computed].max()), 3) if computed.any() else 0.0,
+        "radius": radius,
+    }
@@ -10,6 +10,10 @@ from core.algorithms import calculate_viewshed
 from tile_manager import TileManager
 from models import NodeConfig
 import rf_physics
+from core.profile_planner import plan_profile
+from celery.exceptions import SoftTimeLimitExceeded
+from tasks.control import CancellationToken, TaskCancelled, finish_task, scan_fingerprint
+from tasks.routing import soft_deadline
 
 logger = get_task_logger(__name__)
 
@@ -35,6 +39,20 @@ def calculate_batch_viewshed(self, params):
     Calculate viewsheds for a list of nodes.
     params: { "nodes": [ {lat, lon, height, ...} ], "options": {"radius": 5000, "optimize_n": 3} }
     """
+    result = None
+    try:
+        result = _batch_viewshed(self, params)
+        return result
+    finally:
+        # Completed scans stay joinable for a while; failed or partial ones do not
+        completed = result is not None and result.get("status") == "completed"
+        try:
+            finish_task(redis_client, scan_fingerprint(params), self.request.id, completed)
+        except Exception as e:
+            logger.warning(f"Scan dedup cleanup failed: {e}")
+
+
+def _batch_viewshed(self, params):
     from core.algorithms import calculate_viewshed
     import base64
     from io import BytesIO
@@ -50,6 +68,13 @@ def calculate_batch_viewshed(self, params):
     rx_height = float(options.get('rx_height', 2.0))
     freq = float(options.get('frequency_mhz', 915.0))
     
+    # Superseded scans are cancelled via /scan/cancel, and the queue's soft time
+    # limit sets a deadline; both are checked between units of work so the scan
+    # returns what it has instead of being killed.
+    token = CancellationToken(
+        redis_client, self.request.id, deadline=soft_deadline(self.request, time.monotonic())
+    )
+    
     # 1. Determine Bounding Box for Composite
     if not nodes_data:
         return {"status": "completed", "results": []}
@@ -122,6 +147,8 @@ def calculate_batch_viewshed(self, params):
     
     total = len(nodes_data)
     for i, node_data in enumerate(nodes_data):
+        if token.cancelled:
+            break
         try:
             lat = float(node_data.get('lat'))
             lon = float(node_data.get('lon'))
@@ -130,7 +157,10 @@ def calculate_batch_viewshed(self, params):
             # Simple viewshed
             grid, grid_lats, grid_lons = calculate_viewshed(
                 tile_manager, lat, lon, height, radius, 
-                rx_h=rx_height, freq_mhz=freq, resolution_m=res_m
+                rx_h=rx_height, freq_mhz=freq, resolution_m=res_m,
+                cancel_check=token.check,
+                clutter_height=options.get('clutter_height', 0.0),
+                clutter_mode=options.get('clutter_mode', 'auto')
             )
             
             coverage_count = int(np.sum(grid))
@@ -151,6 +181,11 @@ def calculate_batch_viewshed(self, params):
             progress = int((i + 1) / total * 50) # First 50% for individual calcs
             self.update_state(state='PROGRESS', meta={'progress': progress, 'message': f'Analyzed candidates {i+1}/{total}'})
             
+        except TaskCancelled:
+            break
+        except SoftTimeLimitExceeded:
+            token.stop("time_limit")
+            break
         except Exception as e:
             logger.error(f"Error processing node {i}: {e}")
 
@@ -262,7 +297,11 @@ def calculate_batch_viewshed(self, params):
     inter_node_links = []
     n_selected = len(selected_results)
     for i in range(n_selected):
+        if token.cancelled:
+            break
         for j in range(i + 1, n_selected):
+            if token.cancelled:
+                break
             node_a = selected_results[i]
             node_b = selected_results[j]
             try:
@@ -270,23 +309,28 @@ def calculate_batch_viewshed(self, params):
                     node_a['lat'], node_a['lon'],
                     node_b['lat'], node_b['lon']
                 )
-                elevs = tile_manager.get_elevation_profile(
+                plan = plan_profile(
+                    dist_m, tile_manager.effective_resolution_m(node_a['lat']), purpose="matrix"
+                )
+                elevs, clutter = tile_manager.get_elevation_profiles(
                     node_a['lat'], node_a['lon'],
                     node_b['lat'], node_b['lon'],
-                    samples=50
+                    samples=plan['samples'],
+                    clutter_height=options.get('clutter_height', 0.0),
+                    clutter_mode=options.get('clutter_mode', 'auto')
                 )
                 h_a = node_a.get('height', 10.0)
                 h_b = node_b.get('height', 10.0)
                 link_result = rf_physics.analyze_link(
                     elevs, dist_m, freq, h_a, h_b,
                     k_factor=options.get('k_factor', 1.333),
-                    clutter_height=options.get('clutter_height', 0.0)
+                    clutter_height=clutter
                 )
                 path_loss_db = rf_physics.calculate_path_loss(
                     dist_m, elevs, freq, h_a, h_b,
                     model='bullington',
                     k_factor=options.get('k_factor', 1.333),
-                    clutter_height=options.get('clutter_height', 0.0)
+                    clutter_height=clutter
                 )
                 inter_node_links.append({
                     "node_a_idx": i,
@@ -296,8 +340,12 @@ def calculate_batch_viewshed(self, params):
                     "dist_km": round(dist_m / 1000, 2),
                     "status": link_result['status'],
                     "path_loss_db": round(float(path_loss_db), 1),
-                    "min_clearance_ratio": round(float(link_result['min_clearance_ratio']), 2)
+                    "min_clearance_ratio": round(float(link_result['min_clearance_ratio']), 2),
+                    "profile_samples": plan['samples']
                 })
+            except SoftTimeLimitExceeded:
+                token.stop("time_limit")
+                break
             except Exception as e:
                 logger.error(f"Link analysis failed for nodes {i}-{j}: {e}")
                 inter_node_links.append({
@@ -380,11 +428,16 @@ def calculate_batch_viewshed(self, params):
     for idx, res in enumerate(final_results):
         res["connectivity_score"] = connectivity[idx]
 
+    if token.reason:
+        logger.info(f"Batch viewshed {self.request.id} stopped ({token.reason}) after {len(all_node_results)}/{total} nodes")
+
     return {
-        "status": "completed",
+        "status": token.reason or "completed",
+        "partial": token.reason is not None,
         "results": final_results,
         "inter_node_links": inter_node_links,
         "total_unique_coverage_km2": total_unique_km2,
+        "profile_resolution_m": round(tile_manager.effective_resolution_m(mean_lat), 1),
         "composite": {
             "image": img_str,
             "bounds": {
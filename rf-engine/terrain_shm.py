@@ -0,0 +1,184 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Host-wide cache of decoded terrain tiles in a shared mmapped file.
+#
+# Every uvicorn worker and Celery prefork child maps the same file, so a tile
+# decoded by one process is visible to all of them without touching Redis or
+# msgpack again. Layout:
+#
+#   header  | magic (8) | n_slots (u32) | values per tile (u32) | pad to 64
+#   slot[i] | seq (u64) | key (u64) | stamp (f64) | elevation (f64 x 256)
+#
+# The slots form an open-addressing hash table probed over a short window.
+# Readers are lock-free: each slot carries a seqlock counter (odd while being
+# written) and a read is retried if the counter moved. Writers take an fcntl
+# byte-range lock on the slot, so concurrent fills from different processes
+# cannot interleave. When the window is full, the oldest slot is overwritten.
+
+MAGIC = b"MRFTSHM1"
+HEADER_SIZE = 64
+SLOT_META = 24  # seq, key, stamp
+PROBE_WINDOW = 8
+READ_RETRIES = 4
+KEY_PRESENT = 1 << 63  # Distinguishes tile (0, 0, 0) from an empty slot
+
+
+def tile_key(x, y, z):
+    return KEY_PRESENT | (int(z) << 58) | (int(x) << 29) | int(y)
+
+
+class SharedTerrainCache:
+    """
+    Fixed-size shared tile store.
+    get() returns a private copy of the tile values validated against the
+    slot's seqlock: slots can be recycled by other processes at any time, so
+    handing out views into the mapping would risk torn data.
+    """
+
+    def __init__(self, path, n_slots=16384, values_per_tile=256):
+        self.path = path
+        self.values_per_tile = values_per_tile
+        self.slot_size = SLOT_META + 8 * values_per_tile
+        size = HEADER_SIZE + n_slots * self.slot_size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self.n_slots = self._init_or_attach(size, n_slots)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+        size = HEADER_SIZE + self.n_slots * self.slot_size
+        self._mm = mmap.mmap(self._fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        base = dict(buffer=self._mm, strides=(self.slot_size,))
+        self._seq = np.ndarray((self.n_slots,), dtype=np.uint64, offset=HEADER_SIZE, **base)
+        self._keys = np.ndarray((self.n_slots,), dtype=np.uint64, offset=HEADER_SIZE + 8, **base)
+        self._stamps = np.ndarray((self.n_slots,), dtype=np.float64, offset=HEADER_SIZE + 16, **base)
+        self._data = np.ndarray(
+            (self.n_slots, values_per_tile), dtype=np.float64, buffer=self._mm,
+            offset=HEADER_SIZE + SLOT_META, strides=(self.slot_size, 8)
+        )
+
+    def _init_or_attach(self, size, n_slots):
+        """
+        First process on the host sizes the file and writes the header; the
+        rest attach and adopt its geometry. Called under an exclusive flock.
+        """
+        current = os.fstat(self._fd).st_size
+        if current == 0:
+            os.ftruncate(self._fd, size)
+            header = struct.pack("<8sII", MAGIC, n_slots, self.values_per_tile)
+            os.pwrite(self._fd, header.ljust(HEADER_SIZE, b"\0"), 0)
+            logger.info(f"Created shared terrain cache {self.path} ({size / 1e6:.1f} MB, {n_slots} tiles)")
+            return n_slots
+
+        magic, existing_slots, values = struct.unpack("<8sII", os.pread(self._fd, 16, 0))
+        if magic != MAGIC or values != self.values_per_tile:
+            raise ValueError(f"{self.path} is not a compatible terrain cache")
+        if current < HEADER_SIZE + existing_slots * self.slot_size:
+            raise ValueError(f"{self.path} is truncated")
+        return existing_slots
+
+    def _slots(self, key):
+        h = (key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        start = (h >> 32) % self.n_slots
+        return [(start + i) % self.n_slots for i in range(PROBE_WINDOW)]
+
+    def get(self, x, y, z):
+        """
+        Returns: float64 array of the tile's values, or None.
+        """
+        key = tile_key(x, y, z)
+        for slot in self._slots(key):
+            found = int(self._keys[slot])
+            if found == 0:
+                return None  # Empty slot ends the probe sequence
+            if found != key:
+                continue
+            for _ in range(READ_RETRIES):
+                before = int(self._seq[slot])
+                if before & 1:
+                    continue  # Writer active
+                values = self._data[slot].copy()
+                if int(self._seq[slot]) == before and int(self._keys[slot]) == key:
+                    return values
+            return None
+        return None
+
+    def put(self, x, y, z, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size != self.values_per_tile:
+            return False
+        key = tile_key(x, y, z)
+        slots = self._slots(key)
+
+        # Prefer the slot already holding this key, then an empty one, then the oldest
+        target = None
+        for slot in slots:
+            found = int(self._keys[slot])
+            if found == key or found == 0:
+                target = slot
+                break
+        if target is None:
+            target = min(slots, key=lambda s: float(self._stamps[s]))
+
+        offset = HEADER_SIZE + target * self.slot_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset, os.SEEK_SET)
+        try:
+            self._seq[target] += 1  # Odd: readers back off
+            self._keys[target] = key
+            self._data[target] = values
+            self._stamps[target] = time.time()
+            self._seq[target] += 1
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset, os.SEEK_SET)
+        return True
+
+    def clear(self):
+        """
+        Drop every entry (used when the elevation dataset changes).
+        """
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)  # Whole file: excludes every slot writer
+        try:
+            self._seq += 1
+            self._keys[:] = 0
+            self._stamps[:] = 0.0
+            self._seq += 1
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        self._seq = self._keys = self._stamps = self._data = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # A caller still holds a view; the mapping is released with it
+        os.close(self._fd)
+
+
+def from_env():
+    """
+    SharedTerrainCache at TERRAIN_SHM_PATH, or None when unset or unusable
+    (the TileManager then falls back to Redis only).
+    """
+    path = os.environ.get("TERRAIN_SHM_PATH")
+    if not path:
+        return None
+    try:
+        return SharedTerrainCache(path, n_slots=int(os.environ.get("TERRAIN_SHM_SLOTS", 16384)))
+    except Exception as e:
+        logger.warning(f"Shared terrain cache disabled ({path}): {e}")
+        return None
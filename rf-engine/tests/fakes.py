@@ -0,0 +1,111 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from core import geodesy
+from tile_manager import TileManager
+
+# In-memory stand-ins shared by the tests.
+
+
+class DictRedis(dict):
+    """
+    The redis-py calls the engine makes, on a plain dict. TTLs are
+    recorded in .ttls, never applied.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.ttls = {}
+
+    def get(self, key):
+        return dict.get(self, key)
+
+    def setex(self, key, ttl, value):
+        self[key] = value
+        self.ttls[key] = ttl
+
+    def incr(self, key):
+        self[key] = int(self.get(key) or 0) + 1
+        return self[key]
+
+    def expire(self, key, ttl):
+        if key not in self:
+            return False
+        self.ttls[key] = ttl
+        return True
+
+    def exists(self, key):
+        return int(key in self)
+
+    def delete(self, key):
+        self.pop(key, None)
+        self.ttls.pop(key, None)
+
+
+# Synthetic terrains, served as a local (SDF-style) source so every lookup is
+# answered without tile fetches.
+
+class FlatTerrain:
+    """
+    Flat 100 m plain.
+    """
+
+    def sample_elevations(self, lats, lons):
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        return np.full(lats.shape, 100.0), np.ones(lats.shape, dtype=bool)
+
+    def get_elevation(self, lat, lon):
+        return 100.0
+
+
+class RidgeTerrain:
+    """
+    Flat 100 m plain with a 250 m north-south ridge along lon -122.30.
+    """
+
+    def sample_elevations(self, lats, lons):
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        east_m = (lons - -122.30) * 111320.0 * np.cos(np.radians(48.6))
+        return 100.0 + 250.0 * np.exp(-(east_m / 300.0) ** 2), np.ones(lats.shape, dtype=bool)
+
+    def get_elevation(self, lat, lon):
+        return float(self.sample_elevations(lat, lon)[0])
+
+
+class HillTerrain:
+    """
+    Flat 100 m plain with gaussian hills.
+    """
+
+    def __init__(self, hills):
+        self.hills = hills  # [(lat, lon, height_m, sigma_m)]
+
+    def sample_elevations(self, lats, lons):
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+        elev = np.full(lats.shape, 100.0)
+        for lat, lon, height, sigma in self.hills:
+            d = geodesy.haversine(lat, lon, lats, lons)
+            elev += height * np.exp(-(d / sigma) ** 2)
+        return elev, np.ones(lats.shape, dtype=bool)
+
+    def get_elevation(self, lat, lon):
+        return float(self.sample_elevations(lat, lon)[0])
+
+
+def terrain_manager(terrain, clutter=None, resolution_m=30.0):
+    """
+    TileManager over a synthetic terrain; a tile fetch fails the test.
+    resolution_m: what effective_resolution_m reports (None = the dataset's).
+    The caller shuts it down.
+    """
+    tm = TileManager(DictRedis(), sdf=terrain, clutter=clutter)
+    tm._fetch_tile_from_api = lambda x, y, z: pytest.fail("tile fetched for covered terrain")
+    if resolution_m is not None:
+        tm.effective_resolution_m = lambda lat: resolution_m
+    return tm
@@ -0,0 +1,113 @@
+import sys
+import os
+import json
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clutter_raster
+import rf_physics
+from clutter_raster import ClutterRaster
+from core import total_viewshed
+from fakes import FlatTerrain, terrain_manager
+
+
+def _write_grid(directory, name, data, meta):
+    np.save(os.path.join(directory, name + ".npy"), data)
+    with open(os.path.join(directory, name + ".json"), "w") as f:
+        json.dump(meta, f)
+
+
+@pytest.fixture
+def clutter_dir(tmp_path):
+    # 0.1 x 0.1 degree WorldCover tile: grassland, with a forest band
+    # between lon -122.46 and -122.44
+    landcover = np.full((100, 100), 30, dtype=np.uint8)
+    landcover[:, 40:60] = 10
+    _write_grid(str(tmp_path), "worldcover", landcover,
+                {"west": -122.5, "north": 48.8, "dlon": 0.001, "dlat": 0.001, "kind": "landcover"})
+    # Canopy-height grid further east, in decimetres
+    canopy = np.full((10, 10), 250, dtype=np.int16)
+    _write_grid(str(tmp_path), "canopy", canopy,
+                {"west": -122.3, "north": 48.8, "dlon": 0.01, "dlat": 0.01, "kind": "height", "scale": 0.1})
+    return str(tmp_path)
+
+
+@pytest.fixture
+def tile_manager(clutter_dir):
+    tm = terrain_manager(FlatTerrain(), clutter=ClutterRaster(clutter_dir))
+    yield tm
+    tm.shutdown()
+
+
+class TestClutterRaster:
+    def test_landcover_and_height_grids(self, clutter_dir):
+        raster = ClutterRaster(clutter_dir)
+        heights, covered = raster.sample_heights(
+            np.array([48.75, 48.75, 48.75, 48.75]), np.array([-122.48, -122.45, -122.25, -121.0])
+        )
+        assert covered.tolist() == [True, True, True, False]
+        assert heights.tolist() == [0.0, 15.0, 25.0, 0.0]
+
+    def test_from_env(self, clutter_dir, monkeypatch):
+        monkeypatch.delenv("CLUTTER_DIR", raising=False)
+        assert clutter_raster.from_env() is None
+        monkeypatch.setenv("CLUTTER_DIR", clutter_dir)
+        assert len(clutter_raster.from_env()) == 2
+
+    def test_modes(self, tile_manager):
+        lats = np.array([48.75, 48.75])
+        lons = np.array([-122.45, -121.0])  # Forest, outside every grid
+        assert tile_manager.sample_clutter(lats, lons, 5.0, "auto").tolist() == [15.0, 5.0]
+        assert tile_manager.sample_clutter(lats, lons, 5.0, "raster").tolist() == [15.0, 0.0]
+        assert tile_manager.sample_clutter(lats, lons, 5.0, "uniform") == 5.0
+        with pytest.raises(ValueError):
+            tile_manager.sample_clutter(lats, lons, 5.0, "dense")
+
+    def test_profiles_carry_clutter(self, tile_manager):
+        elevs, clutter = tile_manager.get_elevation_profiles(
+            48.75, -122.49, 48.75, -122.41, samples=81, clutter_height=0.0
+        )
+        assert elevs.shape == clutter.shape == (81,)
+        assert clutter.max() == 15.0 and clutter[0] == 0.0
+
+        groups = tile_manager.get_elevation_profile_groups(
+            [48.75, 48.75], [-122.49, -122.49], [48.76, 48.75], [-122.48, -122.41], [20, 40],
+            clutter_height=0.0
+        )
+        assert [(g[1].shape, g[2].shape) for g in groups] == [((1, 20), (1, 20)), ((1, 40), (1, 40))]
+
+    def test_forest_blocks_link(self, tile_manager):
+        # 6 km link across the forest band with 5 m masts
+        dist = rf_physics.haversine_distance(48.75, -122.49, 48.75, -122.41)
+        results = {}
+        for mode in ("uniform", "auto"):
+            elevs, clutter = tile_manager.get_elevation_profiles(
+                48.75, -122.49, 48.75, -122.41, samples=81, clutter_height=0.0, clutter_mode=mode
+            )
+            results[mode] = rf_physics.analyze_link(elevs, dist, 915.0, 5.0, 5.0, clutter_height=clutter)
+            batch = rf_physics.min_clearance_ratio_batch(elevs[None, :], dist, 915.0, 5.0, 5.0, clutter_height=clutter)
+            assert batch[0] == pytest.approx(results[mode]["min_clearance_ratio"])
+        assert results["uniform"]["status"] != "blocked"
+        assert results["auto"]["status"] == "blocked"
+
+    def test_forest_reduces_visible_area(self, tile_manager):
+        # 5 m masts just west of the forest band see less with raster clutter
+        bbox = (48.745, -122.475, 48.755, -122.465)
+        areas = {}
+        for mode in ("uniform", "auto"):
+            areas[mode], _, _ = total_viewshed.total_viewshed(
+                tile_manager, *bbox, 5.0, 3000, grid_dim=4, clutter_mode=mode
+            )
+        assert areas["uniform"] == pytest.approx(np.pi * 3.0 ** 2, rel=0.02)
+        assert (areas["auto"] < 0.8 * areas["uniform"]).all()
+
+        window = total_viewshed.terrain_window(tile_manager, *bbox, 3000)
+        area = total_viewshed.visible_area(
+            *window, [48.75], [-122.47], 5.0, 3000,
+            clutter=lambda lats, lons: tile_manager.sample_clutter(lats, lons, 0.0, "auto")
+        )
+        assert area[0] < 0.8 * np.pi * 3.0 ** 2
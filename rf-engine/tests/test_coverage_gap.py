@@ -0,0 +1,89 @@
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import coverage_gap, total_viewshed
+from fakes import RidgeTerrain, terrain_manager
+
+
+@pytest.fixture
+def tile_manager():
+    tm = terrain_manager(RidgeTerrain())
+    yield tm
+    tm.shutdown()
+
+
+def analyse(tile_manager, lats, lons, radius, bbox, resolution_m=100.0, executor=None):
+    visibility = np.zeros((len(lats),) + coverage_gap.table_shape(radius, resolution_m), dtype=bool)
+    for idx, visible in coverage_gap.block_visibility(
+        tile_manager, lats, lons, 10.0, radius, resolution_m, executor=executor, chunk=2
+    ):
+        visibility[idx] = visible
+    lat_axis, lon_axis, cell_km2 = coverage_gap.region_grid(*bbox, resolution_m)
+    return visibility, coverage_gap.coverage_count(visibility, lats, lons, radius, lat_axis, lon_axis), cell_km2
+
+
+class TestNodeCoverage:
+    def test_flat_disc(self, tile_manager):
+        # West of the ridge the plain is flat: the whole disc is covered
+        lat, lon, radius = 48.6, -122.45, 3000.0
+        _, count, cell_km2 = analyse(tile_manager, [lat], [lon], radius, (48.55, -122.52, 48.65, -122.38))
+        assert count.sum() * cell_km2 == pytest.approx(np.pi * 9.0, rel=0.05)
+
+    def test_blocks_match_own_windows(self, tile_manager):
+        lats = np.array([48.60, 48.61, 48.60, 48.90])
+        lons = np.array([-122.33, -122.28, -122.40, -122.33])
+        radius = 4000.0
+        blocks = coverage_gap.node_blocks(lats, lons, radius)
+        assert sorted(np.concatenate(blocks).tolist()) == [0, 1, 2, 3]
+        assert [0, 1] in [b.tolist() for b in blocks] and [3] in [b.tolist() for b in blocks]
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            visibility, _, _ = analyse(tile_manager, lats, lons, radius, (48.5, -122.5, 49.0, -122.2), executor=pool)
+        n_rays = coverage_gap.ray_count(radius, 100.0)
+        for i in range(len(lats)):
+            window = total_viewshed.terrain_window(tile_manager, lats[i], lons[i], lats[i], lons[i], radius)
+            own, _ = total_viewshed.ray_visibility(*window, [lats[i]], [lons[i]], 10.0, radius, n_rays=n_rays,
+                                                   resolution_m=100.0)
+            assert (visibility[i] == own[0]).mean() > 0.99
+
+    def test_ridge_shadows_the_far_side(self, tile_manager):
+        lat, lon, radius = 48.6, -122.36, 8000.0
+        bbox = (48.55, -122.47, 48.65, -122.25)
+        _, count, _ = analyse(tile_manager, [lat], [lon], radius, bbox)
+        lat_axis, lon_axis, _ = coverage_gap.region_grid(*bbox, 100.0)
+        row = np.argmin(np.abs(lat_axis - lat))
+        assert count[row, np.argmin(np.abs(lon_axis - -122.40))] == 1
+        assert count[row, np.argmin(np.abs(lon_axis - -122.27))] == 0
+
+
+class TestGapsAndPartitions:
+    def test_gaps_largest_first_and_small_dropped(self):
+        count = np.ones((40, 40), dtype=np.uint16)
+        count[2:12, 2:12] = 0    # 100 cells
+        count[30:33, 30:33] = 0  # 9 cells
+        count[20, 5] = 0         # 1 cell, below min_gap_km2
+        lat_axis = np.linspace(49.0, 48.0, 40)
+        lon_axis = np.linspace(-123.0, -122.0, 40)
+        gaps, labels = coverage_gap.find_gaps(count, lat_axis, lon_axis, 0.25, [48.5], [-122.5], min_gap_km2=1.0)
+        assert [g["area_km2"] for g in gaps] == [25.0, 2.25]
+        assert gaps[0]["centroid"]["lat"] == pytest.approx(lat_axis[2:12].mean(), abs=1e-6)
+        assert labels[20, 5] == 0 and labels[5, 5] > 0
+        assert gaps[1]["nearest_node_km"] > 0
+
+    def test_partitions(self):
+        lats = np.array([48.0, 48.01, 48.02, 48.5, 48.51])
+        lons = np.full(5, -122.0)
+        links = np.zeros((5, 5), dtype=bool)
+        for a, b in [(0, 1), (1, 2), (3, 4)]:
+            links[a, b] = links[b, a] = True
+        parts = coverage_gap.partitions(links, lats, lons)
+        assert [p["nodes"] for p in parts] == [[0, 1, 2], [3, 4]]
+        assert parts[0]["nearest_km"] == pytest.approx(53.4, abs=0.5)
+        assert coverage_gap.partitions(np.ones((2, 2), dtype=bool), lats[:2], lons[:2])[0]["nearest_km"] is None
@@ -0,0 +1,60 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rf_physics
+from core import geodesy
+
+
+class TestGeodesy:
+    def test_haversine_matches_scalar(self):
+        lat2 = np.array([48.0, 48.5, 47.2])
+        lon2 = np.array([-122.0, -121.5, -123.9])
+        dists = geodesy.haversine(48.75, -122.48, lat2, lon2)
+        for d, la, lo in zip(dists, lat2, lon2):
+            assert d == pytest.approx(rf_physics.haversine_distance(48.75, -122.48, la, lo), rel=1e-9)
+
+    def test_destination_roundtrip(self):
+        lat, lon = geodesy.destination_point(48.75, -122.48, 37.0, 25000.0)
+        assert geodesy.haversine(48.75, -122.48, lat, lon) == pytest.approx(25000.0, rel=1e-9)
+        assert geodesy.initial_bearing(48.75, -122.48, lat, lon) == pytest.approx(37.0, abs=1e-6)
+
+    def test_great_circle_points_evenly_spaced(self):
+        lats, lons = geodesy.great_circle_points(48.0, -123.0, 48.3, -122.4, 11)
+        assert (lats[0], lons[0]) == (48.0, -123.0)
+        assert (lats[-1], lons[-1]) == (48.3, -122.4)
+        steps = geodesy.haversine(lats[:-1], lons[:-1], lats[1:], lons[1:])
+        assert np.allclose(steps, steps[0], rtol=1e-9)
+
+    def test_great_circle_points_broadcast(self):
+        lat2 = np.array([48.1, 48.2, 48.75])
+        lon2 = np.array([-122.0, -122.9, -122.48])
+        lats, lons = geodesy.great_circle_points(48.75, -122.48, lat2, lon2, 5)
+        assert lats.shape == (3, 5)
+        # Degenerate (zero-length) path stays on the point
+        assert np.allclose(lats[2], 48.75) and np.allclose(lons[2], -122.48)
+
+
+class TestClearanceBatch:
+    def test_matches_analyze_link(self):
+        rng = np.random.default_rng(3)
+        profiles = rng.random((6, 20)) * 200
+        dists = np.array([500.0, 2000.0, 5000.0, 12000.0, 30000.0, 0.5])
+        ratios = rf_physics.min_clearance_ratio_batch(profiles, dists, 915.0, 10.0, 2.0, k_factor=1.333, clutter_height=3.0)
+        for profile, dist, ratio in zip(profiles, dists, ratios):
+            expected = rf_physics.analyze_link(profile, dist, 915.0, 10.0, 2.0, k_factor=1.333, clutter_height=3.0)
+            assert ratio == pytest.approx(expected['min_clearance_ratio'])
+
+    def test_path_loss_batch_matches_scalar(self):
+        rng = np.random.default_rng(4)
+        profiles = rng.random((4, 24)) * 300
+        dists = np.array([1500.0, 6000.0, 18000.0, 40000.0])
+        for model in ("bullington", "hata"):
+            losses = rf_physics.calculate_path_loss_batch(dists, profiles, 915.0, 10.0, 2.0, model=model)
+            for profile, dist, loss in zip(profiles, dists, losses):
+                expected = rf_physics.calculate_path_loss(dist, profile, 915.0, 10.0, 2.0, model=model)
+                assert loss == pytest.approx(expected, abs=1e-9)
@@ -0,0 +1,171 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rf_physics
+from core import kernels
+
+R_EFF = 1.333 * rf_physics.EARTH_RADIUS_KM * 1000
+
+
+def rng_alt(n):
+    return np.random.default_rng(4).random(n) * 100
+
+
+def _profiles(rng, n=64, samples=120):
+    return 100 + rng.random((n, samples)) * 250, 2000 + rng.random(n) * 20000
+
+
+class TestKernels:
+    def test_clearance_matches_analyze_link(self):
+        elevs, dists = _profiles(np.random.default_rng(1), n=8)
+        ratios = kernels.min_clearance_ratio(elevs, dists, 915.0, 30.0, 2.0, R_EFF)
+        for ratio, profile, d in zip(ratios, elevs, dists):
+            expected = rf_physics.analyze_link(profile, d, 915.0, 30.0, 2.0)['min_clearance_ratio']
+            assert ratio == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+    @pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason="numba not installed")
+    def test_numba_matches_numpy(self):
+        elevs, dists = _profiles(np.random.default_rng(2))
+        tx_h = np.full(len(dists), 15.0)
+        rx_h = np.full(len(dists), 2.0)
+        wavelength = 2.99792e8 / 868e6
+        for nb, np_ in [
+            (kernels._min_clearance_ratio_nb, kernels._min_clearance_ratio_np),
+            (kernels._max_knife_edge_v_nb, kernels._max_knife_edge_v_np),
+        ]:
+            clutter = np.random.default_rng(4).random(elevs.shape) * 20
+            for c in (kernels._as_samples(5.0, elevs.shape), clutter):
+                args = (elevs, dists, tx_h, rx_h, wavelength, R_EFF, c)
+                assert np.allclose(nb(*args), np_(*args), rtol=1e-9)
+
+        for depth in (1, 3):
+            args = (elevs, dists, tx_h, rx_h, wavelength, R_EFF, clutter, depth)
+            assert np.allclose(kernels._deygout_nb(*args), kernels._deygout_np(*args), rtol=1e-9)
+
+        heights = elevs[:, 1:]
+        steps = np.linspace(100.0, 12000.0, heights.shape[1])
+        tx_alt = 250 + rng_alt(len(heights))
+        clutter = np.random.default_rng(5).random(heights.shape) * 20
+        assert np.array_equal(
+            kernels._horizon_sweep_nb(heights, steps, tx_alt, 2.0, R_EFF, clutter),
+            kernels._horizon_sweep_np(heights, steps, tx_alt, 2.0, R_EFF, clutter),
+        )
+
+    def test_per_sample_clutter_matches_analyze_link(self):
+        elevs, dists = _profiles(np.random.default_rng(6), n=6)
+        clutter = np.random.default_rng(7).random(elevs.shape) * 25
+        ratios = kernels.min_clearance_ratio(elevs, dists, 915.0, 30.0, 2.0, R_EFF, clutter)
+        for ratio, profile, c, d in zip(ratios, elevs, clutter, dists):
+            expected = rf_physics.analyze_link(profile, d, 915.0, 30.0, 2.0, clutter_height=c)['min_clearance_ratio']
+            assert ratio == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+    def test_deygout_single_edge_is_bullington(self):
+        elevs, dists = _profiles(np.random.default_rng(8), n=16)
+        clutter = np.random.default_rng(9).random(elevs.shape) * 10
+        assert np.allclose(
+            kernels.deygout_loss(elevs, dists, 915.0, 20.0, 2.0, R_EFF, clutter, max_depth=1),
+            rf_physics.calculate_bullington_loss_batch(dists, elevs, 915.0, 20.0, 2.0, clutter_height=clutter),
+        )
+
+    def test_deygout_two_ridges(self):
+        # Two equal ridges a third of the way in from each end
+        elevs = np.full(301, 100.0)
+        elevs[100] = elevs[200] = 180.0
+        single = rf_physics.calculate_bullington_loss(15000.0, elevs, 915.0, 10.0, 10.0)
+        multi = rf_physics.calculate_deygout_loss(15000.0, elevs, 915.0, 10.0, 10.0)
+        assert single > 0
+        # The second ridge adds a sub-edge of comparable size
+        assert 1.5 * single < multi < 2.5 * single
+        assert rf_physics.calculate_path_loss(15000.0, elevs, 915.0, 10.0, 10.0, model='deygout') == pytest.approx(
+            rf_physics.calculate_path_loss(15000.0, elevs, 915.0, 10.0, 10.0, model='fspl') + multi
+        )
+        batch = rf_physics.calculate_path_loss_batch(15000.0, elevs[None, :], 915.0, 10.0, 10.0, model='deygout')
+        assert batch[0] == pytest.approx(rf_physics.calculate_path_loss(15000.0, elevs, 915.0, 10.0, 10.0, model='deygout'))
+        with pytest.raises(ValueError):
+            kernels.deygout_loss(elevs[None, :], 15000.0, 915.0, 10.0, 10.0, R_EFF, max_depth=0)
+
+    def test_horizon_sweep_ridge_shadow(self):
+        dists = np.arange(1, 101) * 100.0
+        heights = np.full((2, 100), 100.0)
+        heights[1, 20] = 400.0  # Ridge 2 km out on the second ray
+        visible = kernels.horizon_sweep(heights, dists, 130.0, 2.0, R_EFF)
+        assert visible[0].all()
+        assert visible[1, :21].all()
+        assert not visible[1, 21:60].any()
+        # Per-ray antenna altitude: a mast high enough sees over the ridge
+        per_ray = kernels.horizon_sweep(heights, dists, np.array([130.0, 1000.0]), 2.0, R_EFF)
+        assert per_ray[0].all() and per_ray[1, 40:].all()
+
+    def test_horizon_sweep_clutter_raises_horizon(self):
+        dists = np.arange(1, 101) * 100.0
+        heights = np.full((1, 100), 100.0)
+        clutter = np.zeros((1, 100))
+        clutter[0, 10] = 30.0  # Tree line 1 km out
+        visible = kernels.horizon_sweep(heights, dists, 110.0, 2.0, R_EFF, clutter)
+        # Receivers beyond it stay hidden; the trees' own ground cell is still a target
+        assert visible[0, :11].all()
+        assert not visible[0, 11:].any()
+
+    def test_horizon_sweep_agrees_with_clearance(self):
+        # A sample is visible iff the straight TX->RX line clears every earlier sample
+        rng = np.random.default_rng(3)
+        dists = np.arange(1, 81) * 100.0
+        heights = 100 + rng.random((16, 80)) * 60
+        tx_alt = 100 + 40.0
+        visible = kernels.horizon_sweep(heights, dists, tx_alt, 2.0, R_EFF)
+        for r in range(16):
+            for j in range(1, 80):
+                elevs = np.concatenate([[tx_alt - 40.0], heights[r, :j + 1]])
+                d = np.concatenate([[0.0], dists[:j + 1]])
+                drop = d * (d[-1] - d) / (2 * R_EFF)
+                line = tx_alt + (heights[r, j] + 2.0 - tx_alt) * d / d[-1]
+                clear = np.all(line[1:-1] >= elevs[1:-1] + drop[1:-1] - 1e-9)
+                assert visible[r, j] == clear
+
+
+class RidgeTerrain:
+    """
+    Flat 100 m terrain with a 300 m north-south ridge 2 km east of the origin.
+    """
+
+    def __init__(self, lon0):
+        self.lon0 = lon0
+
+    def sample_elevations(self, lats, lons):
+        lons = np.asarray(lons, dtype=np.float64)
+        east_m = (lons - self.lon0) * 111320.0 * np.cos(np.radians(48.75))
+        return np.where(np.abs(east_m - 2000.0) < 150.0, 400.0, 100.0)
+
+    def get_elevation_profiles(self, lat1, lon1, lats2, lons2, samples, clutter_height=None, clutter_mode="auto"):
+        frac = np.linspace(0.0, 1.0, samples)[None, :]
+        lats = lat1 + (np.asarray(lats2)[:, None] - lat1) * frac
+        lons = lon1 + (np.asarray(lons2)[:, None] - lon1) * frac
+        if clutter_height is None:
+            return self.sample_elevations(lats, lons)
+        return self.sample_elevations(lats, lons), self.sample_clutter(lats, lons, clutter_height, clutter_mode)
+
+    def sample_clutter(self, lats, lons, clutter_height=0.0, mode="auto"):
+        return float(clutter_height)
+
+    def effective_resolution_m(self, lat):
+        return 30.0
+
+
+class TestRadialViewshed:
+    def test_radial_matches_paths(self):
+        from core.algorithms import calculate_viewshed
+        terrain = RidgeTerrain(-122.48)
+        paths, _, lons = calculate_viewshed(terrain, 48.75, -122.48, 10.0, 5000, resolution_m=100)
+        radial, _, _ = calculate_viewshed(terrain, 48.75, -122.48, 10.0, 5000, resolution_m=100, method='radial')
+        assert paths.sum() > 0
+        # Cells behind the ridge are shadowed by both methods
+        east_m = (lons - -122.48) * 111320.0 * np.cos(np.radians(48.75))
+        behind = (east_m > 2500) & (east_m < 4000)
+        assert not radial[:, behind][paths.shape[0] // 2 - 2:paths.shape[0] // 2 + 2].any()
+        # Rasterizing rays onto the grid only disagrees along shadow edges
+        assert np.mean(paths == radial) > 0.97
@@ -0,0 +1,49 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import DictRedis
+from link_cache import LinkCache
+
+
+PARAMS = (915.0, 10.0, 2.0, "bullington", "suburban", 1.333, 0.0)
+
+
+@pytest.fixture
+def cache():
+    return LinkCache(DictRedis(), max_local=2)
+
+
+class TestLinkCache:
+    def test_key_quantizes_to_about_a_meter(self, cache):
+        a = cache.key(48.7, -122.5, 48.8, -122.4, *PARAMS)
+        assert cache.key(48.700001, -122.500002, 48.8, -122.4, *PARAMS) == a
+        assert cache.key(48.70002, -122.5, 48.8, -122.4, *PARAMS) != a
+        assert cache.key(48.7, -122.5, 48.8, -122.4, 868.0, *PARAMS[1:]) != a
+        assert cache.key(48.7, -122.5, 48.8, -122.4, *PARAMS, dataset="ned10m") != a
+
+    def test_roundtrip_through_redis(self, cache):
+        key = cache.key(48.7, -122.5, 48.8, -122.4, *PARAMS)
+        assert cache.get(key) is None
+        cache.set(key, {"status": "viable", "profile": [1.0, 2.0]})
+
+        # A second process (empty local tier) reads the shared entry
+        other = LinkCache(cache.redis)
+        assert other.get(key) == {"status": "viable", "profile": [1.0, 2.0]}
+
+    def test_local_tier_is_lru_bounded(self, cache):
+        for i in range(3):
+            cache.set(f"k{i}", {"i": i})
+        assert list(cache._local) == ["k1", "k2"]
+
+    def test_invalidate_changes_generation(self, cache):
+        key = cache.key(48.7, -122.5, 48.8, -122.4, *PARAMS)
+        cache.set(key, {"status": "viable"})
+        cache.invalidate()
+
+        new_key = cache.key(48.7, -122.5, 48.8, -122.4, *PARAMS)
+        assert new_key != key
+        assert cache.get(new_key) is None
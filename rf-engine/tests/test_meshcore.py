@@ -0,0 +1,110 @@
+import asyncio
+import sys
+import os
+
+import httpx
+import numpy as np
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import DictRedis
+from meshcore import MeshCoreNodes, NodeIndex, cluster
+
+
+@pytest.fixture
+def nodes():
+    rng = np.random.default_rng(3)
+    lats = rng.uniform(-60, 70, 2000)
+    lons = rng.uniform(-180, 180, 2000)
+    nodes = [{"public_key": f"n{i}", "latitude": lat, "longitude": lon} for i, (lat, lon) in enumerate(zip(lats, lons))]
+    nodes.append({"public_key": "nowhere", "latitude": None, "longitude": 0.0})
+    return nodes
+
+
+def upstream(nodes, calls):
+    def handler(request):
+        calls.append(request.url)
+        if nodes is None:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"nodes": nodes})
+    return httpx.MockTransport(handler)
+
+
+class TestNodeIndex:
+    @pytest.mark.parametrize("bbox", [(47.0, -124.0, 49.5, -120.5), (-10.0, 170.0, 10.0, -170.0), (-90, -180, 90, 180)])
+    def test_matches_brute_force(self, nodes, bbox):
+        south, west, north, east = bbox
+        index = NodeIndex(nodes)
+        found = {index.nodes[i]["public_key"] for i in index.query(*bbox)}
+
+        def inside(n):
+            lon_ok = west <= n["longitude"] <= east if west <= east else (n["longitude"] >= west or n["longitude"] <= east)
+            return south <= n["latitude"] <= north and lon_ok
+        expected = {n["public_key"] for n in nodes if n["latitude"] is not None and inside(n)}
+        assert found == expected
+        assert len(index) == len(nodes) - 1
+
+    def test_clusters_merge_nearby_nodes(self, nodes):
+        index = NodeIndex(nodes)
+        ids = index.query(-90, -180, 90, 180)
+        singles, clusters = cluster(index, ids, 2)
+        assert clusters and len(singles) + sum(c["count"] for c in clusters) == len(ids)
+        singles, clusters = cluster(index, ids, 18)
+        assert not clusters and len(singles) == len(ids)
+
+
+class TestMeshCoreNodes:
+    def test_refresh_and_shared_snapshot(self, nodes):
+        redis, calls = DictRedis(), []
+        first = MeshCoreNodes(redis, refresh_seconds=300, transport=upstream(nodes, calls))
+        asyncio.run(first.refresh())
+        assert len(calls) == 1 and len(first.index) == len(nodes) - 1
+
+        # A second worker adopts the mirrored snapshot instead of refetching
+        second = MeshCoreNodes(redis, refresh_seconds=300, transport=upstream(nodes, calls))
+        asyncio.run(second.refresh())
+        assert len(calls) == 1
+        assert second.fetched_at == first.fetched_at
+        assert second.query(47.0, -124.0, 49.5, -120.5)["count"] == first.query(47.0, -124.0, 49.5, -120.5)["count"]
+
+    def test_serves_stale_snapshot_and_revalidates(self, nodes):
+        calls = []
+        service = MeshCoreNodes(DictRedis(), refresh_seconds=300, transport=upstream(nodes[:10], calls))
+
+        async def scenario():
+            cold = service.query(-90, -180, 90, 180)
+            assert cold["stale"] and cold["count"] == 0 and cold["fetched_at"] is None
+            await service.revalidate()  # The refresh the cold query scheduled
+            warm = service.query(-90, -180, 90, 180)
+            assert not warm["stale"] and warm["count"] == 10
+
+            # Upstream outage: the old snapshot keeps being served
+            service.transport = upstream(None, calls)
+            service._loaded_at -= 600
+            stale = service.query(-90, -180, 90, 180)
+            assert stale["stale"] and stale["count"] == 10
+            await service.revalidate()
+            assert service.query(-90, -180, 90, 180)["count"] == 10
+
+        asyncio.run(scenario())
+        assert len(calls) == 2
+
+    def test_failed_first_refresh_logs_no_age(self, caplog):
+        service = MeshCoreNodes(DictRedis(), refresh_seconds=300, transport=upstream(None, []))
+        asyncio.run(service.refresh())
+        assert "no snapshot yet" in caplog.text and "aged" not in caplog.text
+
+    def test_background_loop_stops(self, nodes):
+        calls = []
+        service = MeshCoreNodes(DictRedis(), refresh_seconds=0.01, transport=upstream(nodes[:5], calls))
+
+        async def scenario():
+            service.start()
+            await asyncio.sleep(0.1)
+            await service.stop()
+
+        asyncio.run(scenario())
+        assert calls and len(service.index) == 5
+        assert service._runner is None
@@ -4,16 +4,34 @@ from unittest.mock import MagicMock
 import sys
 import os
 
+import numpy as np
+
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from optimization_service import OptimizationService
 
+def set_terrain(tm, center, around):
+    """
+    Terrain windows of `around` meters with `center` at (0, 0).
+    """
+    tm.get_elevation.return_value = center
+
+    def window(min_lat, min_lon, max_lat, max_lon, resolution_m=30.0, shape=None):
+        elevation = np.full((21, 21), float(around))
+        transform = (min_lon, (max_lon - min_lon) / 20, 0.0, max_lat, 0.0, -(max_lat - min_lat) / 20)
+        row = int(round(max_lat / (max_lat - min_lat) * 20))
+        col = int(round(-min_lon / (max_lon - min_lon) * 20))
+        elevation[row, col] = center
+        return elevation, transform
+
+    tm.get_elevation_window.side_effect = window
+
 @pytest.fixture
 def mock_tile_manager():
     tm = MagicMock()
-    tm.get_elevation.return_value = 100.0
-    tm.get_elevations_batch.return_value = [100.0] * 121
+    tm.effective_resolution_m.return_value = 30.0
+    set_terrain(tm, 100.0, 100.0)
     tm.get_elevation_profile.return_value = [100.0] * 20
     return tm
 
@@ -22,8 +40,7 @@ class TestOptimizationService:
         service = OptimizationService(mock_tile_manager)
         
         # Scenario: Peak at 100m, neighbors at 50m
-        mock_tile_manager.get_elevation.return_value = 100.0
-        mock_tile_manager.get_elevations_batch.return_value = [50.0] * 121
+        set_terrain(mock_tile_manager, 100.0, 50.0)
         
         prom = service.calculate_prominence(0, 0)
         assert prom == 50.0
@@ -32,8 +49,7 @@ class TestOptimizationService:
         service = OptimizationService(mock_tile_manager)
         
         # Scenario: Flat terrain
-        mock_tile_manager.get_elevation.return_value = 100.0
-        mock_tile_manager.get_elevations_batch.return_value = [100.0] * 121
+        set_terrain(mock_tile_manager, 100.0, 100.0)
         
         prom = service.calculate_prominence(0, 0)
         assert prom == 0.0
@@ -42,8 +58,7 @@ class TestOptimizationService:
         service = OptimizationService(mock_tile_manager)
         
         # Scenario: Valley (Center 50m, Neighbors 100m)
-        mock_tile_manager.get_elevation.return_value = 50.0
-        mock_tile_manager.get_elevations_batch.return_value = [100.0] * 121
+        set_terrain(mock_tile_manager, 50.0, 100.0)
         
         prom = service.calculate_prominence(0, 0)
         # Should be 0 (max(0, -50))
@@ -55,7 +70,7 @@ class TestOptimizationService:
         cand = {"lat": 0, "lon": 0, "elevation": 100}
         weights = {"elevation": 1, "prominence": 1, "fresnel": 1}
         
-        mock_tile_manager.get_elevations_batch.return_value = [50.0] * 121 # Prominence = 50
+        set_terrain(mock_tile_manager, 100.0, 50.0) # Prominence = 50
         
         metrics = service.score_candidate(cand, weights, rx_list=None)
         
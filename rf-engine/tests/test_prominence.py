@@ -0,0 +1,95 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import kernels
+from core.prominence import ProminenceCache
+
+
+def two_peaks(n=101):
+    """
+    300 m and 200 m gaussian peaks on a 0 m plain, joined by a saddle.
+    """
+    y, x = np.mgrid[0:n, 0:n].astype(np.float64)
+    high = 300.0 * np.exp(-((x - 30) ** 2 + (y - 50) ** 2) / (2 * 12.0 ** 2))
+    low = 200.0 * np.exp(-((x - 70) ** 2 + (y - 50) ** 2) / (2 * 12.0 ** 2))
+    return np.maximum(high, low)
+
+
+class TestKeyColLevels:
+    def test_two_peaks(self):
+        elev = two_peaks()
+        prom = elev - kernels.key_col_levels(elev)
+        saddle = elev[50, 30:71].min()
+
+        # Highest summit: down to the raster minimum; the other: down to the saddle
+        assert prom[50, 30] == pytest.approx(300.0, abs=0.01)
+        assert prom[50, 70] == pytest.approx(200.0 - saddle)
+        # Slopes get their height above the hill's col, never more than the summit
+        assert 0 < prom[50, 75] < prom[50, 70]
+        assert prom.min() >= 0
+
+    def test_pit_and_plateau(self):
+        elev = np.array([
+            [5.0, 5.0, 5.0, 5.0],
+            [5.0, 1.0, 9.0, 9.0],
+            [5.0, 5.0, 5.0, 5.0],
+        ])
+        prom = elev - kernels.key_col_levels(elev)
+        assert prom[1, 1] == 0.0           # Pit
+        assert prom[1, 2:].max() == 8.0    # Plateau summit
+        assert prom[0, 0] == 4.0           # Above the raster minimum
+
+    @pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason="numba not installed")
+    def test_numba_matches_python(self):
+        rng = np.random.default_rng(3)
+        elev = np.round(rng.normal(size=(64, 80)) * 20)  # Many ties
+        flat = elev.ravel().copy()
+        order = np.argsort(-flat, kind="stable")
+        expected = kernels._key_col_sweep_py(flat, order, elev.shape[1]).reshape(elev.shape)
+        np.testing.assert_array_equal(kernels.key_col_levels(elev), expected)
+
+
+@pytest.fixture
+def tile_manager():
+    tm = MagicMock()
+    tm.effective_resolution_m.return_value = 30.0
+
+    def window(min_lat, min_lon, max_lat, max_lon, resolution_m=30.0, shape=None):
+        rows = int(round((max_lat - min_lat) / 0.002)) + 1
+        cols = int(round((max_lon - min_lon) / 0.002)) + 1
+        lat, lon = np.meshgrid(np.linspace(max_lat, min_lat, rows), np.linspace(min_lon, max_lon, cols), indexing='ij')
+        elev = 100.0 + 400.0 * np.exp(-((lat - 10.0) ** 2 + (lon - 20.0) ** 2) / (2 * 0.01 ** 2))
+        return elev, (min_lon, (max_lon - min_lon) / (cols - 1), 0.0, max_lat, 0.0, -(max_lat - min_lat) / (rows - 1))
+
+    tm.get_elevation_window.side_effect = window
+    return tm
+
+
+class TestProminenceCache:
+    def test_lookup_and_region_reuse(self, tile_manager):
+        cache = ProminenceCache(tile_manager)
+        prom = cache.prominence([10.0, 10.05], [20.0, 20.05], elevations=[500.0, 100.0])
+        assert prom[0] == pytest.approx(400.0, abs=1.0)
+        assert prom[1] == pytest.approx(0.0, abs=1.0)
+        assert tile_manager.get_elevation_window.call_count == 1
+
+        # A point inside the cached region is a lookup only
+        cache.prominence([10.01], [20.01], elevations=[300.0])
+        assert tile_manager.get_elevation_window.call_count == 1
+
+        cache.clear()
+        cache.prominence([10.01], [20.01], elevations=[300.0])
+        assert tile_manager.get_elevation_window.call_count == 2
+
+    def test_lru_bound(self, tile_manager):
+        cache = ProminenceCache(tile_manager, max_entries=2)
+        for lon in (20.0, 21.0, 22.0):
+            cache.prominence([10.0], [lon], elevations=[100.0])
+        assert len(cache) == 2
@@ -0,0 +1,73 @@
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import geodesy
+from core.algorithms import RelayLinks, find_relay_chain
+from fakes import HillTerrain, terrain_manager
+
+
+SOURCE = (48.60, -122.40, 10.0)
+TARGET = (48.60, -122.00, 10.0)  # ~29.5 km east
+MID_HILL = (48.62, -122.20, 500.0, 1500.0)
+
+
+@pytest.fixture
+def terrain():
+    return HillTerrain([MID_HILL])
+
+
+@pytest.fixture
+def tile_manager(terrain):
+    tm = terrain_manager(terrain, resolution_m=None)
+    yield tm
+    tm.shutdown()
+
+
+class TestRelayChain:
+    def test_routes_over_hilltop(self, tile_manager):
+        result = find_relay_chain(tile_manager, SOURCE, TARGET, 915.0, max_link_m=20000)
+        assert result["hops"] == 2
+        relay = result["chain"][1]
+        assert relay["role"] == "relay"
+        assert geodesy.haversine(relay["lat"], relay["lon"], MID_HILL[0], MID_HILL[1]) < 1500
+        assert all(l["min_clearance_ratio"] >= 0.6 for l in result["links"])
+        assert result["worst_path_loss_db"] == max(l["path_loss_db"] for l in result["links"])
+
+    @pytest.mark.parametrize("terrain", [
+        HillTerrain([(SOURCE[0], SOURCE[1], 400.0, 1500.0), (TARGET[0], TARGET[1], 400.0, 1500.0)])
+    ])
+    def test_direct_link_needs_no_relay(self, tile_manager):
+        result = find_relay_chain(tile_manager, SOURCE, TARGET, 915.0, max_link_m=40000)
+        assert result["hops"] == 1
+        assert [n["role"] for n in result["chain"]] == ["source", "target"]
+
+    def test_no_path_within_hop_limit(self, tile_manager):
+        assert find_relay_chain(tile_manager, SOURCE, TARGET, 915.0, max_link_m=20000, max_hops=1) is None
+
+    @pytest.mark.parametrize("terrain", [
+        HillTerrain([MID_HILL, (48.58, -122.27, 300.0, 1200.0), (48.58, -122.13, 300.0, 1200.0)])
+    ])
+    def test_loss_objective_never_worse(self, tile_manager):
+        by_hops = find_relay_chain(tile_manager, SOURCE, TARGET, 915.0, max_link_m=20000)
+        by_loss = find_relay_chain(tile_manager, SOURCE, TARGET, 915.0, max_link_m=20000, objective="loss")
+        assert by_loss["worst_path_loss_db"] <= by_hops["worst_path_loss_db"] + 1e-9
+        assert by_hops["hops"] <= by_loss["hops"]
+
+    def test_links_memoized_per_pair(self, tile_manager):
+        calls = []
+        original = tile_manager.get_elevation_profile_groups
+
+        def counting(*args, **kwargs):
+            calls.append(len(args[0]))
+            return original(*args, **kwargs)
+        tile_manager.get_elevation_profile_groups = counting
+        links = RelayLinks(tile_manager, [48.6, 48.6, 48.62], [-122.4, -122.0, -122.2], [10.0, 10.0, 10.0], 915.0)
+        first = links.evaluate(0, [1, 2])
+        again = links.evaluate(2, [0])
+        assert calls == [2]
+        assert again[0] == first[2]
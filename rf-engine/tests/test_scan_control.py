@@ -0,0 +1,111 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from fakes import DictRedis
+from tasks import control, routing
+
+
+NODE = {"id": "a", "lat": 48.75, "lon": -122.45, "height": 10.0}
+
+
+class TestScanControl:
+    def test_fingerprint_ignores_ids_and_key_order(self):
+        a = control.scan_fingerprint({"nodes": [NODE], "options": {"radius": 5000, "optimize_n": None}})
+        b = control.scan_fingerprint({"options": {"optimize_n": None, "radius": 5000}, "nodes": [{**NODE, "id": "b"}]})
+        c = control.scan_fingerprint({"nodes": [NODE], "options": {"radius": 6000, "optimize_n": None}})
+        assert a == b
+        assert a != c
+
+    def test_dedup_registry(self):
+        redis = DictRedis()
+        _, bulk_limit = routing.TIME_LIMITS["bulk"]
+        control.register_task(redis, "fp", "task-1", bulk_limit)
+        assert control.find_task(redis, "fp") == "task-1"
+        # Outlives the longest run the task's queue allows
+        assert list(redis.ttls.values()) == [bulk_limit + control.DEDUP_QUEUE_WAIT]
+
+        # A finished task only drops its own mapping
+        control.register_task(redis, "fp", "task-2", bulk_limit)
+        control.forget_task(redis, "fp", "task-1")
+        assert control.find_task(redis, "fp") == "task-2"
+        control.forget_task(redis, "fp", "task-2")
+        assert control.find_task(redis, "fp") is None
+
+    @pytest.mark.parametrize("outcome, joined", [
+        ("completed", True), ("cancelled", False), ("time_limit", False), ("failed", False),
+    ])
+    def test_resubmit_after_the_scan_ends(self, monkeypatch, outcome, joined):
+        from tasks import viewshed
+
+        def scan(task, params):
+            if outcome == "failed":
+                raise RuntimeError("worker crashed")
+            return {"status": outcome, "results": []}
+        redis = DictRedis()
+        monkeypatch.setattr(viewshed, "redis_client", redis)
+        monkeypatch.setattr(viewshed, "_batch_viewshed", scan)
+        payload = {"nodes": [NODE], "options": {"radius": 5000, "optimize_n": None}}
+        fingerprint = control.scan_fingerprint(payload)
+
+        # First submit, run to the end by the worker
+        control.register_task(redis, fingerprint, "task-1", routing.TIME_LIMITS["interactive"][1])
+        viewshed.calculate_batch_viewshed.push_request(id="task-1")
+        try:
+            viewshed.calculate_batch_viewshed.run(payload)
+        except RuntimeError:
+            pass
+        finally:
+            viewshed.calculate_batch_viewshed.pop_request()
+
+        # Identical second submit: joins a completed scan, reruns anything else
+        second = control.scan_fingerprint({**payload, "nodes": [{**NODE, "id": "b"}]})
+        if joined:
+            assert control.find_task(redis, second) == "task-1"
+            assert redis.ttls[control._dedup_key(second)] == control.RESULT_DEDUP_TTL
+        else:
+            assert control.find_task(redis, second) is None
+
+    def test_token_sees_cancel_flag(self):
+        redis = DictRedis()
+        token = control.CancellationToken(redis, "task-1", interval=0.0)
+        assert not token.cancelled
+        token.check()
+
+        control.request_cancel(redis, "task-1")
+        assert token.cancelled
+        with pytest.raises(control.TaskCancelled):
+            token.check()
+
+    def test_token_is_throttled(self):
+        redis = DictRedis()
+        token = control.CancellationToken(redis, "task-1", interval=60.0)
+        assert not token.cancelled
+        control.request_cancel(redis, "task-1")
+        assert not token.cancelled  # Next Redis check is a minute away
+
+    def test_token_trips_at_deadline(self):
+        token = control.CancellationToken(DictRedis(), "task-1", deadline=time.monotonic() - 1)
+        assert token.cancelled
+        assert token.reason == "time_limit"
+
+
+class TestRouting:
+    def test_small_jobs_are_interactive_and_first(self):
+        small = routing.route_for_cost(routing.estimate_cost(3, 5000))
+        large = routing.route_for_cost(routing.estimate_cost(40, 50000))
+        assert small["queue"] == routing.INTERACTIVE
+        assert large["queue"] == routing.BULK
+        assert small["priority"] < large["priority"]
+        assert large["soft_time_limit"] < large["time_limit"]
+
+    def test_soft_deadline_from_request(self):
+        assert routing.soft_deadline(SimpleNamespace(timelimit=(None, None)), 100.0) is None
+        deadline = routing.soft_deadline(SimpleNamespace(timelimit=(150, 120)), 100.0)
+        assert 100.0 < deadline < 220.0
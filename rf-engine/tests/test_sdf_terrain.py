@@ -0,0 +1,101 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sdf_terrain
+from fakes import DictRedis
+from sdf_terrain import SDFTerrain
+from tile_manager import TileManager, window_coordinates
+
+PPD = 12
+
+
+def _write_sdf(directory, name="45:46:122:123.sdf"):
+    # SPLAT order: x (south -> north) outer, y (east -> west) inner; value = 100x + y
+    lines = ["123", "45", "122", "46"]
+    lines += [str(100 * x + y) for x in range(PPD) for y in range(PPD)]
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+@pytest.fixture
+def sdf_dir(tmp_path):
+    _write_sdf(str(tmp_path))
+    return str(tmp_path)
+
+
+class TestSDFTerrain:
+    def test_splat_orientation(self, sdf_dir):
+        terrain = SDFTerrain(sdf_dir)
+        # SPLAT: x = (lat - min_north) * ppd, y = ppd - 1 - (max_west - west) * ppd
+        lat, lon = 45 + 3 / PPD, -(123 - 4 / PPD)
+        assert terrain.get_elevation(lat, lon) == pytest.approx(100 * 3 + 7)
+        # Halfway between two posts interpolates
+        assert terrain.get_elevation(lat + 0.5 / PPD, lon) == pytest.approx(100 * 3.5 + 7)
+        assert terrain.get_elevation(44.5, -122.5) is None
+
+    def test_batch_coverage_mask(self, sdf_dir):
+        terrain = SDFTerrain(sdf_dir)
+        lats = np.array([[45.5, 44.5], [45.2, 45.9]])
+        lons = np.array([[-122.5, -122.5], [-121.5, -122.1]])
+        values, covered = terrain.sample_elevations(lats, lons)
+        assert covered.tolist() == [[True, False], [False, True]]
+        assert values[0, 1] == 0.0 and values[1, 0] == 0.0
+        assert np.array_equal(terrain.covers(lats, lons), covered)
+
+    def test_converted_once_then_memory_mapped(self, sdf_dir, monkeypatch):
+        first = SDFTerrain(sdf_dir)
+        expected = first.get_elevation(45.3, -122.7)
+        assert os.path.exists(os.path.join(sdf_dir, "45_46_122_123.npy"))
+
+        def no_parse(path):
+            raise AssertionError("SDF text re-parsed")
+        monkeypatch.setattr(sdf_terrain, "parse_sdf", no_parse)
+        second = SDFTerrain(sdf_dir)
+        assert second.get_elevation(45.3, -122.7) == expected
+        assert isinstance(second._block((45, 122)), np.memmap)
+
+    def test_private_use_colon_names(self, tmp_path):
+        _write_sdf(str(tmp_path), name="4546122123.sdf")
+        terrain = SDFTerrain(str(tmp_path))
+        assert terrain.get_elevation(45 + 3 / PPD, -(123 - 4 / PPD)) == pytest.approx(307)
+        assert os.path.exists(str(tmp_path / "45_46_122_123.npy"))
+
+    def test_from_env(self, sdf_dir, tmp_path_factory, monkeypatch):
+        monkeypatch.delenv("TERRAIN_SDF_DIR", raising=False)
+        assert sdf_terrain.from_env() is None
+        monkeypatch.setenv("TERRAIN_SDF_DIR", str(tmp_path_factory.mktemp("empty")))
+        assert sdf_terrain.from_env() is None
+        monkeypatch.setenv("TERRAIN_SDF_DIR", sdf_dir)
+        assert len(sdf_terrain.from_env()) == 1
+
+
+class TestTileManagerSDF:
+    def test_sdf_points_skip_tile_fetches(self, sdf_dir):
+        tm = TileManager(DictRedis(), sdf=SDFTerrain(sdf_dir))
+        fetched = []
+
+        def fetch(x, y, z):
+            fetched.append((x, y, z))
+            return {"elevation": [5.0] * 256}
+        tm._fetch_tile_from_api = fetch
+        try:
+            elev, transform = tm.get_elevation_window(45.2, -122.8, 45.4, -122.6, resolution_m=500)
+            lats, lons = window_coordinates(transform, elev.shape)
+            assert not fetched
+            assert elev[3, 4] == pytest.approx(tm.sdf.get_elevation(lats[3], lons[4]))
+            assert tm.get_elevation(45.3, -122.7) == pytest.approx(tm.sdf.get_elevation(45.3, -122.7))
+
+            # Mixed batch: only the uncovered point goes to the tiles
+            values = tm.get_elevations_batch([(45.3, -122.7), (47.0, -122.7)])
+            assert values[1] == pytest.approx(5.0)
+            assert len(fetched) == 1
+        finally:
+            tm.shutdown()
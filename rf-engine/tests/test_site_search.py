@@ -0,0 +1,60 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import geodesy
+from core.site_search import coarse_to_fine_search
+from fakes import HillTerrain, terrain_manager
+from optimization_service import OptimizationService
+
+
+# Narrow peak (200 m sigma) well inside a 40 km bbox, so the ~700 m coarse grid misses its top
+PEAK = (48.6137, -122.3071, 400.0, 200.0)
+BROAD = (48.75, -122.10, 250.0, 3000.0)
+BBOX = (48.45, -122.55, 48.80, -122.00)
+
+
+@pytest.fixture
+def tile_manager():
+    tm = terrain_manager(HillTerrain([PEAK, BROAD]))
+    yield tm
+    tm.shutdown()
+
+
+class TestSiteSearch:
+    def test_refines_onto_narrow_peak(self, tile_manager):
+        result = coarse_to_fine_search(tile_manager, *BBOX, {"elevation": 0.5, "prominence": 0.5})
+        best = result["candidates"][0]
+        assert result["levels"] >= 2
+        assert result["resolution_m"] <= 30.0
+        assert geodesy.haversine(best["lat"], best["lon"], PEAK[0], PEAK[1]) < 60
+        assert best["elevation"] > 100 + 0.95 * PEAK[2]
+        # Coarse grid alone sits well below the summit
+        assert max(c["elevation"] for c in result["coarse"]) < best["elevation"] - 50
+        # Far fewer points than a 30 m grid over the bbox
+        assert result["evaluated_points"] < 20000
+
+    def test_candidates_are_distinct_sites(self, tile_manager):
+        result = coarse_to_fine_search(tile_manager, *BBOX, {"elevation": 0.5, "prominence": 0.5}, n_results=5)
+        lats = np.array([c["lat"] for c in result["candidates"]])
+        lons = np.array([c["lon"] for c in result["candidates"]])
+        for i in range(len(lats)):
+            others = np.delete(np.arange(len(lats)), i)
+            assert np.all(geodesy.haversine(lats[i], lons[i], lats[others], lons[others]) > 300)
+
+
+class TestFresnelBatch:
+    def test_matches_per_candidate_check(self, tile_manager):
+        service = OptimizationService(tile_manager)
+        rx_list = [{"lat": 48.70, "lon": -122.20, "height": 10.0}, {"lat": 48.50, "lon": -122.45, "height": 5.0}]
+        lats = np.array([48.6137, 48.55, 48.70001])
+        lons = np.array([-122.3071, -122.40, -122.20])
+        batch = service.check_fresnel_clearance_batch(lats, lons, 15.0, rx_list, 915.0)
+        for lat, lon, value in zip(lats, lons, batch):
+            assert value == pytest.approx(service.check_fresnel_clearance(lat, lon, 15.0, rx_list, 915.0), abs=0.05)
+        assert np.array_equal(service.check_fresnel_clearance_batch(lats, lons, 15.0, [], 915.0), np.ones(3))
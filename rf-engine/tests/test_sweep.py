@@ -0,0 +1,127 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rf_physics
+from core import sweep
+from core.algorithms import calculate_viewshed
+from fakes import RidgeTerrain, terrain_manager
+from models import ScenarioGrid
+
+K_FACTORS = [1.0, 1.333, float("inf")]
+FREQUENCIES = [433.0, 868.0, 915.0]
+TX_HEIGHTS = [5.0, 20.0, 60.0]
+RX_HEIGHTS = [2.0, 10.0]
+
+
+@pytest.fixture
+def tile_manager():
+    tm = terrain_manager(RidgeTerrain())
+    yield tm
+    tm.shutdown()
+
+
+@pytest.fixture
+def profile():
+    rng = np.random.default_rng(1)
+    elevs = 100.0 + np.cumsum(rng.normal(size=120)) * 5.0
+    elevs[60] += 80.0  # One dominant obstruction
+    return elevs, rng.uniform(0.0, 10.0, size=120)
+
+
+class TestLinkSweep:
+    @pytest.mark.parametrize("model", ["bullington", "deygout", "fspl", "hata"])
+    def test_matches_single_evaluations(self, profile, model):
+        elevs, clutter = profile
+        result = sweep.link_sweep(elevs, 12000.0, K_FACTORS, FREQUENCIES, TX_HEIGHTS, RX_HEIGHTS, clutter, model)
+        assert result["min_clearance_ratio"].shape == (3, 3, 3, 2)
+
+        for a, k in enumerate(K_FACTORS):
+            for b, f in enumerate(FREQUENCIES):
+                for c, tx in enumerate(TX_HEIGHTS):
+                    for d, rx in enumerate(RX_HEIGHTS):
+                        link = rf_physics.analyze_link(elevs, 12000.0, f, tx, rx, k, clutter)
+                        loss = rf_physics.calculate_path_loss(12000.0, elevs, f, tx, rx, model, 'suburban', k, clutter)
+                        assert result["min_clearance_ratio"][a, b, c, d] == pytest.approx(link["min_clearance_ratio"])
+                        assert result["path_loss_db"][a, b, c, d] == pytest.approx(loss)
+
+    def test_report_is_json_ready(self, profile):
+        elevs, _ = profile
+        report = sweep.link_sweep_report(elevs, 12000.0, K_FACTORS, [915.0], [20.0], RX_HEIGHTS)
+        assert report["axes"] == {
+            "k_factor": [1.0, 1.333, "inf"], "frequency_mhz": [915.0], "tx_height": [20.0], "rx_height": RX_HEIGHTS
+        }
+        assert np.asarray(report["path_loss_db"]).shape == (3, 1, 1, 2)
+        assert sweep.cube([1.23456, np.inf, np.nan], 2) == [1.23, None, None]
+
+    def test_combination_cap(self, profile):
+        elevs, _ = profile
+        with pytest.raises(ValueError):
+            sweep.link_sweep(elevs, 12000.0, np.linspace(1, 2, 64), np.linspace(400, 900, 64), [10, 20], [2])
+
+
+class TestViewshedSweep:
+    def test_matches_radial_viewshed(self, tile_manager):
+        lat, lon, radius = 48.6, -122.33, 4000
+        result = sweep.viewshed_sweep(tile_manager, lat, lon, radius, [1.333], [10.0, 40.0], [2.0], resolution_m=100)
+        assert result["area_km2"].shape == (1, 2, 1)
+        for t, tx in enumerate([10.0, 40.0]):
+            grid, _, _ = calculate_viewshed(tile_manager, lat, lon, tx, radius, resolution_m=100, method='radial')
+            assert result["area_km2"][0, t, 0] == pytest.approx(grid.sum() * 0.01, rel=0.1)
+
+    def test_monotonic_in_heights_and_k(self, tile_manager):
+        result = sweep.viewshed_sweep(
+            tile_manager, 48.6, -122.33, 5000, [1.0, float("inf")], [5.0, 50.0], [1.0, 20.0], resolution_m=100
+        )
+        area = result["area_km2"]
+        assert (area[:, 1] >= area[:, 0]).all()
+        assert (area[..., 1] >= area[..., 0]).all()
+        assert (area[1] >= area[0]).all()
+        assert 0 < result["visible_fraction"].max() <= 1.0
+
+
+class TestSweepLinks:
+    def test_cancel_keeps_finished_links(self, tile_manager):
+        from tasks.sweep import sweep_links
+
+        links = [
+            {"id": i, "tx_lat": 48.6, "tx_lon": -122.36, "rx_lat": 48.6 + 0.005 * i, "rx_lon": -122.25}
+            for i in range(4)
+        ]
+        grid = ScenarioGrid(tx_heights=[10.0, 30.0])
+        checks = []
+
+        def cancel_check():
+            checks.append(1)
+            if len(checks) > 2:
+                raise RuntimeError("cancelled")
+
+        out = [None] * len(links)
+        with pytest.raises(RuntimeError):
+            sweep_links(tile_manager, links, grid, 10.0, 2.0, cancel_check=cancel_check, out=out)
+
+        finished = [r for r in out if r is not None]
+        assert len(finished) == 2
+        full = {r["id"]: r for r in sweep_links(tile_manager, links, grid, 10.0, 2.0)}
+        for r in finished:
+            assert r["path_loss_db"] == full[r["id"]]["path_loss_db"]
+
+
+class TestScenarioGrid:
+    def test_defaults_and_axes(self):
+        grid = ScenarioGrid(k_factors=[1.0, "inf"])
+        assert grid.axes(10.0, 2.0) == ([1.0, float("inf")], [915.0], [10.0], [2.0])
+
+    def test_validation(self):
+        with pytest.raises(ValidationError):
+            ScenarioGrid(k_factors=[0.0])
+        with pytest.raises(ValidationError):
+            ScenarioGrid(frequencies_mhz=[])
+        with pytest.raises(ValidationError):
+            ScenarioGrid(k_factors=[1.0] * 16, frequencies_mhz=[915.0] * 16, tx_heights=[10.0] * 16, rx_heights=[2.0] * 2)
@@ -0,0 +1,55 @@
+import io
+import sys
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import terrain_rgb
+
+
+@pytest.fixture
+def grid():
+    rng = np.random.default_rng(0)
+    elevation = rng.random((256, 256)) * 4000 - 50
+    elevation[0, 0] = -20000.0  # Below the encodable range
+    elevation[0, 1] = 2e6       # Above it
+    return elevation
+
+
+class TestTerrainRGB:
+    def test_matches_reference_encoding(self, grid):
+        codes = np.clip((grid + 10000) * 10, 0, 16777215).astype(np.uint32)
+        expected = np.stack(((codes >> 16) & 0xFF, (codes >> 8) & 0xFF, codes & 0xFF), axis=-1).astype(np.uint8)
+        assert np.array_equal(terrain_rgb.encode_rgb(grid), expected)
+
+    def test_round_trip(self, grid):
+        decoded = terrain_rgb.decode_rgb(terrain_rgb.encode_rgb(grid))
+        assert decoded[0, 0] == pytest.approx(-10000.0)
+        inside = np.abs(grid) < 10000
+        assert np.all(np.abs(decoded - grid)[inside] <= 0.1 + 1e-6)
+
+    def test_buffers_are_reused_per_shape(self, grid):
+        first = terrain_rgb.encode_rgb(grid)
+        assert terrain_rgb.encode_rgb(grid + 1) is first
+        assert terrain_rgb.encode_rgb(grid[:128, :128]).shape == (128, 128, 3)
+
+    @pytest.mark.parametrize("fmt", ["png", "webp"])
+    def test_encoded_images_are_lossless(self, grid, fmt):
+        if fmt == "webp" and not terrain_rgb.WEBP_AVAILABLE:
+            pytest.skip("Pillow built without WebP")
+        data = terrain_rgb.encode(grid, fmt)
+        pixels = np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+        assert np.array_equal(pixels, terrain_rgb.encode_rgb(grid))
+
+    def test_negotiate(self):
+        assert terrain_rgb.negotiate(None) == "png"
+        assert terrain_rgb.negotiate("image/png,*/*") == "png"
+        expected = "webp" if terrain_rgb.WEBP_AVAILABLE else "png"
+        assert terrain_rgb.negotiate("image/avif,image/webp,*/*") == expected
+        with pytest.raises(ValueError):
+            terrain_rgb.encode(np.zeros((4, 4)), "jpeg")
@@ -0,0 +1,74 @@
+import multiprocessing
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import DictRedis
+from terrain_shm import PROBE_WINDOW, SharedTerrainCache
+from tile_manager import TileManager
+
+
+def _fill(path, x, y, z, value):
+    cache = SharedTerrainCache(path)
+    cache.put(x, y, z, np.full(256, value))
+    cache.close()
+
+
+@pytest.fixture
+def shm_path(tmp_path):
+    return str(tmp_path / "terrain.bin")
+
+
+class TestSharedTerrainCache:
+    def test_visible_across_processes(self, shm_path):
+        cache = SharedTerrainCache(shm_path, n_slots=64)
+        proc = multiprocessing.get_context("fork").Process(target=_fill, args=(shm_path, 656, 1410, 12, 42.0))
+        proc.start()
+        proc.join()
+
+        values = cache.get(656, 1410, 12)
+        assert values is not None and np.all(values == 42.0)
+        assert cache.get(657, 1410, 12) is None
+        cache.close()
+
+    def test_attach_adopts_existing_geometry(self, shm_path):
+        first = SharedTerrainCache(shm_path, n_slots=64)
+        second = SharedTerrainCache(shm_path, n_slots=1024)
+        assert second.n_slots == 64
+        first.close()
+        second.close()
+
+    def test_full_window_evicts_oldest(self, shm_path):
+        cache = SharedTerrainCache(shm_path, n_slots=PROBE_WINDOW)
+        for i in range(PROBE_WINDOW + 1):
+            cache.put(i, 0, 12, np.full(256, float(i)))
+        assert cache.get(0, 0, 12) is None
+        assert cache.get(PROBE_WINDOW, 0, 12)[0] == PROBE_WINDOW
+
+        cache.clear()
+        assert cache.get(PROBE_WINDOW, 0, 12) is None
+        cache.close()
+
+    def test_tile_manager_reads_shared_tiles(self, shm_path):
+        calls = []
+
+        def fetch(x, y, z):
+            calls.append((x, y, z))
+            return {"elevation": list(np.arange(256, dtype=float))}
+
+        writer = TileManager(DictRedis(), shm=SharedTerrainCache(shm_path))
+        writer._fetch_tile_from_api = fetch
+        expected = writer.get_elevations_batch([(48.75, -122.45)])
+
+        # Separate process-local state (empty Redis), same host cache: no refetch
+        reader = TileManager(DictRedis(), shm=SharedTerrainCache(shm_path))
+        reader._fetch_tile_from_api = fetch
+        assert reader.get_elevations_batch([(48.75, -122.45)]) == expected
+        assert len(calls) == 1
+        writer.shutdown()
+        reader.shutdown()
@@ -0,0 +1,161 @@
+import pytest
+import numpy as np
+import mercantile
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tile_manager as tile_manager_module
+from fakes import DictRedis
+from tile_manager import TileManager, sample_window, tile_pixel_coordinates, window_coordinates
+
+
+@pytest.fixture
+def tile_manager():
+    tm = TileManager(DictRedis())
+    rng = np.random.default_rng(0)
+    tm._fetch_tile_from_api = lambda x, y, z: {"elevation": (rng.random(256) * 1000).tolist()}
+    yield tm
+    tm.shutdown()
+
+
+class TestTileManager:
+    def test_batch_matches_scalar_extraction(self, tile_manager):
+        rng = np.random.default_rng(1)
+        lats = 48.0 + rng.random(200) * 0.2
+        lons = -122.5 + rng.random(200) * 0.2
+
+        batch = tile_manager.get_elevations_batch(list(zip(lats, lons)))
+        for lat, lon, elev in zip(lats, lons, batch):
+            tile = mercantile.tile(lon, lat, tile_manager.zoom)
+            data = tile_manager.get_tile_data(lat=lat, lon=lon)
+            expected = tile_manager._extract_elevation_from_tile(data, lat, lon, tile)
+            assert elev == pytest.approx(expected, abs=1e-6)
+
+    def test_missing_tiles_are_zero(self, tile_manager):
+        tile_manager._fetch_tile_from_api = lambda x, y, z: None
+        assert tile_manager.get_elevations_batch([(48.0, -122.0), (48.1, -122.1)]) == [0.0, 0.0]
+
+    def test_elevation_window(self, tile_manager):
+        elev, transform = tile_manager.get_elevation_window(48.0, -122.5, 48.1, -122.4, resolution_m=100)
+        lats, lons = window_coordinates(transform, elev.shape)
+
+        assert lats[0] == pytest.approx(48.1)
+        assert lats[-1] == pytest.approx(48.0)
+        assert lons[0] == pytest.approx(-122.5)
+        assert lons[-1] == pytest.approx(-122.4)
+
+        # Window cells agree with point lookups
+        r, c = 7, 11
+        assert elev[r, c] == pytest.approx(tile_manager.get_elevations_batch([(lats[r], lons[c])])[0])
+        assert sample_window(elev, transform, [lats[r]], [lons[c]])[0] == pytest.approx(elev[r, c])
+
+    def test_elevation_window_shape(self, tile_manager):
+        elev, _ = tile_manager.get_elevation_window(48.0, -122.5, 48.1, -122.4, shape=(11, 21))
+        assert elev.shape == (11, 21)
+
+        with pytest.raises(ValueError):
+            tile_manager.get_elevation_window(48.1, -122.5, 48.0, -122.4)
+
+
+class TestProfilePlanner:
+    def test_effective_resolution_uses_tile_grid(self, tile_manager):
+        # z12 tiles at 48N are ~6.5 km wide -> ~436 m between the 16 cached samples
+        assert tile_manager.effective_resolution_m(48.0) == pytest.approx(436.5, abs=1.0)
+
+    def test_samples_scale_with_distance(self):
+        from core.profile_planner import plan_profile, plan_samples
+
+        assert plan_samples(500.0, 30.0, purpose="viewshed") == 18
+        assert plan_samples(50.0, 30.0, purpose="viewshed") == 6  # floor
+        assert plan_samples(50000.0, 30.0, purpose="link") == 512  # cap
+        assert plan_samples([300.0, 3000.0], 100.0, purpose="fresnel").tolist() == [8, 31]
+
+        plan = plan_profile(10000.0, 400.0, purpose="link")
+        assert plan == {"samples": 32, "spacing_m": 322.6, "resolution_m": 400.0}
+
+    def test_profile_groups_match_single_profiles(self, tile_manager):
+        lat2 = np.array([48.05, 48.1, 48.02])
+        lon2 = np.array([-122.45, -122.3, -122.49])
+        samples = np.array([12, 20, 12])
+        groups = tile_manager.get_elevation_profile_groups(48.0, -122.5, lat2, lon2, samples)
+
+        assert sorted(i for idx, _ in groups for i in idx) == [0, 1, 2]
+        for idx, profiles in groups:
+            for i, profile in zip(idx, profiles):
+                single = tile_manager.get_elevation_profile(48.0, -122.5, lat2[i], lon2[i], samples=samples[i])
+                assert np.allclose(profile, single)
+
+
+class TestMapTiles:
+    @pytest.fixture
+    def counted(self, tile_manager):
+        fetched = []
+        fetch = tile_manager._fetch_tile_from_api
+
+        def counting(x, y, z):
+            fetched.append((x, y, z))
+            return fetch(x, y, z)
+
+        tile_manager._fetch_tile_from_api = counting
+        return tile_manager, fetched
+
+    def test_deep_zooms_resample_base_tiles(self, counted):
+        tm, fetched = counted
+        base = mercantile.tile(-122.45, 48.05, tm.zoom)
+        tm.render_tile(base.x, base.y, base.z)
+        assert fetched == [(base.x, base.y, base.z)]
+
+        # z14-16 tiles inside the base tile fetch nothing new
+        for z in (14, 16):
+            child = mercantile.tile(-122.45, 48.05, z)
+            grid = tm.render_tile(child.x, child.y, z)
+            lats, lons = tile_pixel_coordinates(child.x, child.y, z, 256)
+            assert grid.shape == (256, 256)
+            assert grid[10, 200] == pytest.approx(tm.get_elevations_batch([(lats[10], lons[200])])[0])
+        assert len(fetched) == 1
+
+    def test_cold_overview_fetches_only_its_own_tile(self, counted):
+        tm, fetched = counted
+        z = tm.zoom - tile_manager_module.OVERVIEW_LEVELS
+        tile = mercantile.tile(-122.45, 48.05, z)
+        assert tm.render_tile(tile.x, tile.y, z).shape == (256, 256)
+        # Not the 4**OVERVIEW_LEVELS base tiles underneath
+        assert fetched == [(tile.x, tile.y, z)]
+
+    def test_overview_pyramid(self, counted):
+        tm, fetched = counted
+        z = tm.zoom - 2
+        parent = mercantile.tile(-122.45, 48.05, z)
+        base = list(mercantile.children(parent, zoom=tm.zoom))
+        for t in base:
+            tm.render_tile(t.x, t.y, t.z)
+        fetched.clear()
+
+        # Built from the 16 cached base tiles underneath
+        grid = tm.render_tile(parent.x, parent.y, z)
+        assert grid.shape == (256, 256)
+        assert fetched == []
+
+        # Zooming in one level and re-rendering only read the pyramid
+        children = mercantile.children(parent)
+        for child in children:
+            tm.render_tile(child.x, child.y, child.z)
+        assert np.allclose(tm.render_tile(parent.x, parent.y, z), grid, atol=1e-3)  # Cached as float32
+        assert fetched == []
+
+        # Each parent pixel is the mean of the four child pixels under it
+        n = tile_manager_module.OVERVIEW_GRID
+        overview, complete = tm._overview(parent.x, parent.y, z)
+        nw, _ = tm._overview(2 * parent.x, 2 * parent.y, z + 1)
+        assert complete
+        assert overview[0, 0] == pytest.approx(nw[:2, :2].mean(), rel=1e-6)
+        assert overview.shape == (n, n)
+
+    def test_incomplete_overview_is_not_cached(self, tile_manager):
+        tile_manager._fetch_tile_from_api = lambda x, y, z: None
+        tile = mercantile.tile(-122.45, 48.05, tile_manager.zoom - 1)
+        tile_manager.render_tile(tile.x, tile.y, tile.z)
+        assert not any(key.startswith("overview:") for key in tile_manager.redis)
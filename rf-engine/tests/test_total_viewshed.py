@@ -0,0 +1,87 @@
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import total_viewshed
+from core.algorithms import calculate_viewshed
+from fakes import RidgeTerrain, terrain_manager
+
+
+@pytest.fixture
+def tile_manager():
+    tm = terrain_manager(RidgeTerrain())
+    yield tm
+    tm.shutdown()
+
+
+class TestTotalViewshed:
+    def test_flat_ground_sees_the_disc(self, tile_manager):
+        window = total_viewshed.terrain_window(tile_manager, 48.55, -122.50, 48.56, -122.49, 3000)
+        area = total_viewshed.visible_area(*window, [48.555], [-122.495], 10.0, 3000)
+        # Flat within 3 km of the ridge-free side: the whole disc
+        assert area[0] == pytest.approx(np.pi * 3.0 ** 2, rel=0.02)
+
+    def test_ridge_top_sees_more(self, tile_manager):
+        window = total_viewshed.terrain_window(tile_manager, 48.55, -122.40, 48.65, -122.20, 5000)
+        top, valley = total_viewshed.visible_area(*window, [48.6, 48.6], [-122.30, -122.27], 10.0, 5000)
+        assert top > valley
+
+    def test_matches_radial_viewshed(self, tile_manager):
+        lat, lon, radius = 48.6, -122.33, 4000
+        window = total_viewshed.terrain_window(tile_manager, lat, lon, lat + 1e-4, lon + 1e-4, radius)
+        area = total_viewshed.visible_area(*window, [lat], [lon], 10.0, radius, n_rays=128)[0]
+        grid, _, _ = calculate_viewshed(tile_manager, lat, lon, 10.0, radius, resolution_m=100, method='radial')
+        assert area == pytest.approx(grid.sum() * 0.01, rel=0.1)
+
+    def test_raster_parallel_chunks(self, tile_manager):
+        progress = []
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            area, lats, lons = total_viewshed.total_viewshed(
+                tile_manager, 48.55, -122.40, 48.65, -122.20, 10.0, 3000, grid_dim=16,
+                executor=pool, chunk=20, progress=lambda done, total: progress.append((done, total))
+            )
+        serial, _, _ = total_viewshed.total_viewshed(
+            tile_manager, 48.55, -122.40, 48.65, -122.20, 10.0, 3000, grid_dim=16
+        )
+        assert area.shape == lats.shape == lons.shape
+        assert np.allclose(area, serial)
+        assert progress[-1] == (area.size, area.size)
+        # Cells far from the ridge see the whole disc; the ridge shadows the rest
+        assert area[:, 0] == pytest.approx(np.pi * 3.0 ** 2, rel=0.02)
+        assert area.min() < 0.8 * area.max()
+
+    def test_cancel_between_chunks(self, tile_manager):
+        class Stop(Exception):
+            pass
+
+        def cancel():
+            raise Stop()
+        with pytest.raises(Stop):
+            total_viewshed.total_viewshed(
+                tile_manager, 48.55, -122.40, 48.65, -122.20, 10.0, 3000, grid_dim=8, cancel_check=cancel
+            )
+
+    def test_cancel_keeps_finished_chunks(self, tile_manager):
+        lat_grid, _ = total_viewshed.observer_grid(48.55, -122.40, 48.65, -122.20, 8)
+        area = np.full(lat_grid.shape, np.nan)
+        calls = []
+
+        def cancel():
+            calls.append(1)
+            if len(calls) > 2:
+                raise RuntimeError("cancelled")
+        with pytest.raises(RuntimeError):
+            total_viewshed.total_viewshed(
+                tile_manager, 48.55, -122.40, 48.65, -122.20, 10.0, 3000, grid_dim=8,
+                chunk=10, cancel_check=cancel, out=area
+            )
+        computed = ~np.isnan(area)
+        assert computed.ravel()[:20].all() and not computed.ravel()[20:].any()
+        full, _, _ = total_viewshed.total_viewshed(tile_manager, 48.55, -122.40, 48.65, -122.20, 10.0, 3000, grid_dim=8)
+        assert np.allclose(area[computed], full[computed])
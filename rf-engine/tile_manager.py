@@ -6,15 +6,107 @@ import logging
 import os
 import scipy.ndimage
 import threading
+import time
+import clutter_raster
+import metrics
+import sdf_terrain
+import terrain_shm
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from requests.adapters import HTTPAdapter
 from collections import OrderedDict
+from core import geodesy
+from core.profile_planner import dataset_resolution_m
 
 logger = logging.getLogger(__name__)
 
+# Largest raster edge returned by get_elevation_window (matches the batch viewshed cap)
+MAX_WINDOW_DIM = 4096
+TILE_GRID = 16  # Samples per tile edge fetched from OpenTopoData
+# Map tiles below the base zoom come from an overview pyramid of
+# OVERVIEW_GRID^2 grids (each a 2x2 block mean of its four children) for this
+# many levels; further out they fall back to a direct fetch at their own zoom.
+OVERVIEW_LEVELS = int(os.environ.get("TILE_OVERVIEW_LEVELS", 4))
+OVERVIEW_GRID = 64
+# clutter_mode values: "uniform" applies clutter_height everywhere; "raster"
+# uses the clutter raster (0 m outside it); "auto" uses the raster where it
+# covers and clutter_height elsewhere.
+CLUTTER_MODES = ("auto", "uniform", "raster")
+
+
+def _tile_indices(lons, lats, zoom):
+    """
+    Vectorized mercantile.tile(): integer tile x/y for arrays of coordinates.
+    """
+    z2 = 2.0 ** zoom
+    x = lons / 360.0 + 0.5
+    sinlat = np.sin(np.radians(lats))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = 0.5 - 0.25 * np.log((1.0 + sinlat) / (1.0 - sinlat)) / np.pi
+    tx = np.floor((x + mercantile.EPSILON) * z2)
+    ty = np.floor((y + mercantile.EPSILON) * z2)
+    tx = np.where(x <= 0, 0, np.where(x >= 1, z2 - 1, tx))
+    ty = np.where(y <= 0, 0, np.where(y >= 1, z2 - 1, ty))
+    return tx.astype(np.int64), ty.astype(np.int64)
+
+
+def _tile_bounds(tx, ty, zoom):
+    """
+    Vectorized mercantile.bounds(): (west, south, east, north) arrays.
+    """
+    z2 = 2.0 ** zoom
+    west = tx / z2 * 360.0 - 180.0
+    east = (tx + 1) / z2 * 360.0 - 180.0
+    north = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * ty / z2))))
+    south = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (ty + 1) / z2))))
+    return west, south, east, north
+
+
+def tile_pixel_coordinates(tx, ty, zoom, size):
+    """
+    Latitudes (north to south) and longitudes (west to east) of the pixel
+    centres of a size x size Web Mercator tile.
+    """
+    z2 = 2.0 ** zoom
+    offsets = (np.arange(size) + 0.5) / size
+    lons = (tx + offsets) / z2 * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (ty + offsets) / z2))))
+    return lats, lons
+
+
+def window_coordinates(transform, shape):
+    """
+    1-D latitude (north to south) and longitude (west to east) vectors of a window.
+    """
+    west, dlon, _, north, _, neg_dlat = transform
+    rows, cols = shape
+    lats = north + np.arange(rows) * neg_dlat
+    lons = west + np.arange(cols) * dlon
+    return lats, lons
+
+
+def sample_window(elevation, transform, lats, lons, order=1):
+    """
+    Interpolate a window returned by get_elevation_window at arbitrary points.
+    Points outside the window are clamped to its edge.
+    """
+    west, dlon, _, north, _, neg_dlat = transform
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    rows = (lats - north) / neg_dlat
+    cols = (lons - west) / dlon
+    coords = np.vstack([rows.ravel(), cols.ravel()])
+    values = scipy.ndimage.map_coordinates(elevation, coords, order=order, mode='nearest')
+    return values.reshape(lats.shape)
+
 class TileManager:
-    def __init__(self, redis_client):
+    def __init__(self, redis_client, shm=None, sdf=None, clutter=None):
         self.redis = redis_client
+        # Host-wide decoded tile cache shared by every worker process (None = Redis only)
+        self.shm = shm if shm is not None else terrain_shm.from_env()
+        # Local SPLAT! SDF blocks; points they cover never touch Redis or the API
+        self.sdf = sdf if sdf is not None else sdf_terrain.from_env()
+        # Land-cover / canopy-height clutter rasters (None = uniform clutter_height only)
+        self.clutter = clutter if clutter is not None else clutter_raster.from_env()
         self.zoom = 12  # Standard zoom level for 30m resolution approx
         self.ttl = 30 * 24 * 60 * 60  # 30 Days
         
@@ -27,15 +119,22 @@ class TileManager:
         # Separate executors to prevent deadlocks
         self.tile_executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix='tile_')
         self.batch_executor = ThreadPoolExecutor(max_workers=30, thread_name_prefix='batch_')
+        metrics.track_executor('tile', self.tile_executor)
+        metrics.track_executor('batch', self.batch_executor)
         
         # Request coalescing to prevent thundering herd (LRU-capped to prevent unbounded growth)
         self.tile_locks = OrderedDict()
         self._max_locks = 1000
         self.global_lock = threading.Lock()
 
-    def get_tile_data(self, lat=None, lon=None, tile_x=None, tile_y=None, zoom=None):
+        # Callbacks run when the elevation source changes (derived caches subscribe)
+        self.dataset = os.environ.get('ELEVATION_DATASET', 'srtm30m')
+        self._invalidation_hooks = []
+
+    def get_tile_data(self, lat=None, lon=None, tile_x=None, tile_y=None, zoom=None, cached_only=False):
         """
         Returns the raw data (elevation grid) for the tile.
+        cached_only: return None instead of fetching a tile no cache holds.
         """
         if tile_x is None:
             if lat is None or lon is None:
@@ -46,10 +145,23 @@ class TileManager:
         zoom = zoom if zoom is not None else self.zoom
         tile_key = f"tile:{zoom}:{tile_x}:{tile_y}"
         
+        # 0. Shared memory: already decoded by some process on this host
+        if self.shm is not None:
+            values = self.shm.get(tile_x, tile_y, zoom)
+            if values is not None:
+                metrics.TILE_CACHE.labels('shm', 'hit').inc()
+                return {"elevation": values}
+            metrics.TILE_CACHE.labels('shm', 'miss').inc()
+        
         # 1. Fast check cache
         data = self._get_tile_from_cache(tile_key)
         if data:
+            metrics.TILE_CACHE.labels('redis', 'hit').inc()
+            self._share_tile(tile_x, tile_y, zoom, data)
             return data
+        metrics.TILE_CACHE.labels('redis', 'miss').inc()
+        if cached_only:
+            return None
             
         # 2. Cache miss - use lock to prevent redundant fetches
         with self.global_lock:
@@ -67,17 +179,52 @@ class TileManager:
             if data:
                 return data
                 
-            logger.info(f"Cache miss for tile {tile_key}. Fetching from API.")
+            logger.debug(f"Cache miss for tile {tile_key}. Fetching from API.")
             data = self._fetch_tile_from_api(tile_x, tile_y, zoom)
             if data:
+                metrics.TILE_CACHE.labels('api', 'hit').inc()
                 self._cache_tile(tile_key, data)
+                self._share_tile(tile_x, tile_y, zoom, data)
+            else:
+                metrics.TILE_CACHE.labels('api', 'miss').inc()
         
         return data
     
+    def _share_tile(self, x, y, z, data):
+        if self.shm is None or 'elevation' not in data:
+            return
+        try:
+            self.shm.put(x, y, z, data['elevation'])
+        except Exception as e:
+            logger.warning(f"Shared terrain cache write failed for {z}/{x}/{y}: {e}")
+
+    def add_invalidation_hook(self, callback):
+        """
+        Register callback() to run whenever the elevation dataset changes.
+        """
+        self._invalidation_hooks.append(callback)
+
+    def dataset_changed(self):
+        """
+        Notify subscribers that previously derived results are stale.
+        Call after swapping ELEVATION_DATASET or refreshing cached tiles.
+        """
+        self.dataset = os.environ.get('ELEVATION_DATASET', 'srtm30m')
+        if self.shm is not None:
+            self.shm.clear()
+        for callback in list(self._invalidation_hooks):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Invalidation hook {callback!r} failed: {e}")
+
     def shutdown(self):
         """Shutdown thread pools gracefully."""
         self.tile_executor.shutdown(wait=False)
         self.batch_executor.shutdown(wait=False)
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
     
     def __del__(self):
         try:
@@ -90,30 +237,106 @@ class TileManager:
         Get elevation for a specific coordinate. 
         Transparently handles caching and fetching tiles.
         """
-        logger.info(f"Getting elevation for lat={lat}, lon={lon}")
+        if self.sdf is not None:
+            elevation = self.sdf.get_elevation(lat, lon)
+            if elevation is not None:
+                return elevation
+
         tile = mercantile.tile(lon, lat, self.zoom)
-        logger.info(f"Tile coordinates: x={tile.x}, y={tile.y}, z={self.zoom}")
-        data = self.get_tile_data(lat=lat, lon=lon)
+        data = self.get_tile_data(tile_x=tile.x, tile_y=tile.y, zoom=self.zoom)
         
         if data:
-            logger.info(f"Got tile data, first 5 elevation values: {data.get('elevation', [])[:5] if 'elevation' in data else 'NO ELEVATION KEY'}")
-            result = self._extract_elevation_from_tile(data, lat, lon, tile)
-            logger.info(f"Extracted elevation: {result}")
-            return result
+            return self._extract_elevation_from_tile(data, lat, lon, tile)
         logger.warning("No tile data returned!")
         return 0.0
 
     def get_elevation_profile(self, lat1, lon1, lat2, lon2, samples=50):
         """
         Get elevation profile along a path between two points (Batch optimized).
+        Samples are evenly spaced along the great circle.
         """
-        lats = np.linspace(lat1, lat2, samples)
-        lons = np.linspace(lon1, lon2, samples)
-        coords = list(zip(lats, lons))
-        
-        return self.get_elevations_batch(coords)
+        lats, lons = geodesy.great_circle_points(lat1, lon1, lat2, lon2, samples)
+        return self.sample_elevations(lats, lons).tolist()
+
+    def effective_resolution_m(self, lat):
+        """
+        Ground spacing of the terrain actually served at a latitude (meters).
+        The coarser of the dataset's native posting and the cached tile grid
+        (TILE_GRID samples per zoom-level tile edge).
+        """
+        tile_width_m = 40075016.686 * max(0.001, np.cos(np.radians(lat))) / (2 ** self.zoom)
+        return max(dataset_resolution_m(), tile_width_m / (TILE_GRID - 1))
 
+    def get_elevation_profiles(self, lat1, lon1, lat2, lon2, samples=50, clutter_height=None, clutter_mode="auto"):
+        """
+        Elevation profiles for many paths in one vectorized call.
+        Endpoints broadcast (e.g. one TX against (N,) targets).
+        clutter_height: when given, clutter is looked up at the same sample
+                        points (see sample_clutter).
+        Returns: (N, samples) array, or (elevations, clutter) with clutter_height.
+        """
+        lats, lons = geodesy.great_circle_points(lat1, lon1, lat2, lon2, samples)
+        if clutter_height is None:
+            return self.sample_elevations(lats, lons)
+        return self.sample_elevations(lats, lons), self.sample_clutter(lats, lons, clutter_height, clutter_mode)
+
+    def get_elevation_profile_groups(self, lat1, lon1, lat2, lon2, samples, clutter_height=None, clutter_mode="auto"):
+        """
+        Profiles for many paths with per-path sample counts.
+        Every sample point is looked up in a single vectorized pass, so tiles
+        shared between paths are fetched once.
+        clutter_height: when given, each group also carries its clutter
+                        (see sample_clutter), from the same sample points.
+        Returns: list of (path_indices, (n, samples) profiles), one per distinct
+        count; (path_indices, profiles, clutter) with clutter_height.
+        """
+        lat1, lon1, lat2, lon2, samples = np.broadcast_arrays(
+            *(np.asarray(v) for v in (lat1, lon1, lat2, lon2, samples))
+        )
+        groups = []
+        all_lats, all_lons = [], []
+        for count in np.unique(samples):
+            idx = np.nonzero(samples == count)[0]
+            lats, lons = geodesy.great_circle_points(lat1[idx], lon1[idx], lat2[idx], lon2[idx], int(count))
+            groups.append((idx, lats.shape))
+            all_lats.append(lats.ravel())
+            all_lons.append(lons.ravel())
+        if not groups:
+            return []
 
+        all_lats, all_lons = np.concatenate(all_lats), np.concatenate(all_lons)
+        elevs = self.sample_elevations(all_lats, all_lons)
+        clutter = None
+        if clutter_height is not None:
+            clutter = self.sample_clutter(all_lats, all_lons, clutter_height, clutter_mode)
+
+        result, offset = [], 0
+        for idx, shape in groups:
+            size = shape[0] * shape[1]
+            profiles = elevs[offset:offset + size].reshape(shape)
+            if clutter is None:
+                result.append((idx, profiles))
+            elif np.ndim(clutter) == 0:
+                result.append((idx, profiles, clutter))
+            else:
+                result.append((idx, profiles, clutter[offset:offset + size].reshape(shape)))
+            offset += size
+        return result
+
+    def sample_clutter(self, lats, lons, clutter_height=0.0, mode="auto"):
+        """
+        Clutter height above ground at sample points (see CLUTTER_MODES).
+        Returns: clutter_height as a float when it applies uniformly (no
+        raster, or mode "uniform"), else an array shaped like lats.
+        """
+        if mode not in CLUTTER_MODES:
+            raise ValueError(f"clutter_mode must be one of {', '.join(CLUTTER_MODES)}")
+        if mode == "uniform" or self.clutter is None:
+            return 0.0 if mode == "raster" else float(clutter_height)
+        heights, covered = self.clutter.sample_heights(lats, lons)
+        if mode == "auto":
+            heights[~covered] = clutter_height
+        return heights
 
     def _fetch_tile_from_api(self, x, y, z):
         """
@@ -130,6 +353,9 @@ class TileManager:
         
         base_url = os.environ.get('ELEVATION_API_URL', 'http://opentopodata:5000')
         dataset = os.environ.get('ELEVATION_DATASET', 'srtm30m')
+        if dataset != self.dataset:
+            logger.info(f"Elevation dataset changed: {self.dataset} -> {dataset}")
+            self.dataset_changed()
         
         # Create 16x16 grid of coordinates
         lats = np.linspace(lat_min, lat_max, 16)
@@ -155,11 +381,13 @@ class TileManager:
         def fetch_batch(locations, batch_num):
             try:
                 # No artificial delay needed for local deployments
+                start = time.perf_counter()
                 response = self.session.get(
                     url,
                     params={'locations': locations},
                     timeout=10
                 )
+                metrics.ELEVATION_FETCH_SECONDS.observe(time.perf_counter() - start)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -167,22 +395,28 @@ class TileManager:
                         return [result.get('elevation', 0.0) for result in data['results']]
                     else:
                         error_msg = data.get('error', 'Unknown error')
+                        metrics.ELEVATION_FETCH_ERRORS.labels('api_error').inc()
                         logger.error(f"OpenTopoData batch {batch_num} error: {error_msg}")
                         return None
                 elif response.status_code == 404:
+                    metrics.ELEVATION_FETCH_ERRORS.labels('http_404').inc()
                     logger.error(f"Dataset '{dataset}' not found. Check ELEVATION_DATASET env var and data files.")
                     return None
                 else:
+                    metrics.ELEVATION_FETCH_ERRORS.labels(f'http_{response.status_code}').inc()
                     logger.warning(f"OpenTopoData batch {batch_num} failed with status {response.status_code}")
                     return None
                     
             except requests.exceptions.Timeout:
+                metrics.ELEVATION_FETCH_ERRORS.labels('timeout').inc()
                 logger.error(f"OpenTopoData request timed out for batch {batch_num}")
                 return None
             except requests.exceptions.ConnectionError:
+                metrics.ELEVATION_FETCH_ERRORS.labels('connection').inc()
                 logger.error(f"Cannot connect to OpenTopoData at {base_url}. Is the container running?")
                 return None
             except Exception as e:
+                metrics.ELEVATION_FETCH_ERRORS.labels('exception').inc()
                 logger.error(f"Exception fetching OpenTopoData batch {batch_num}: {e}")
                 return None
 
@@ -201,7 +435,7 @@ class TileManager:
             all_elevations.extend(batch_result)
         
         if len(all_elevations) == 256:
-            logger.info(f"Successfully fetched elevation data from OpenTopoData ({dataset}): min={min(all_elevations):.1f}m, max={max(all_elevations):.1f}m")
+            logger.debug(f"Successfully fetched elevation data from OpenTopoData ({dataset}): min={min(all_elevations):.1f}m, max={max(all_elevations):.1f}m")
             return {"elevation": all_elevations}
         else:
             logger.error(f"Expected 256 elevation points, got {len(all_elevations)}")
@@ -228,30 +462,210 @@ class TileManager:
         
         return high_res_grid
 
+    def render_tile(self, x, y, z, size=256):
+        """
+        (size, size) north-up elevation grid of a map tile, at pixel centres.
+        At or above the base zoom the pixels are sampled from the covering
+        base tiles (or SDF blocks), so deeper zooms never fetch more than the
+        base level did. Up to OVERVIEW_LEVELS below it they are upsampled
+        from the overview pyramid when the base tiles underneath are already
+        cached; otherwise (and further out) from the tile's own fetch.
+        """
+        if z >= self.zoom:
+            lats, lons = tile_pixel_coordinates(x, y, z, size)
+            lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+            return self.sample_elevations(lat_grid, lon_grid)
+        if z >= self.zoom - OVERVIEW_LEVELS:
+            overview, complete = self._overview(x, y, z)
+            if not complete:
+                return self.get_interpolated_grid(x, y, z, size)
+            # Render pixel centres in overview pixel units (both grids are pixel-centred)
+            pos = (np.arange(size) + 0.5) * (OVERVIEW_GRID / size) - 0.5
+            rows, cols = np.meshgrid(pos, pos, indexing='ij')
+            return scipy.ndimage.map_coordinates(overview, [rows, cols], order=1, mode='nearest')
+        return self.get_interpolated_grid(x, y, z, size)
+
+    def _overview(self, x, y, z):
+        """
+        OVERVIEW_GRID^2 pixel-centre elevation grid of a tile below the base
+        zoom. One level up it is sampled from the base tiles, higher levels
+        average their four children. Only cached base tiles (or SDF blocks)
+        are read: a cold z8 tile would otherwise fetch all 256 z12 tiles
+        under it. Cached in Redis once complete.
+        Returns: (grid, complete); grid is None when a base tile is not cached.
+        """
+        n = OVERVIEW_GRID
+        key = f"overview:{z}:{x}:{y}"
+        data = self._get_tile_from_cache(key)
+        if data:
+            metrics.TILE_CACHE.labels('overview', 'hit').inc()
+            return np.frombuffer(data['elevation'], dtype=np.float32).astype(np.float64).reshape(n, n), True
+        metrics.TILE_CACHE.labels('overview', 'miss').inc()
+
+        if z + 1 >= self.zoom:
+            lats, lons = tile_pixel_coordinates(x, y, z, n)
+            lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+            grid, valid = self.sample_elevations(lat_grid, lon_grid, return_valid=True, cached_only=True)
+            if not valid.all():
+                return None, False
+        else:
+            children = np.empty((2 * n, 2 * n))
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    child, complete = self._overview(2 * x + dx, 2 * y + dy, z + 1)
+                    if not complete:
+                        return None, False
+                    children[dy * n:(dy + 1) * n, dx * n:(dx + 1) * n] = child
+            # Children's pixel centres pair up exactly under each parent pixel
+            grid = children.reshape(n, 2, n, 2).mean(axis=(1, 3))
+
+        self._cache_tile(key, {"elevation": grid.astype(np.float32).tobytes()})
+        return grid, True
+
     def get_elevations_batch(self, coords):
         """
         Efficiently get elevations for a list of (lat, lon) coordinates.
         Groups by tile and fetches required tiles in parallel.
         """
-        # 1. Group coordinates by tile
-        tile_to_coords = {}
-        for lat, lon in coords:
-            tile = mercantile.tile(lon, lat, self.zoom)
-            tile_key = (tile.x, tile.y, self.zoom)
-            if tile_key not in tile_to_coords:
-                tile_to_coords[tile_key] = []
-            tile_to_coords[tile_key].append((lat, lon))
-            
-        # 2. Fetch all unique tiles in parallel
-        unique_tiles = list(tile_to_coords.keys())
-        tile_data_map = {}
-        
+        if len(coords) == 0:
+            return []
+        arr = np.asarray(coords, dtype=np.float64)
+        return self.sample_elevations(arr[:, 0], arr[:, 1]).tolist()
+
+    def sample_elevations(self, lats, lons, return_valid=False, cached_only=False):
+        """
+        Vectorized elevation lookup for arrays of any shape.
+        Unique tiles are fetched once in parallel, stacked, and every point is
+        bilinearly interpolated within its tile in a single NumPy pass.
+        Missing tiles yield 0.0 (same as the scalar path).
+        Points covered by SDF blocks are served from those instead.
+        return_valid: also return a bool array, False where a tile was missing.
+        cached_only: treat tiles no cache holds as missing instead of fetching.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        shape = lats.shape
+        lats = lats.ravel()
+        lons = lons.ravel()
+        if lats.size == 0:
+            result, valid = np.zeros(shape), np.ones(shape, dtype=bool)
+        elif self.sdf is not None:
+            result, valid = self.sdf.sample_elevations(lats, lons)
+            if not valid.all():
+                rest = ~valid
+                result[rest], valid[rest] = self._sample_tiles(lats[rest], lons[rest], cached_only)
+            result, valid = result.reshape(shape), valid.reshape(shape)
+        else:
+            result, valid = self._sample_tiles(lats, lons, cached_only)
+            result, valid = result.reshape(shape), valid.reshape(shape)
+        return (result, valid) if return_valid else result
+
+    def _sample_tiles(self, lats, lons, cached_only=False):
+        """
+        sample_elevations() over cached/fetched tiles for 1-D coordinate arrays.
+        Returns: (elevations, valid)
+        """
+        tx, ty = _tile_indices(lons, lats, self.zoom)
+        packed = tx * (2 ** self.zoom) + ty
+        unique_keys, inverse = np.unique(packed, return_inverse=True)
+        unique_tx = unique_keys // (2 ** self.zoom)
+        unique_ty = unique_keys % (2 ** self.zoom)
+
+        tile_data_map = self._fetch_tiles(
+            [(int(x), int(y), self.zoom) for x, y in zip(unique_tx, unique_ty)], cached_only
+        )
+
+        n = TILE_GRID
+        stack = np.zeros((len(unique_keys), n, n))
+        valid = np.zeros(len(unique_keys), dtype=bool)
+        for t, (x, y) in enumerate(zip(unique_tx, unique_ty)):
+            data = tile_data_map.get((int(x), int(y), self.zoom))
+            if not data or 'elevation' not in data:
+                continue
+            raw_elev = np.asarray(data['elevation'], dtype=np.float64)
+            if raw_elev.size != n * n:
+                continue
+            stack[t] = raw_elev.reshape((n, n))
+            valid[t] = True
+
+        west, south, east, north = _tile_bounds(unique_tx, unique_ty, self.zoom)
+        west, south, east, north = west[inverse], south[inverse], east[inverse], north[inverse]
+
+        # Same grid convention as _extract_elevation_from_tile: grid[lon_idx, lat_idx]
+        u = np.clip((lats - south) / (north - south) * (n - 1), 0, n - 1)
+        v = np.clip((lons - west) / (east - west) * (n - 1), 0, n - 1)
+        i = np.floor(u).astype(np.int64)
+        j = np.floor(v).astype(np.int64)
+        u_ratio = u - i
+        v_ratio = v - j
+        i_next = np.minimum(i + 1, n - 1)
+        j_next = np.minimum(j + 1, n - 1)
+
+        p00 = stack[inverse, j, i]
+        p10 = stack[inverse, j, i_next]
+        p01 = stack[inverse, j_next, i]
+        p11 = stack[inverse, j_next, i_next]
+
+        val_j = p00 * (1 - u_ratio) + p10 * u_ratio
+        val_jnext = p01 * (1 - u_ratio) + p11 * u_ratio
+        result = val_j * (1 - v_ratio) + val_jnext * v_ratio
+        return np.where(valid[inverse], result, 0.0), valid[inverse]
+
+    def get_elevation_window(self, min_lat, min_lon, max_lat, max_lon, resolution_m=30.0, shape=None):
+        """
+        Contiguous elevation raster for a bounding box.
+        Stitched from cached tiles with a single interpolation pass.
+
+        Either resolution_m (approximate ground spacing) or an explicit
+        shape=(rows, cols) selects the grid. Edges are capped at MAX_WINDOW_DIM.
+
+        Returns: (elevation, geotransform)
+        elevation is north-up (row 0 = max_lat). geotransform uses GDAL ordering
+        (west, dlon, 0, north, 0, -dlat): pixel (r, c) is the point
+        lat = north - r * dlat, lon = west + c * dlon (bbox corners inclusive).
+        """
+        if max_lat <= min_lat or max_lon <= min_lon:
+            raise ValueError("Window bbox must have max_lat > min_lat and max_lon > min_lon")
+
+        if shape is None:
+            mid_lat = (min_lat + max_lat) / 2.0
+            height_m = (max_lat - min_lat) * 111320.0
+            width_m = (max_lon - min_lon) * 111320.0 * max(0.001, np.cos(np.radians(mid_lat)))
+            rows = int(round(height_m / resolution_m)) + 1
+            cols = int(round(width_m / resolution_m)) + 1
+        else:
+            rows, cols = int(shape[0]), int(shape[1])
+
+        if rows > MAX_WINDOW_DIM or cols > MAX_WINDOW_DIM:
+            scale = max(rows / MAX_WINDOW_DIM, cols / MAX_WINDOW_DIM)
+            logger.warning(f"Elevation window {rows}x{cols} exceeds {MAX_WINDOW_DIM}; coarsening by {scale:.2f}x")
+            rows = int(rows / scale)
+            cols = int(cols / scale)
+        rows = max(rows, 2)
+        cols = max(cols, 2)
+
+        dlat = (max_lat - min_lat) / (rows - 1)
+        dlon = (max_lon - min_lon) / (cols - 1)
+        transform = (min_lon, dlon, 0.0, max_lat, 0.0, -dlat)
+
+        lats, lons = window_coordinates(transform, (rows, cols))
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        elevation = self.sample_elevations(lat_grid, lon_grid)
+
+        return elevation, transform
+
+    def _fetch_tiles(self, tile_keys, cached_only=False):
+        """
+        Fetch a list of (x, y, z) tiles in parallel.
+        Returns: {(x, y, z): data}; failed tiles are omitted.
+        """
         def fetch_single_tile(tx, ty, tz):
-            data = self.get_tile_data(tile_x=tx, tile_y=ty, zoom=tz)
+            data = self.get_tile_data(tile_x=tx, tile_y=ty, zoom=tz, cached_only=cached_only)
             return (tx, ty, tz), data
 
-        futures = [self.tile_executor.submit(fetch_single_tile, tx, ty, tz) for tx, ty, tz in unique_tiles]
-        
+        futures = [self.tile_executor.submit(fetch_single_tile, tx, ty, tz) for tx, ty, tz in tile_keys]
+
+        tile_data_map = {}
         for future in futures:
             try:
                 key, data = future.result(timeout=30)
@@ -259,22 +673,7 @@ class TileManager:
                 logger.error(f"Tile fetch timed out or failed: {e}")
                 continue
             tile_data_map[key] = data
-            
-        # 3. Extract elevations
-        results = []
-        for lat, lon in coords:
-            tile = mercantile.tile(lon, lat, self.zoom)
-            tile_key = (tile.x, tile.y, self.zoom)
-            data = tile_data_map.get(tile_key)
-            
-            if data:
-                # Need mercantile Tile object for extraction logic
-                elev = self._extract_elevation_from_tile(data, lat, lon, tile)
-                results.append(elev)
-            else:
-                results.append(0.0)
-                
-        return results
+        return tile_data_map
 
     def _cache_tile(self, key, data):
         packed = msgpack.packb(data)
@@ -1,5 +1,8 @@
 import os
+import time
 from celery import Celery
+from kombu import Queue
+from celery.signals import task_prerun, task_postrun, worker_init, worker_process_shutdown
 
 # Helper to get env vars safely
 def get_env(key, default):
@@ -15,7 +18,7 @@ celery_app = Celery(
     "meshrf_worker",
     broker=BROKER_URL,
     backend=BACKEND_URL,
-    include=["tasks.viewshed", "tasks.optimize"] # Pre-load modules
+    include=["tasks.viewshed", "tasks.optimize", "tasks.total_viewshed", "tasks.sweep", "tasks.coverage_gap"] # Pre-load modules
 )
 
 celery_app.conf.update(
@@ -24,4 +27,49 @@ celery_app.conf.update(
     accept_content=["json"],
     worker_prefetch_multiplier=1, # Important for CPU-bound tasks
     task_acks_late=True,
+    # Cost-based routing (tasks/routing.py): each queue has its own workers, so
+    # a large scan never occupies the slots short scans are waiting for.
+    # Start workers with -Q interactive / -Q bulk (see docker-compose.yml).
+    task_queues=(Queue("interactive"), Queue("bulk")),
+    task_default_queue="interactive",
+    # Redis emulates priorities with one list per step; 0 is served first
+    task_default_priority=5,
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
 )
+
+
+# --- Metrics ---
+# Prefork children write to PROMETHEUS_MULTIPROC_DIR; the main worker process
+# serves the aggregated registry on WORKER_METRICS_PORT.
+WORKER_METRICS_PORT = get_env("WORKER_METRICS_PORT", "")
+_task_started = {}
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    if not WORKER_METRICS_PORT or not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    from prometheus_client import start_http_server
+    import metrics
+    start_http_server(int(WORKER_METRICS_PORT), registry=metrics.multiprocess_registry())
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None or task is None:
+        return
+    import metrics
+    metrics.TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
@@ -1,9 +1,12 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { useRF } from '../../context/RFContext';
-import { fetchElevationPath } from '../../utils/elevation';
-import { analyzeLinkProfile, calculateLinkBudget, calculateBullingtonDiffraction } from '../../utils/rfMath';
+import { calculateLinkBudget } from '../../utils/rfMath';
+import { RF_CONSTANTS } from '../../utils/rfConstants';
+import { calculateLinks } from '../../utils/rfService';
 import { DEVICE_PRESETS } from '../../data/presets';
 
+const MAX_BATCH_LINKS = 5000; // Server limit per /calculate-links request
+
 const BatchProcessing = () => {
     const {
         batchNodes, setBatchNodes,
@@ -181,68 +184,62 @@ const BatchProcessing = () => {
                         if (batchNodes.length > 20 && !window.confirm(`Preparing to analyze ${totalLinks} links. This may take a while. Continue?`)) return;
                         
                         const startExport = async () => {
-                            let csvContent = "data:text/csv;charset=utf-8,Source,Target,Distance_km,Status,Quality,Margin_dB,Clearance_m\n";
-                            
-                            // Iterate all pairs
+                            let csvContent = "data:text/csv;charset=utf-8,Source,Target,Distance_km,Status,Quality,Margin_dB,Fresnel_Clearance\n";
+                            const configA = nodeConfigs.A;
+                            const configB = nodeConfigs.B;
+
+                            // All pairs, analyzed server-side in batches of up to MAX_BATCH_LINKS
+                            const pairs = [];
                             for (let i = 0; i < batchNodes.length; i++) {
                                 for (let j = i + 1; j < batchNodes.length; j++) {
-                                    const n1 = batchNodes[i];
-                                    const n2 = batchNodes[j];
-                                    
-                                    try {
-                                        // Fetch Profile
-                                        const profile = await fetchElevationPath(
-                                            {lat: n1.lat, lng: n1.lng}, 
-                                            {lat: n2.lat, lng: n2.lng}, 
-                                            20 // Lower resolution for batch to save time
-                                        );
-                                        
-                                        if (profile) {
-                                            const configA = nodeConfigs.A;
-                                            const configB = nodeConfigs.B;
+                                    pairs.push({ id: pairs.length, nodeA: batchNodes[i], nodeB: batchNodes[j] });
+                                }
+                            }
 
-                                            const analysis = analyzeLinkProfile(
-                                                profile,
-                                                freq,
-                                                configA.antennaHeight,
-                                                configB.antennaHeight,
-                                                kFactor,
-                                                clutterHeight
-                                            );
+                            for (let start = 0; start < pairs.length; start += MAX_BATCH_LINKS) {
+                                const chunk = pairs.slice(start, start + MAX_BATCH_LINKS);
+                                let results = null;
+                                try {
+                                    const response = await calculateLinks(
+                                        chunk, freq, configA.antennaHeight, configB.antennaHeight,
+                                        'bullington', 'suburban', kFactor, clutterHeight
+                                    );
+                                    results = response.links;
+                                } catch (e) {
+                                    console.error("Batch Error", e);
+                                }
 
-                                            const distKm = profile[profile.length-1].distance;
+                                chunk.forEach(({ nodeA: n1, nodeB: n2 }, k) => {
+                                    const link = results && results[k];
+                                    if (!link) {
+                                        csvContent += `${n1.name},${n2.name},ERR,ERR,ERR,ERR,ERR\n`;
+                                        return;
+                                    }
+                                    const ratio = link.min_clearance_ratio;
 
-                                            // Calculate Bullington diffraction for terrain-aware path loss
-                                            const diffraction = analysis.profileWithStats
-                                                ? calculateBullingtonDiffraction(analysis.profileWithStats, freq, configA.antennaHeight, configB.antennaHeight)
-                                                : 0;
+                                    // Link Budget with per-node params; the server's Bullington loss includes terrain diffraction
+                                    const budget = calculateLinkBudget({
+                                        txPower: configA.txPower,
+                                        txGain: configA.antennaGain,
+                                        txLoss: DEVICE_PRESETS[configA.device]?.loss || 0,
+                                        rxGain: configB.antennaGain,
+                                        rxLoss: DEVICE_PRESETS[configB.device]?.loss || 0,
+                                        distanceKm: link.dist_km,
+                                        freqMHz: freq,
+                                        sf, bw,
+                                        pathLossOverride: link.path_loss_db,
+                                        fadeMargin: fadeMargin,
+                                    });
 
-                                            // Link Budget with per-node params and terrain diffraction
-                                            const budget = calculateLinkBudget({
-                                                txPower: configA.txPower,
-                                                txGain: configA.antennaGain,
-                                                txLoss: DEVICE_PRESETS[configA.device]?.loss || 0,
-                                                rxGain: configB.antennaGain,
-                                                rxLoss: DEVICE_PRESETS[configB.device]?.loss || 0,
-                                                distanceKm: distKm,
-                                                freqMHz: freq,
-                                                sf, bw,
-                                                excessLoss: diffraction,
-                                                fadeMargin: fadeMargin,
-                                            });
+                                    let quality = "Obstructed (-)";
+                                    if (ratio >= RF_CONSTANTS.FRESNEL.QUALITY.EXCELLENT) quality = "Excellent (+++)";
+                                    else if (ratio >= RF_CONSTANTS.FRESNEL.QUALITY.GOOD) quality = "Good (++)";
+                                    else if (ratio > RF_CONSTANTS.FRESNEL.QUALITY.MARGINAL) quality = "Marginal (+)";
 
-                                            const status = analysis.isObstructed ? 'OBSTRUCTED' : (budget.margin > 10 ? 'GOOD' : 'MARGINAL');
+                                    const status = link.status === 'blocked' ? 'OBSTRUCTED' : (budget.margin > 10 ? 'GOOD' : 'MARGINAL');
 
-                                            csvContent += `${n1.name},${n2.name},${distKm.toFixed(3)},${status},${analysis.linkQuality},${budget.margin},${analysis.minClearance}\n`;
-                                        }
-                                    } catch (e) {
-                                        console.error("Batch Error", e);
-                                        csvContent += `${n1.name},${n2.name},ERR,ERR,ERR,ERR,ERR\n`;
-                                    }
-                                    
-                                    // Small delay to prevent browser freeze & rate limit
-                                    await new Promise(r => setTimeout(r, 200));
-                                }
+                                    csvContent += `${n1.name},${n2.name},${link.dist_km.toFixed(3)},${status},${quality},${budget.margin},${ratio.toFixed(2)}\n`;
+                                });
                             }
                             
                             // Trigger Download
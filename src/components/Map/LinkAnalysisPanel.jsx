@@ -437,6 +437,7 @@ const LinkAnalysisPanel = ({ nodes, linkStats, budget, distance, units, propagat
                                     <option value="itm_wasm">Longley-Rice ITM (Full)</option>
                                     <option value="fspl">Free Space (Optimistic)</option>
                                     <option value="bullington">Bullington (Terrain Helper)</option>
+                                    <option value="deygout">Deygout (Multi-Edge)</option>
                                     <option value="hata">Okumura-Hata (Statistical)</option>
                                  </select>
                              </div>
@@ -84,7 +84,7 @@ const LinkLayer = ({ nodes, setNodes, linkStats, setLinkStats, setCoverageOverla
         // Parallel fetch: Elevation for profile/chart, and Path Loss from Backend
         Promise.all([
             fetchElevationPath(p1, p2),
-            (currentModel === 'hata' || currentModel === 'bullington' || currentModel === 'itm') 
+            (currentModel === 'hata' || currentModel === 'bullington' || currentModel === 'deygout' || currentModel === 'itm') 
                 ? calculateLink(p1, p2, currentFreq, h1, h2, currentModel, currentEnv, currentConfig.kFactor, currentConfig.clutterHeight)
                 : Promise.resolve(null)
         ])
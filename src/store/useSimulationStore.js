@@ -1,5 +1,15 @@
 import { create } from 'zustand';
 
+// Active progress stream; closed when a scan is superseded or cancelled
+let activeEventSource = null;
+
+const closeActiveStream = () => {
+  if (activeEventSource) {
+    activeEventSource.close();
+    activeEventSource = null;
+  }
+};
+
 const useSimulationStore = create((set, get) => ({
   // --- State ---
   nodes: [], // List of candidate nodes: { id, lat, lon, height, name }
@@ -44,16 +54,15 @@ const useSimulationStore = create((set, get) => ({
   }),
   
   startScan: async (optimizeN = null) => {
-    const { nodes, isScanning } = get();
-    
-    // Fix 15: Prevent double-submit race condition
-    if (isScanning) {
-      console.warn('Scan already in progress, ignoring duplicate request');
-      return;
-    }
+    const { nodes, isScanning, taskId } = get();
     
     if (nodes.length === 0) return;
     
+    // A rescan while scanning supersedes the old task (the server cancels it).
+    // Identical resubmits are deduplicated server-side and rejoin the same task.
+    const supersedes = isScanning ? taskId : null;
+    closeActiveStream();
+    
     set({ isScanning: true, scanProgress: 0, results: null, compositeOverlay: null, interNodeLinks: null, totalUniqueCoverageKm2: null });
     
     try {
@@ -61,7 +70,7 @@ const useSimulationStore = create((set, get) => ({
       const response = await fetch('/api/scan/start', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ nodes, optimize_n: optimizeN }),
+        body: JSON.stringify({ nodes, optimize_n: optimizeN, supersedes }),
       });
       
       const data = await response.json();
@@ -78,8 +87,21 @@ const useSimulationStore = create((set, get) => ({
     }
   },
   
+  cancelScan: async () => {
+    const { taskId, isScanning } = get();
+    if (!taskId || !isScanning) return;
+    closeActiveStream();
+    set({ isScanning: false, scanProgress: 0 });
+    try {
+      await fetch(`/api/scan/cancel/${taskId}`, { method: 'POST' });
+    } catch (error) {
+      console.error('Scan cancel error:', error);
+    }
+  },
+  
   listenToProgress: (taskId) => {
     const eventSource = new EventSource(`/api/task_status/${taskId}`);
+    activeEventSource = eventSource;
     
     eventSource.onmessage = (event) => {
       let payload;
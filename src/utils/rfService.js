@@ -66,6 +66,69 @@ export const calculateLink = async (nodeA, nodeB, freq, h1, h2, model, env, kFac
     }
 };
 
+export const calculateLinks = async (pairs, freq, h1, h2, model, env, kFactor, clutterHeight) => {
+    // pairs: [{ id, nodeA, nodeB }] - one request for a whole mesh instead of N calls
+    try {
+        const response = await fetch(`${API_URL}/calculate-links`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                links: pairs.map(({ id, nodeA, nodeB }) => ({
+                    id: id != null ? String(id) : null,
+                    tx_lat: Number(nodeA.lat),
+                    tx_lon: Number(nodeA.lng),
+                    rx_lat: Number(nodeB.lat),
+                    rx_lon: Number(nodeB.lng)
+                })),
+                frequency_mhz: Number(freq),
+                tx_height: Number(h1),
+                rx_height: Number(h2),
+                model: model || 'bullington',
+                environment: env || 'suburban',
+                k_factor: Number(kFactor) || 1.333,
+                clutter_height: Number(clutterHeight) || 0
+            })
+        });
+        if (!response.ok) {
+            throw new Error(`Calculate links failed: ${response.status} ${response.statusText}`);
+        }
+        return await response.json();
+    } catch (error) {
+        console.error("Batch Link Calc Error:", error);
+        throw error;
+    }
+};
+
+export const findRelayChain = async (source, target, freq, relayHeight, options = {}) => {
+    // source/target: { lat, lng, height }; options: maxLinkKm, maxHops, objective ('hops' | 'loss'), model, env, kFactor, clutterHeight
+    try {
+        const response = await fetch(`${API_URL}/relay-path`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                source: { lat: Number(source.lat), lon: Number(source.lng), height: Number(source.height) || 10 },
+                target: { lat: Number(target.lat), lon: Number(target.lng), height: Number(target.height) || 10 },
+                frequency_mhz: Number(freq),
+                relay_height: Number(relayHeight) || 10,
+                max_link_km: Number(options.maxLinkKm) || 20,
+                max_hops: Number(options.maxHops) || 6,
+                objective: options.objective || 'hops',
+                model: options.model || 'bullington',
+                environment: options.env || 'suburban',
+                k_factor: Number(options.kFactor) || 1.333,
+                clutter_height: Number(options.clutterHeight) || 0
+            })
+        });
+        if (!response.ok) {
+            throw new Error(`Relay path failed: ${response.status} ${response.statusText}`);
+        }
+        return await response.json();
+    } catch (error) {
+        console.error("Relay Path Error:", error);
+        throw error;
+    }
+};
+
 export const exportResults = async (locations, format = 'csv') => {
     try {
         const response = await fetch(`${API_URL}/export-results`, {